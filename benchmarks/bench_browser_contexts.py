@@ -0,0 +1,131 @@
+"""
+Peak RSS and throughput: one Chrome per quote vs. one Chrome with isolated contexts.
+
+    python -m benchmarks.bench_browser_contexts --quotes 24 --concurrency 4 --out contexts.json
+
+Runs against the local fixture site, samples the RSS of every process under
+this benchmark (chromedriver, Chrome, renderers) and reports quotes/s per GB.
+
+Contexts share one WebDriver session whose commands, page loads included,
+run one at a time under SharedBrowser.lock. "session_busy_pct" reports how
+much of the run that lock was held: near 100% means the contexts were
+serialized and any throughput gain comes from overlapping network waits.
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import environment
+from benchmarks.fixture_server import serve_fixture
+from porter_api import core
+from porter_api.browser import SharedBrowser, process_tree_rss
+
+
+class SessionClock:
+    """Stands in for SharedBrowser.lock and adds up the time the session is held"""
+
+    def __init__(self, lock):
+        self._lock = lock
+        self._depth = 0
+        self._since = 0.0
+        self.held = 0.0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            self._since = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            self.held += time.perf_counter() - self._since
+        self._lock.release()
+
+
+class PeakRSS:
+    """Samples the RSS of this process's children in the background"""
+
+    def __init__(self, interval: float = 0.2):
+        self._self_rss = process_tree_rss(os.getpid())
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self.peak = max(self.peak, process_tree_rss(os.getpid()) - self._self_rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run(mode: str, quotes: int, concurrency: int, url: str) -> dict:
+    core.PORTER_URL = url
+    api = core.PorterAPI(name="Bench Mark", phone="9876543210")
+    browser = SharedBrowser(max_contexts=concurrency) if mode == "contexts" else None
+    if browser:
+        browser.lock = SessionClock(browser.lock)
+
+    def one_quote(i: int) -> bool:
+        args = (f"Koramangala {i}", f"Indiranagar {i}", "Bangalore", "trucks")
+        if browser is None:
+            driver = core.get_selenium_driver(remote_debugging_port=0)
+            try:
+                return api.get_quote(*args, driver=driver)["success"]
+            finally:
+                driver.quit()
+        with browser.context() as ctx:
+            return api.get_quote(*args, driver=ctx)["success"]
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            ok = sum(pool.map(one_quote, range(quotes)))
+        elapsed = time.perf_counter() - start
+    session_busy = browser.lock.held / elapsed if browser else None
+    if browser:
+        browser.quit()
+
+    peak_gb = rss.peak / 1024 ** 3
+    throughput = ok / elapsed
+    return {
+        "mode": mode,
+        "ok": ok,
+        "elapsed_s": round(elapsed, 2),
+        "quotes_per_s": round(throughput, 3),
+        "peak_rss_mb": round(rss.peak / 1024 ** 2, 1),
+        "quotes_per_s_per_gb": round(throughput / peak_gb, 3) if peak_gb else None,
+        "session_busy_pct": round(100 * session_busy, 1) if browser else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fixture /api/estimate latency")
+    parser.add_argument("--mode", choices=["process", "contexts", "both"], default="both")
+    parser.add_argument("--out", help="Write the results and the environment as JSON")
+    args = parser.parse_args()
+
+    env = environment.describe()
+    print(env)
+    if args.mode != "process":
+        print("ℹ️ Contexts share one WebDriver session: their commands, page loads included, run one at a time")
+    server, url = serve_fixture(latency=args.latency)
+    modes = ["process", "contexts"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        results.append(run(mode, args.quotes, args.concurrency, url))
+        print(results[-1])
+    server.shutdown()
+    if args.out:
+        environment.write_results(args.out, args, results, env)
@@ -0,0 +1,105 @@
+"""
+Selenium engine vs. raw-CDP engine on the local fixture site.
+
+    python -m benchmarks.bench_engines --quotes 40 --concurrency 20 --latency 0.3 --out engines.json
+
+Both run the same quote flow from one asyncio event loop against one Chrome
+(isolated contexts). The Selenium engine parks a thread per in-flight step;
+the CDP engine runs every step on the loop. Reports throughput, peak RSS of
+the browser processes and peak thread count.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import environment
+from benchmarks.bench_browser_contexts import PeakRSS
+from benchmarks.fixture_server import serve_fixture
+from porter_api import core
+from porter_api.browser import SharedBrowser
+from porter_api.cdp import CDPBrowser
+from porter_api.engines import CDPEngine, SeleniumEngine
+
+
+async def _sample_threads(peak: list):
+    while True:
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.1)
+
+
+async def run(engine: str, quotes: int, concurrency: int, url: str) -> dict:
+    core.PORTER_URL = url
+    api = core.PorterAPI(name="Bench Mark", phone="9876543210")
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    peak_threads = [threading.active_count()]
+
+    if engine == "selenium":
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        browser = await loop.run_in_executor(executor, SharedBrowser, concurrency, 0)
+
+        async def one_quote(i: int) -> bool:
+            async with slots:
+                context = await loop.run_in_executor(executor, browser.new_context)
+                try:
+                    result = await SeleniumEngine(api, context, executor).get_quote(
+                        f"Koramangala {i}", f"Indiranagar {i}", "Bangalore"
+                    )
+                finally:
+                    await loop.run_in_executor(executor, browser.close_context, context)
+                return result["success"]
+    else:
+        browser = await CDPBrowser().start()
+
+        async def one_quote(i: int) -> bool:
+            async with slots:
+                result = await CDPEngine(api, browser).get_quote(f"Koramangala {i}", f"Indiranagar {i}", "Bangalore")
+                return result["success"]
+
+    sampler = asyncio.create_task(_sample_threads(peak_threads))
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        ok = sum(await asyncio.gather(*(one_quote(i) for i in range(quotes))))
+        elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    if engine == "selenium":
+        await loop.run_in_executor(executor, browser.quit)
+        executor.shutdown()
+    else:
+        await browser.close()
+
+    return {
+        "engine": engine,
+        "ok": ok,
+        "elapsed_s": round(elapsed, 2),
+        "quotes_per_s": round(ok / elapsed, 3),
+        "peak_rss_mb": round(rss.peak / 1024 ** 2, 1),
+        "peak_threads": peak_threads[0],
+    }
+
+
+async def main(args):
+    env = environment.describe()
+    print(env)
+    server, url = serve_fixture(latency=args.latency)
+    engines = ["selenium", "cdp"] if args.engine == "both" else [args.engine]
+    results = []
+    for engine in engines:
+        results.append(await run(engine, args.quotes, args.concurrency, url))
+        print(results[-1])
+    server.shutdown()
+    if args.out:
+        environment.write_results(args.out, args, results, env)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fixture /api/estimate latency")
+    parser.add_argument("--engine", choices=["selenium", "cdp", "both"], default="both")
+    parser.add_argument("--out", help="Write the results and the environment as JSON")
+    asyncio.run(main(parser.parse_args()))
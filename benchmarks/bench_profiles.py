@@ -0,0 +1,85 @@
+"""
+First byte to interactive: fresh Chrome profiles vs. clones of a warm template profile.
+
+    python -m benchmarks.bench_profiles --runs 10 --asset-latency 0.2 --out profiles.json
+
+Runs against the local fixture site with a delay on /static/ assets (the
+CDN round trip a cold profile pays on every quote). Each run starts its own
+Chrome, loads the page and reads the Navigation Timing entry; warm runs
+should fetch the assets from disk cache (transfer size 0).
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from benchmarks import environment
+from benchmarks.fixture_server import serve_fixture
+from porter_api import core, profile
+
+TIMING_SCRIPT = """
+const nav = performance.getEntriesByType("navigation")[0];
+const assets = performance.getEntriesByType("resource").filter(r => r.name.includes("/static/"));
+return {
+    response_start: nav.responseStart,
+    dom_interactive: nav.domInteractive,
+    dom_content_loaded: nav.domContentLoadedEventEnd,
+    assets: assets.length,
+    assets_from_network: assets.filter(r => r.transferSize > 0).length,
+};
+"""
+
+
+def _median(values) -> float:
+    return round(statistics.median(values), 1) if values else None
+
+
+def run(mode: str, runs: int, url: str) -> dict:
+    launch_ms, ttfb_to_interactive, ttfb_to_dcl, network_assets = [], [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        driver = core.get_selenium_driver(remote_debugging_port=0)
+        launch_ms.append((time.perf_counter() - start) * 1000)
+        try:
+            driver.get(url)
+            timing = driver.execute_script(TIMING_SCRIPT)
+        finally:
+            driver.quit()
+        ttfb_to_interactive.append(timing["dom_interactive"] - timing["response_start"])
+        ttfb_to_dcl.append(timing["dom_content_loaded"] - timing["response_start"])
+        network_assets.append(timing["assets_from_network"])
+    return {
+        "mode": mode,
+        "runs": runs,
+        "launch_ms": _median(launch_ms),
+        "first_byte_to_interactive_ms": _median(ttfb_to_interactive),
+        "first_byte_to_dom_content_loaded_ms": _median(ttfb_to_dcl),
+        "assets_from_network": _median(network_assets),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--asset-latency", type=float, default=0.2, help="Seconds added to fixture /static/ assets")
+    parser.add_argument("--mode", choices=["cold", "warm", "both"], default="both")
+    parser.add_argument("--out", help="Write the results and the environment as JSON")
+    args = parser.parse_args()
+
+    env = environment.describe()
+    print(env)
+    server, url = serve_fixture(asset_latency=args.asset_latency)
+    modes = ["cold", "warm"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        warm = None
+        if mode == "warm":
+            warm = profile.WarmProfile(tempfile.mkdtemp(prefix="porter-template-"), refresh_interval=0, seed_url=url)
+            warm.seed()
+        profile.configure(warm)
+        results.append(run(mode, args.runs, url))
+        print(results[-1])
+    profile.configure(None)
+    server.shutdown()
+    if args.out:
+        environment.write_results(args.out, args, results, env)
@@ -0,0 +1,127 @@
+"""
+Memory and encode throughput of quote results: the original dicts + stdlib json vs. what production serves now.
+
+    python -m benchmarks.bench_records --quotes 10000 --per-result 4 --out records.json
+
+"legacy" builds results the way get_quote used to (dict literals, strftime
+timestamp per result) and encodes them with json.dumps, as requests and the
+journal did; per-quote backend payloads copy the request fields into a new
+dict. "current" runs the production path: PorterAPI parses the card texts
+and builds the result, and the same dict is encoded by the API response
+class, BackendSink.bodies and the JSONL journal.
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import environment
+from porter_api.core import PorterAPI, _parse_price_range, _parse_capacity, _parse_quote_card
+from porter_api.pipeline import REQUEST_FIELDS, BackendSink
+from porter_api.records import dumps
+
+REQUEST = {
+    "name": "Bench Mark", "phone": "9876543210", "pickup_address": "Koramangala, Bangalore",
+    "drop_address": "Indiranagar, Bangalore", "city": "Bangalore", "service_type": "trucks",
+    "reference_id": "ref-123", "reference_type": "order",
+}
+CARD = ("Tata Ace", "₹1,200 - ₹1,450", "750 kg")
+
+
+def build_legacy(results: int, per_result: int) -> list:
+    built = []
+    for _ in range(results):
+        quotes = []
+        for _ in range(per_result):
+            min_price, max_price = _parse_price_range(CARD[1])
+            quotes.append({
+                "vehicle_name": CARD[0], "price_range": CARD[1], "min_price": min_price, "max_price": max_price,
+                "capacity": CARD[2], "capacity_kg": _parse_capacity(CARD[2]),
+            })
+        built.append({
+            "success": True,
+            "pickup_address": REQUEST["pickup_address"],
+            "drop_address": REQUEST["drop_address"],
+            "city": REQUEST["city"],
+            "service_type": REQUEST["service_type"],
+            "user_name": REQUEST["name"],
+            "user_phone": REQUEST["phone"],
+            "quotes": quotes,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return built
+
+
+def build_current(results: int, per_result: int) -> list:
+    api = PorterAPI(name=REQUEST["name"], phone=REQUEST["phone"])
+    return [
+        api._quote_response(
+            REQUEST["pickup_address"], REQUEST["drop_address"], REQUEST["city"], REQUEST["service_type"],
+            [_parse_quote_card(*CARD) for _ in range(per_result)],
+        )
+        for _ in range(results)
+    ]
+
+
+def legacy_outputs(result: dict) -> int:
+    """Bytes for the API response, the per-quote backend saves and the journal line"""
+    size = len(json.dumps(result).encode())
+    base_payload = {field: REQUEST.get(field) for field in REQUEST_FIELDS}
+    for quote in result["quotes"]:
+        size += len(json.dumps(dict(base_payload, quote=quote)).encode())
+    return size + len(json.dumps({"request": REQUEST, "result": result}).encode())
+
+
+def current_outputs(sink: BackendSink):
+    def outputs(result: dict) -> int:
+        size = len(dumps(result))  # what main.RecordResponse.render returns
+        size += sum(len(body) for body in sink.bodies(REQUEST, result))
+        return size + len(dumps({"request": REQUEST, "result": result}))  # JSONLSink's line
+    return outputs
+
+
+def measure(name: str, build, outputs, results: int, per_result: int) -> dict:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        start = time.perf_counter()
+        built = build(results, per_result)
+        build_s = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    encoded = sum(outputs(result) for result in built)
+    encode_s = time.perf_counter() - start
+
+    quotes = results * per_result
+    return {
+        "format": name,
+        "quotes": quotes,
+        "memory_mb": round(memory / 1024 ** 2, 2),
+        "build_ms": round(build_s * 1000, 1),
+        "encode_quotes_per_s": round(quotes / encode_s),
+        "encoded_mb": round(encoded / 1024 ** 2, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=10000)
+    parser.add_argument("--per-result", type=int, default=4)
+    parser.add_argument("--out", help="Write the results and the environment as JSON")
+    args = parser.parse_args()
+
+    env = environment.describe()
+    print(env)
+    results = args.quotes // args.per_result
+    runs = [
+        measure("legacy", build_legacy, legacy_outputs, results, args.per_result),
+        measure("current", build_current, current_outputs(BackendSink("", per_quote=True)), results, args.per_result),
+    ]
+    for run in runs:
+        print(run)
+    if args.out:
+        environment.write_results(args.out, args, runs, env)
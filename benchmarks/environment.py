@@ -0,0 +1,48 @@
+"""
+The machine and browser a benchmark ran on, recorded next to its results.
+
+Numbers from these benchmarks only compare within one environment, so every
+benchmark prints this first and `--out` saves it with the results.
+"""
+import json
+import os
+import platform
+import subprocess
+from typing import Dict, List, Optional
+
+import selenium
+
+
+def _memory_gb() -> Optional[float]:
+    try:
+        return round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3, 1)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _chrome_version() -> Optional[str]:
+    from porter_api.cdp import find_chrome
+
+    try:
+        output = subprocess.run([find_chrome(), "--version"], capture_output=True, text=True, timeout=10)
+    except Exception:
+        return None
+    return output.stdout.strip() or None
+
+
+def describe() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "memory_gb": _memory_gb(),
+        "chrome": _chrome_version(),
+        "selenium": selenium.__version__,
+    }
+
+
+def write_results(path: str, args, results: List[Dict], environment: Dict):
+    """Save a run as JSON: its arguments, the environment and one entry per mode"""
+    with open(path, "w") as f:
+        json.dump({"args": vars(args), "environment": environment, "results": results}, f, indent=2)
+    print(f"💾 Results written to {path}")
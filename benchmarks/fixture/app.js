@@ -0,0 +1,91 @@
+// Minimal stand-in for porter.in's fare estimate flow. It keeps the same
+// class names the scraper targets and fetches results from /api/estimate so
+// that server-side latency behaves like the real site.
+(function () {
+  const $ = (sel, root) => (root || document).querySelector(sel);
+  const $$ = (sel, root) => Array.from((root || document).querySelectorAll(sel));
+  const state = { city: localStorage.getItem("city"), service: null, pickup: "", drop: "" };
+
+  const cityText = $(".CitySelector_city-selected-text__1dNz4");
+  const modal = $("#city-modal");
+  const form = $("#estimate-form");
+  const submit = $(".FormInput_submit__ea0jJ");
+  const results = $("#results");
+  if (state.city) cityText.textContent = state.city;
+
+  cityText.addEventListener("click", () => modal.classList.remove("hidden"));
+  $$(".CitySelectorModal_city-title__2fM8a").forEach((el) => el.addEventListener("click", () => {
+    state.city = el.textContent;
+    localStorage.setItem("city", state.city);
+    cityText.textContent = state.city;
+    modal.classList.add("hidden");
+  }));
+
+  $(".EstimateCard_estimate-card__NgFIr").addEventListener("click", () => form.classList.remove("hidden"));
+
+  $$(".CategorySelector_category-select-container__LgXjx").forEach((el) => el.addEventListener("click", () => {
+    $$(".CategorySelector_category-select-container__LgXjx").forEach((c) => c.classList.remove("selected"));
+    el.classList.add("selected");
+    state.service = el.dataset.service;
+    if (results.childElementCount) fetchResults();
+    refresh();
+  }));
+
+  $$("input[data-field]").forEach((input) => {
+    const list = input.parentElement.querySelector("ul");
+    input.addEventListener("input", () => {
+      state[input.dataset.field] = "";
+      list.innerHTML = "";
+      if (!input.value.trim()) return refresh();
+      [input.value, input.value + " Main Road"].forEach((text) => {
+        const li = document.createElement("li");
+        li.textContent = text;
+        li.addEventListener("click", () => {
+          input.value = text;
+          state[input.dataset.field] = text;
+          list.innerHTML = "";
+          refresh();
+        });
+        list.appendChild(li);
+      });
+      refresh();
+    });
+    input.addEventListener("keydown", (e) => {
+      if (e.key === "Enter" && list.firstChild) list.firstChild.click();
+    });
+  });
+
+  $$(".FareEstimateForms_mobile-input__jy5wR, .FareEstimateForms_name-input__n8xyD")
+    .forEach((el) => el.addEventListener("input", refresh));
+
+  function refresh() {
+    const ready = state.city && state.service && state.pickup && state.drop
+      && /^\d{10}$/.test($(".FareEstimateForms_mobile-input__jy5wR").value)
+      && $(".FareEstimateForms_name-input__n8xyD").value.trim();
+    submit.classList.toggle("FormInput_submit-enabled__DbSnE", !!ready);
+  }
+
+  function fetchResults() {
+    const query = new URLSearchParams({
+      city: state.city, service: state.service, pickup: state.pickup, drop: state.drop,
+    });
+    results.innerHTML = "";
+    fetch("/api/estimate?" + query).then((r) => r.json()).then((data) => {
+      results.innerHTML = "";
+      data.vehicles.forEach((v) => {
+        const card = document.createElement("div");
+        card.className = "FareEstimateResultVehicleCard_container__BdMav";
+        card.innerHTML =
+          '<div class="FareEstimateResultVehicleCard_vehicle-name__d4107"></div>' +
+          '<div class="FareEstimateResultVehicleCard_vehicle-fare__3YMOc"><p></p></div>' +
+          '<div class="VehicleCapacity_vehicle-capacity__P53Z0"></div>';
+        card.children[0].textContent = v.name;
+        card.children[1].firstChild.textContent = v.fare;
+        card.children[2].textContent = v.capacity;
+        results.appendChild(card);
+      });
+    });
+  }
+
+  submit.addEventListener("click", fetchResults);
+})();
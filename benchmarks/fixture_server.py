@@ -0,0 +1,102 @@
+"""
+Local stand-in for porter.in used by the benchmarks.
+
+Serves benchmarks/fixture/ (same class names as the live site) plus a
+deterministic /api/estimate endpoint with configurable latency.
+
+    python benchmarks/fixture_server.py --port 8765 --latency 0.3
+    PORTER_URL=http://127.0.0.1:8765/ python main.py ...
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixture")
+
+VEHICLES = {
+    "two_wheelers": [("2 Wheeler", 20)],
+    "trucks": [("3 Wheeler", 500), ("Tata Ace", 750), ("Pickup 8ft", 1250), ("Tata 407", 2500)],
+    "packers_and_movers": [("1 BHK Shifting", 1500), ("2 BHK Shifting", 2500)],
+}
+
+
+def estimate(city: str, service: str, pickup: str, drop: str) -> dict:
+    """Deterministic fares for a route, so repeated runs are comparable"""
+    seed = int(hashlib.md5(f"{city}|{pickup}|{drop}".encode()).hexdigest()[:6], 16)
+    vehicles = []
+    for i, (name, capacity) in enumerate(VEHICLES.get(service, VEHICLES["trucks"])):
+        low = 150 + (seed % 400) + i * 250
+        vehicles.append({
+            "name": name,
+            "fare": f"₹{low:,} - ₹{int(low * 1.05):,}",
+            "capacity": f"{capacity:,} kg",
+        })
+    return {"vehicles": vehicles}
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    asset_latency = 0.0
+    asset_max_age = 3600
+    static_asset = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURE_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        if self.static_asset:
+            self.send_header("Cache-Control", f"public, max-age={self.asset_max_age}")
+        super().end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.static_asset = url.path.startswith("/static/")
+        if url.path == "/api/estimate":
+            time.sleep(self.latency)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = json.dumps(estimate(
+                query.get("city", ""), query.get("service", ""),
+                query.get("pickup", ""), query.get("drop", ""),
+            )).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.static_asset:
+            time.sleep(self.asset_latency)
+            self.path = url.path[len("/static"):]
+        super().do_GET()
+
+
+def serve_fixture(port: int = 0, latency: float = 0.0, asset_latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fixture site in a daemon thread and return (server, base_url)"""
+    handler = type("Handler", (FixtureHandler,), {"latency": latency, "asset_latency": asset_latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to /api/estimate")
+    parser.add_argument("--asset-latency", type=float, default=0.0, help="Seconds added to /static/ assets (CDN round trip)")
+    args = parser.parse_args()
+
+    server, url = serve_fixture(args.port, args.latency, args.asset_latency)
+    print(f"🧪 Fixture site running at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,325 @@
+"""
+End-to-end load test of the FastAPI service and its SQS consumer on one machine.
+
+    python -m benchmarks.loadtest --rates 0.5,1,2,4 --step-seconds 60 --api-share 0.3
+
+Starts the fixture site, a stub save-quote backend, a local SQS (moto's
+server, or ElasticMQ / any endpoint via --sqs-endpoint) and `uvicorn
+main:app` wired to all three. Each step offers a fixed rate of mixed
+traffic, open loop: `--api-share` of it as POST /quote, the rest as SQS
+messages whose completion is seen when the backend receives their quotes.
+Every step reports achieved throughput, latency percentiles and the mean
+time per stage (scheduler wait, rate-limit wait, get_quote stages, backend
+save) from the app's /metrics. PORTER_* variables are passed to the app.
+
+With --max-p95 / --min-throughput it exits non-zero when the last step
+misses them, so it can gate performance regressions.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import boto3
+import requests
+
+from benchmarks.fixture_server import serve_fixture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITIES = ("Bangalore", "Mumbai", "Delhi", "Pune")
+SERVICES = ("trucks", "two_wheelers")
+
+# Histograms whose per-step mean makes up the stage breakdown
+STAGE_HISTOGRAMS = (
+    "porter_scheduler_wait_seconds",
+    "porter_ratelimit_wait_seconds",
+    "porter_quote_stage_seconds",
+    "porter_backend_save_seconds",
+)
+_SERIES = re.compile(r"^(\w+?)_(sum|count)(\{[^}]*\})? (\S+)$")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+
+# --- stand-ins -----------------------------------------------------------
+
+class StubBackend:
+    """save-quote endpoint that records when each reference_id's quotes arrived"""
+
+    def __init__(self):
+        self.received: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    reference_id = json.loads(body).get("reference_id")
+                except ValueError:
+                    reference_id = None
+                with backend._lock:
+                    backend.received.setdefault(reference_id, time.monotonic())
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def arrived(self, reference_id: str) -> Optional[float]:
+        with self._lock:
+            return self.received.get(reference_id)
+
+
+def start_sqs(endpoint: Optional[str]) -> Tuple[str, object]:
+    """(endpoint url, moto server or None)"""
+    if endpoint:
+        return endpoint, None
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit("Install moto (pip install 'moto[server]') or pass --sqs-endpoint for ElasticMQ")
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    return f"http://127.0.0.1:{port}", server
+
+
+def start_app(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if app.poll() is not None:
+            sys.exit(f"The app exited during startup (code {app.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/healthz", timeout=1).ok:
+                return app
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    app.terminate()
+    sys.exit("The app did not become healthy within 60s")
+
+
+# --- measurement ---------------------------------------------------------
+
+def scrape_histograms(app_url: str) -> Dict[str, Tuple[float, float]]:
+    """{'name{labels}': (sum, count)} for the stage histograms"""
+    out: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for line in requests.get(f"{app_url}/metrics", timeout=5).text.splitlines():
+        match = _SERIES.match(line)
+        if match and match.group(1) in STAGE_HISTOGRAMS:
+            name, part, labels, value = match.groups()
+            out[name + (labels or "")][0 if part == "sum" else 1] = float(value)
+    return {key: (s, c) for key, (s, c) in out.items()}
+
+
+def stage_breakdown(before: Dict, after: Dict) -> Dict[str, float]:
+    """Mean seconds per stage over a step, from histogram deltas"""
+    breakdown = {}
+    for key, (total, count) in sorted(after.items()):
+        prev_total, prev_count = before.get(key, (0.0, 0.0))
+        if count > prev_count:
+            breakdown[key.replace("porter_", "").replace("_seconds", "")] = round(
+                (total - prev_total) / (count - prev_count), 3
+            )
+    return breakdown
+
+
+def _message(i: int, reference_id: str) -> Dict:
+    return {
+        "name": "Load Test",
+        "phone": "9876543210",
+        "pickup_address": f"Koramangala {i}",
+        "drop_address": f"Indiranagar {i}",
+        "city": CITIES[i % len(CITIES)],
+        "service_type": SERVICES[i // len(CITIES) % len(SERVICES)],
+        "reference_id": reference_id,
+        "reference_type": "loadtest",
+    }
+
+
+def run_step(rate: float, seconds: float, api_share: float, drain: float, first: int,
+             app_url: str, sqs, queue_url: str, backend: StubBackend, pool: ThreadPoolExecutor) -> Dict:
+    """One open-loop step; routes are numbered from `first` so no step repeats (and dedupes) another's"""
+    before = scrape_histograms(app_url)
+    api_latencies: List[float] = []
+    api_errors = defaultdict(int)
+    sent: Dict[str, float] = {}
+    lock = threading.Lock()
+
+    def call_api(i: int):
+        body = _message(i, "")
+        start = time.monotonic()
+        try:
+            response = requests.post(f"{app_url}/quote", json=body, timeout=300)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        with lock:
+            if status == 200:
+                api_latencies.append(time.monotonic() - start)
+            else:
+                api_errors[str(status)] += 1
+
+    def send_message(i: int):
+        reference_id = uuid.uuid4().hex
+        sent_at = time.monotonic()
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(_message(i, reference_id)))
+        with lock:
+            sent[reference_id] = sent_at
+
+    # Open loop: work is offered on schedule whether or not earlier requests finished
+    start = time.monotonic()
+    offered = int(rate * seconds)
+    futures = []
+    for i in range(offered):
+        time.sleep(max(0.0, start + i / rate - time.monotonic()))
+        is_api = int((i + 1) * api_share) > int(i * api_share)
+        futures.append(pool.submit(call_api if is_api else send_message, first + i))
+    step_end = time.monotonic()
+
+    deadline = step_end + drain
+    while time.monotonic() < deadline:
+        with lock:
+            api_done = all(f.done() for f in futures)
+            queue_done = all(backend.arrived(ref) for ref in sent)
+        if api_done and queue_done:
+            break
+        time.sleep(0.5)
+    elapsed = time.monotonic() - start
+
+    queue_latencies = [backend.arrived(ref) - t for ref, t in sent.items() if backend.arrived(ref)]
+    return {
+        "offered_per_s": rate,
+        "offered": offered,
+        "api": {
+            "ok_per_s": round(len(api_latencies) / elapsed, 3),
+            "p50_s": _percentile(api_latencies, 0.5),
+            "p95_s": _percentile(api_latencies, 0.95),
+            "p99_s": _percentile(api_latencies, 0.99),
+            "errors": dict(api_errors),
+        },
+        "queue": {
+            "sent": len(sent),
+            "saved": len(queue_latencies),
+            "saved_per_s": round(len(queue_latencies) / elapsed, 3),
+            "p50_s": _percentile(queue_latencies, 0.5),
+            "p95_s": _percentile(queue_latencies, 0.95),
+        },
+        "stages_mean_s": stage_breakdown(before, scrape_histograms(app_url)),
+    }
+
+
+def _print_step(step: Dict):
+    api, q = step["api"], step["queue"]
+    print(f"📈 {step['offered_per_s']}/s offered | /quote {api['ok_per_s']}/s p50={api['p50_s']} p95={api['p95_s']} "
+          f"p99={api['p99_s']} errors={api['errors']} | queue {q['saved']}/{q['sent']} saved, {q['saved_per_s']}/s "
+          f"p50={q['p50_s']} p95={q['p95_s']}")
+    for stage, seconds in step["stages_mean_s"].items():
+        print(f"     {stage:<60} {seconds:>8.3f}s")
+
+
+def main(args):
+    fixture, fixture_url = serve_fixture(latency=args.latency)
+    backend = StubBackend()
+    sqs_endpoint, moto_server = start_sqs(args.sqs_endpoint)
+    credentials = {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_REGION": "us-east-1"}
+    sqs = boto3.client(
+        "sqs", endpoint_url=sqs_endpoint, region_name=credentials["AWS_REGION"],
+        aws_access_key_id="test", aws_secret_access_key="test",
+    )
+    queue_url = sqs.create_queue(QueueName=f"porter-loadtest-{uuid.uuid4().hex[:6]}")["QueueUrl"]
+
+    port = _free_port()
+    env = dict(
+        os.environ, **credentials,
+        PORTER_URL=fixture_url,
+        PORTER_BACKEND_URL=backend.url,
+        SQS_ENDPOINT_URL=sqs_endpoint,
+        SQS_QUEUE_URL=queue_url,
+        PORTER_DLQ_FILE=os.path.join(ROOT, "loadtest-dlq.jsonl"),
+        PYTHONUNBUFFERED="1",
+    )
+    app = start_app(port, env)
+    app_url = f"http://127.0.0.1:{port}"
+    print(f"🏋️ App on {app_url}, fixture {fixture_url}, SQS {sqs_endpoint}, backend {backend.url}")
+
+    steps = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+            first = 0
+            for rate in args.rates:
+                step = run_step(rate, args.step_seconds, args.api_share, args.drain_seconds, first,
+                                app_url, sqs, queue_url, backend, pool)
+                first += step["offered"]
+                steps.append(step)
+                _print_step(step)
+    finally:
+        app.terminate()
+        app.wait(30)
+        fixture.shutdown()
+        backend.server.shutdown()
+        if moto_server:
+            moto_server.stop()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "steps": steps}, f, indent=2)
+        print(f"💾 Curve written to {args.out}")
+
+    last = steps[-1]
+    throughput = last["api"]["ok_per_s"] + last["queue"]["saved_per_s"]
+    failures = []
+    if args.max_p95 is not None and (last["api"]["p95_s"] is None or last["api"]["p95_s"] > args.max_p95):
+        failures.append(f"/quote p95 {last['api']['p95_s']}s > {args.max_p95}s")
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        failures.append(f"throughput {throughput:.3f}/s < {args.min_throughput}/s")
+    if failures:
+        sys.exit("❌ " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rates", type=lambda v: [float(r) for r in v.split(",")], default=[0.5, 1, 2, 4],
+                        help="Offered requests+messages per second, one step each")
+    parser.add_argument("--step-seconds", type=float, default=60)
+    parser.add_argument("--drain-seconds", type=float, default=120, help="Wait after a step for in-flight work")
+    parser.add_argument("--api-share", type=float, default=0.3, help="Share of traffic sent to POST /quote")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fixture /api/estimate latency")
+    parser.add_argument("--sqs-endpoint", help="Existing SQS endpoint, e.g. ElasticMQ at http://localhost:9324")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Client threads")
+    parser.add_argument("--out", help="Write the throughput/latency curve as JSON")
+    parser.add_argument("--max-p95", type=float, help="Fail if the last step's /quote p95 exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if the last step completes less per second")
+    main(parser.parse_args())
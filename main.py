@@ -1,24 +1,47 @@
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from typing import Literal
-from pydantic import BaseModel, Field
-import requests
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 import json
 import boto3
 import time
-import uuid
-from botocore.exceptions import ClientError
 import threading
+from contextlib import ExitStack, closing
 
+from porter_api.address import route_key
+from porter_api.affinity import AffinityDispatcher, fresh_browser
 from porter_api.app import scrape_h2_heading
-from porter_api.core import PorterAPI
+from porter_api.cache import QuoteCache, RefreshAhead
+from porter_api.cdp import CDPBrowser
+from porter_api.core import BROWSER_ERROR, PorterAPI
+from porter_api.engines import CDPEngine
+from porter_api.dlq import JSONLDeadLetterQueue, SQSDeadLetterQueue
 from porter_api.exceptions import PorterAPIError
+from porter_api.health import OPEN, CircuitBreaker, QueueBacklog, autoscale_signal
+from porter_api.jobs import JobStore
+from porter_api.metrics import metrics
+from porter_api import profile, ratelimit
+from porter_api.pipeline import BackendSink, Pipeline, RetryPolicy, SQSSource
+from porter_api.records import dumps
+from porter_api.scheduler import BACKGROUND, INTERACTIVE, PriorityScheduler, parse_weights
+from porter_api.supervisor import BrowserSupervisor
+from porter_api.tracing import QuoteTracer, StageTimer
+
+class RecordResponse(ORJSONResponse):
+    """orjson response: quote results are encoded as built, without FastAPI's generic encoder walking them"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
 
 app = FastAPI(
     title="Porter Scraper API",
     description="An API to scrape delivery quotes from Porter.in using Selenium.",
     version="1.0.0",
+    default_response_class=RecordResponse,
 )
 
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -26,119 +49,319 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION")
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
 
-API_URL = "https://backend.railse.com/porter"
+API_URL = os.getenv("PORTER_BACKEND_URL", "https://backend.railse.com/porter")
+# Points boto3 at a local SQS stand-in (ElasticMQ, moto) instead of AWS
+SQS_ENDPOINT_URL = os.getenv("SQS_ENDPOINT_URL")
+SQS_CONFIGURED = all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, SQS_QUEUE_URL])
+STARTED_AT = time.time()
+
+# Long-lived, supervised Chrome processes shared by all quotes.
+# PORTER_BROWSERS=0 keeps the default of one fresh Chrome per quote.
+BROWSER_POOL_SIZE = int(os.getenv("PORTER_BROWSERS", "0"))
+browser_supervisor = BrowserSupervisor(
+    browsers=BROWSER_POOL_SIZE,
+    contexts_per_browser=int(os.getenv("PORTER_CONTEXTS_PER_BROWSER", "4")),
+    max_quotes=int(os.getenv("PORTER_RECYCLE_AFTER_QUOTES", "50")),
+    max_age=float(os.getenv("PORTER_RECYCLE_AFTER_SECONDS", "1800")),
+    max_rss_mb=float(os.getenv("PORTER_RECYCLE_RSS_MB", "1500")),
+) if BROWSER_POOL_SIZE else None
+# Seconds a scrape waits for a free browser context before giving up with a retryable error
+LEASE_TIMEOUT = float(os.getenv("PORTER_LEASE_TIMEOUT_SECONDS", "30"))
+
+# Every new Chrome starts from a clone of a template profile whose HTTP cache already holds
+# porter.in's assets, re-seeded every PORTER_PROFILE_REFRESH_SECONDS. Unset PORTER_PROFILE_DIR = fresh profiles.
+PROFILE_DIR = os.getenv("PORTER_PROFILE_DIR")
+warm_profile = profile.WarmProfile(
+    PROFILE_DIR,
+    refresh_interval=float(os.getenv("PORTER_PROFILE_REFRESH_SECONDS", "3600")),
+    clone_root=os.getenv("PORTER_PROFILE_CLONE_DIR"),
+) if PROFILE_DIR else None
+profile.configure(warm_profile)
+
+# Shared scraping capacity: /quote, quote jobs and the SQS consumer all run here.
+# Interactive requests get a reserved share and preempt queued background work.
+SCRAPE_WORKERS = int(os.getenv(
+    "PORTER_SCRAPE_WORKERS",
+    BROWSER_POOL_SIZE * browser_supervisor.contexts_per_browser if browser_supervisor else 2,
+))
+scheduler = PriorityScheduler(
+    workers=SCRAPE_WORKERS,
+    weights=parse_weights(os.getenv("PORTER_SCHEDULER_WEIGHTS", "")),
+    reserved_interactive=int(os.getenv("PORTER_RESERVED_INTERACTIVE", "1")),
+)
 
-def process_message(message: dict):
-    print(f"Processing message: {message['MessageId']}")
-    try:
-        body = json.loads(message['Body'])
-        print(f"Message body: {body}")
-
-        name = body.get('name')
-        phone = body.get('phone')
-        pickup_address = body.get('pickup_address')
-        drop_address = body.get('drop_address')
-        city = body.get('city')
-        service_type = body.get('service_type')
-        reference_id = body.get('reference_id')
-        reference_type = body.get('reference_type')
-
-        if not all([pickup_address, drop_address, reference_id, reference_type]):
-            print("Required fields are missing. Skipping message.")
-            return True # Mark as processed to avoid re-queueing a bad message
-        
-        api = PorterAPI(
-            name=name,
-            phone=phone,
-            headless=True  # Set to True for headless mode, useful for production
-        )
+job_store = JobStore(
+    max_jobs=int(os.getenv("PORTER_MAX_JOBS", "1000")),
+    ttl=float(os.getenv("PORTER_JOB_TTL_SECONDS", "3600")),
+)
+# Hosts a job's callback_url may point at (comma-separated, https only); unset = callbacks are refused
+CALLBACK_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("PORTER_CALLBACK_HOSTS", "").split(",") if host.strip()
+)
 
-        quote_result = api.get_quote(
-            pickup_address=pickup_address,
-            drop_address=drop_address,
-            city=city,
-            service_type=service_type,
-        )
+# Token-bucket limit on porter.in navigations, shared by every worker process on the host
+# (or every host with PORTER_RATE_LIMIT_REDIS_URL). PORTER_RATE_LIMIT_PER_MINUTE=0 disables it.
+RATE_LIMIT_PER_MINUTE = float(os.getenv("PORTER_RATE_LIMIT_PER_MINUTE", "0"))
+CITY_RATE_LIMIT_PER_MINUTE = float(os.getenv("PORTER_CITY_RATE_LIMIT_PER_MINUTE", "0"))
+if RATE_LIMIT_PER_MINUTE or CITY_RATE_LIMIT_PER_MINUTE:
+    RATE_LIMIT_REDIS_URL = os.getenv("PORTER_RATE_LIMIT_REDIS_URL")
+    ratelimit.configure(ratelimit.RateLimiter(
+        backend=ratelimit.RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL
+        else ratelimit.FileBackend(os.getenv("PORTER_RATE_LIMIT_FILE", "/tmp/porter-ratelimit.json")),
+        per_minute=RATE_LIMIT_PER_MINUTE,
+        burst=float(os.getenv("PORTER_RATE_LIMIT_BURST", "5")),
+        city_per_minute=CITY_RATE_LIMIT_PER_MINUTE,
+        timeout=float(os.getenv("PORTER_RATE_LIMIT_TIMEOUT_SECONDS", "60")),
+    ))
+
+# Chrome-trace files for a sampled share of quotes (PORTER_TRACE_SAMPLE_RATE=0 disables it)
+TRACE_SAMPLE_RATE = float(os.getenv("PORTER_TRACE_SAMPLE_RATE", "0"))
+quote_tracer = QuoteTracer(
+    trace_dir=os.getenv("PORTER_TRACE_DIR", "traces"),
+    sample_rate=TRACE_SAMPLE_RATE,
+) if TRACE_SAMPLE_RATE else None
+# Per-stage durations for every quote, exported at /metrics
+quote_hooks = [StageTimer()] + ([quote_tracer] if quote_tracer else [])
+
+def browsers_busy_response(error: PorterAPIError) -> dict:
+    return {
+        "success": False,
+        "error": "All browsers are busy right now ⏳",
+        "details": str(error),
+        "suggestion": "Try again in a few seconds",
+        "error_type": "busy",
+        "retry_after": 5.0,
+    }
 
-        print(f"Quote result for reference_id {reference_id}: {quote_result}")
+def run_get_quote(api: PorterAPI, **kwargs) -> dict:
+    """Run get_quote on a supervised browser context when the pool is enabled"""
+    if browser_supervisor is None:
+        return api.get_quote(**kwargs)
+    with ExitStack() as stack:
+        try:
+            context = stack.enter_context(browser_supervisor.lease(timeout=LEASE_TIMEOUT))
+        except PorterAPIError as e:
+            return browsers_busy_response(e)
+        return api.get_quote(**kwargs, driver=context)
+
+def scrape_request(request: dict, driver=None, page_state=None) -> dict:
+    """Scrape a quote for a QuoteRequest-shaped dict (on `driver`, e.g. a warm session, if given)."""
+    api = PorterAPI(
+        name=request["name"], phone=request["phone"], headless=True,
+        hooks=quote_hooks,
+    )
+    route = dict(
+        pickup_address=request["pickup_address"],
+        drop_address=request["drop_address"],
+        city=request["city"],
+        service_type=request["service_type"],
+    )
+    if driver is not None:
+        return api.get_quote(**route, driver=driver, page_state=page_state)
+    return run_get_quote(api, **route)
 
-        if not quote_result.get("success"):
-            print(f"   -> Scraping failed for reference_id: {reference_id}. Error: {quote_result.get('error')}")
-            # Do not delete the message, let it be re-processed after visibility timeout
-            return True
-        
-        quotes_list = quote_result.get("quotes", [])
-        if not quotes_list:
-            print(f"  -> No quotes found to save for reference_id: {reference_id}. Marking as complete.")
-            return True # Nothing to save, so the message is successfully processed
-        
-        save_payload = {
-            "name": name,
-            "phone": phone,
-            "pickup_address": pickup_address,
-            "drop_address": drop_address,
-            "city": city,
-            "service_type": service_type,
-            "reference_id": reference_id,
-            "reference_type": reference_type,
-            "quotes": quotes_list
-        }
-
-        print(f"  -> Saving {len(quotes_list)} quotes for reference_id: {reference_id}...")
-
-        response = requests.post(f"{API_URL}/save-quote", json=save_payload)
-
-        print("Response = ", response)
-
-        if response.status_code == 200:
-            print(f"  -> Successfully processed and saved quotes for reference_id: {reference_id}")
-            return True
-        else:
-            print(f"  -> FAILED to save quotes. Status: {response.status_code}, Response: {response.text}")
-            return False
-    except Exception as e:
-        print(f"An error occurred while processing the message: {e}")
-        return False
+ROUTE_FIELDS = ("pickup_address", "drop_address", "city", "service_type")
+
+def request_route_key(request: dict) -> str:
+    return route_key(
+        request["pickup_address"], request["drop_address"],
+        request["city"], request["service_type"],
+    )
+
+def cached_quote(request: dict):
+    """Return a cached result for the request's route (personalised for the caller), or None."""
+    if quote_cache is None:
+        return None
+    key = request_route_key(request)
+    if refresher:
+        # Only the route is kept; the caller's name and phone never go into refreshes
+        refresher.record(key, {field: request[field] for field in ROUTE_FIELDS})
+    cached = quote_cache.get(key)
+    if cached is None:
+        return None
+    return {**cached, "user_name": request["name"], "user_phone": request["phone"]}
+
+# Stops scraping after PORTER_BREAKER_FAILURES failed scrapes in a row, for PORTER_BREAKER_RESET_SECONDS
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("PORTER_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("PORTER_BREAKER_RESET_SECONDS", "30")),
+)
+
+def circuit_open_response() -> dict:
+    """A refusal, not a failed scrape: `retry_after` tells the pipeline not to count it as an attempt."""
+    retry_after = breaker.retry_after()
+    return {
+        "success": False,
+        "error": "Porter.in scrapes are failing, pausing for a moment 🔌",
+        "details": f"{breaker.failure_threshold} scrapes in a row failed",
+        "suggestion": f"Try again in {retry_after:.0f}s",
+        "error_type": "circuit_open",
+        "retry_after": retry_after,
+    }
+
+def scrape_and_cache(request: dict, driver=None, page_state=None, cache: bool = True) -> dict:
+    if not breaker.allow():
+        return circuit_open_response()
+    try:
+        result = scrape_request(request, driver=driver, page_state=page_state)
+    except Exception:
+        breaker.record_result(None)
+        raise
+    # Only browser errors and timeouts count against porter.in, not bad input or a busy pool
+    breaker.record_result(result)
+    if cache and quote_cache is not None and result.get("success"):
+        quote_cache.put(request_route_key(request), result)
+    return result
+
+# Quote cache keyed by canonical route (PORTER_CACHE_TTL_SECONDS=0 disables it), and
+# refresh-ahead of hot routes in idle capacity (PORTER_REFRESH_BUDGET_PER_MINUTE=0 disables it)
+CACHE_TTL = float(os.getenv("PORTER_CACHE_TTL_SECONDS", "0"))
+REFRESH_BUDGET = float(os.getenv("PORTER_REFRESH_BUDGET_PER_MINUTE", "6"))
+quote_cache = QuoteCache(
+    ttl=CACHE_TTL,
+    max_entries=int(os.getenv("PORTER_CACHE_MAX_ENTRIES", "10000")),
+) if CACHE_TTL else None
+# Refreshes fill in porter.in's form as the service (PORTER_REFRESH_PHONE is required), never as a past caller
+REFRESH_NAME = os.getenv("PORTER_REFRESH_NAME", "Porter Scraper")
+REFRESH_PHONE = os.getenv("PORTER_REFRESH_PHONE")
+if quote_cache is not None and REFRESH_BUDGET and not REFRESH_PHONE:
+    print("⚠️ Refresh-ahead is off: set PORTER_REFRESH_PHONE to the service's phone number to enable it")
+
+def refresh_route(route: dict) -> dict:
+    """Refresh-ahead scrape of a route: through the circuit breaker, under the service identity."""
+    # RefreshAhead stores the refreshed result itself
+    return scrape_and_cache({**route, "name": REFRESH_NAME, "phone": REFRESH_PHONE}, cache=False)
+
+refresher = RefreshAhead(
+    quote_cache,
+    scheduler,
+    refresh_route,
+    top_n=int(os.getenv("PORTER_REFRESH_TOP_N", "50")),
+    refresh_window=float(os.getenv("PORTER_REFRESH_WINDOW_SECONDS", "120")),
+    budget_per_minute=REFRESH_BUDGET,
+) if quote_cache is not None and REFRESH_BUDGET and REFRESH_PHONE else None
+if refresher:
+    PorterAPI(name=REFRESH_NAME, phone=REFRESH_PHONE)  # fail at startup on an invalid service phone
+
+# PORTER_ENGINE=cdp serves /quote from one Chrome driven over raw CDP on the event loop,
+# so in-flight quotes cost a coroutine instead of a thread (queue work stays on the scheduler).
+# That Chrome is relaunched if it dies and recycled under the same PORTER_RECYCLE_* limits.
+SCRAPE_ENGINE = os.getenv("PORTER_ENGINE", "selenium")
+cdp_browser = CDPBrowser(
+    max_pages=int(os.getenv("PORTER_RECYCLE_AFTER_QUOTES", "50")),
+    max_age=float(os.getenv("PORTER_RECYCLE_AFTER_SECONDS", "1800")),
+    max_rss_mb=float(os.getenv("PORTER_RECYCLE_RSS_MB", "1500")),
+) if SCRAPE_ENGINE == "cdp" else None
+cdp_slots = asyncio.Semaphore(int(os.getenv("PORTER_CDP_CONCURRENCY", "50")))
+
+async def scrape_with_cdp(api: PorterAPI, request: dict) -> dict:
+    if not breaker.allow():
+        return circuit_open_response()
+    return await run_cdp_quote(api, request)
+
+async def run_cdp_quote(api: PorterAPI, request: dict) -> dict:
+    """A CDP engine scrape the breaker already let through; cancelling it releases the breaker"""
+    try:
+        async with cdp_slots:
+            result = await CDPEngine(api, cdp_browser).get_quote(
+                request["pickup_address"], request["drop_address"],
+                request["city"], request["service_type"],
+            )
+    except asyncio.CancelledError:
+        # The client went away; that says nothing about porter.in
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_result(None)
+        raise
+    breaker.record_result(result)
+    if quote_cache is not None and result.get("success"):
+        quote_cache.put(request_route_key(request), result)
+    return result
+
+# Queue work grouped by city/service onto warm browser sessions (PORTER_AFFINITY_WORKERS=0 disables it).
+# Scrapes still run in the scheduler's background lane, so /quote keeps its share. Warm sessions
+# keep their browser context between jobs, so at least one context is always left for everything else.
+AFFINITY_WORKERS = int(os.getenv("PORTER_AFFINITY_WORKERS", "0"))
+if browser_supervisor and AFFINITY_WORKERS >= BROWSER_POOL_SIZE * browser_supervisor.contexts_per_browser:
+    AFFINITY_WORKERS = BROWSER_POOL_SIZE * browser_supervisor.contexts_per_browser - 1
+    print(f"⚠️ PORTER_AFFINITY_WORKERS capped at {AFFINITY_WORKERS} to leave a browser context for /quote")
+affinity_dispatcher = AffinityDispatcher(
+    scrape_and_cache,
+    workers=AFFINITY_WORKERS,
+    session_factory=(lambda: browser_supervisor.lease(timeout=LEASE_TIMEOUT)) if browser_supervisor else fresh_browser,
+    max_wait=float(os.getenv("PORTER_AFFINITY_MAX_WAIT_SECONDS", "30")),
+    session_quotes=int(os.getenv("PORTER_AFFINITY_SESSION_QUOTES", "50")),
+    run_task=lambda fn: scheduler.submit(fn, priority=BACKGROUND).result(),
+) if AFFINITY_WORKERS else None
+
+def quote_in_background(request: dict) -> dict:
+    """Scrape stage for queue work: cache first, then warm workers or the scheduler's background lane."""
+    cached = cached_quote(request)
+    if cached is not None:
+        return cached
+    if affinity_dispatcher:
+        return affinity_dispatcher.submit(request).result()
+    return scheduler.submit(scrape_and_cache, request, priority=BACKGROUND).result()
+
+def make_sqs_client():
+    return boto3.client(
+        'sqs',
+        region_name=AWS_REGION,
+        endpoint_url=SQS_ENDPOINT_URL,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+
+# Queue depth for /autoscale, read from SQS at most every PORTER_SQS_DEPTH_TTL_SECONDS
+sqs_backlog = QueueBacklog(
+    make_sqs_client(),
+    SQS_QUEUE_URL,
+    ttl=float(os.getenv("PORTER_SQS_DEPTH_TTL_SECONDS", "15")),
+) if SQS_CONFIGURED else None
+
+# Failed messages come back after PORTER_RETRY_BASE_SECONDS, doubling per receive up to PORTER_RETRY_MAX_SECONDS.
+# Invalid ones, and ones failing PORTER_MAX_RECEIVES times, go to PORTER_DLQ_URL (an SQS queue) or PORTER_DLQ_FILE.
+retry_policy = RetryPolicy(
+    base_delay=float(os.getenv("PORTER_RETRY_BASE_SECONDS", "30")),
+    max_delay=float(os.getenv("PORTER_RETRY_MAX_SECONDS", "3600")),
+    max_attempts=int(os.getenv("PORTER_MAX_RECEIVES", "5")),
+)
+DLQ_URL = os.getenv("PORTER_DLQ_URL")
+DLQ_FILE = os.getenv("PORTER_DLQ_FILE", "dlq.jsonl")
+
+# Readiness fails above this many queued scrapes; /autoscale aims for the target utilization
+READY_MAX_QUEUE = int(os.getenv("PORTER_READY_MAX_QUEUE", str(4 * SCRAPE_WORKERS)))
+AUTOSCALE_TARGET_UTILIZATION = float(os.getenv("PORTER_AUTOSCALE_TARGET_UTILIZATION", "0.7"))
+AUTOSCALE_BACKLOG_PER_WORKER = float(os.getenv("PORTER_AUTOSCALE_BACKLOG_PER_WORKER", "5"))
 
 def poll_sqs_queue():
     """
     The main loop for the SQS consumer. This function will run in a background thread.
+    Messages flow through the streaming pipeline and are saved to the backend in one call per message.
     """
     print("SQS Polling thread started...")
-    if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, SQS_QUEUE_URL]):
+    if not SQS_CONFIGURED:
         print("AWS/SQS environment variables not configured. SQS thread exiting.")
         return
 
-    sqs = boto3.client(
-        'sqs',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    sqs = make_sqs_client()
+    # With warm workers a whole receive batch is handed over at once, so it can be grouped by city
+    workers = max(SCRAPE_WORKERS, 10) if affinity_dispatcher else SCRAPE_WORKERS
+    pipeline = Pipeline(
+        # Only as many messages as there are workers are received (none while the circuit
+        # breaker is open), and their visibility is kept extended
+        SQSSource(sqs, SQS_QUEUE_URL, max_in_flight=workers, pause=breaker.retry_after),
+        sinks=[BackendSink(API_URL)],
+        scrape=quote_in_background,
+        retry_policy=retry_policy,
+        dead_letter=SQSDeadLetterQueue(sqs, DLQ_URL) if DLQ_URL else JSONLDeadLetterQueue(DLQ_FILE),
+        workers=workers,
     )
 
     while True:
         try:
-            receive_attempt_id = str(uuid.uuid4())
-            response = sqs.receive_message(
-                QueueUrl=SQS_QUEUE_URL,
-                MaxNumberOfMessages=1,
-                WaitTimeSeconds=20,
-                MessageAttributeNames=['All'],
-                ReceiveRequestAttemptId=receive_attempt_id
-            )
-            messages = response.get('Messages', [])
-            if not messages:
-                continue
-
-            for message in messages:
-                if process_message(message):
-                    sqs.delete_message(
-                        QueueUrl=SQS_QUEUE_URL,
-                        ReceiptHandle=message['ReceiptHandle']
-                    )
-        except ClientError as e:
-            print(f"A Boto3 client error occurred in SQS thread: {e}")
-            time.sleep(10)
+            pipeline.run()
         except Exception as e:
             print(f"An unexpected error occurred in SQS thread: {e}")
             time.sleep(20)
@@ -152,11 +375,37 @@ async def startup_event():
     function in a separate, non-blocking thread.
     """
     print("Application startup...")
+    if cdp_browser:
+        await cdp_browser.start()
+    if warm_profile:
+        # Seeding loads porter.in once; quotes started before it finishes use cold profiles
+        threading.Thread(target=warm_profile.start, name="profile-seed", daemon=True).start()
+    if browser_supervisor:
+        browser_supervisor.start()
+        print(f"Browser supervisor started with {BROWSER_POOL_SIZE} browser(s).")
+    if refresher:
+        refresher.start()
+        print("Refresh-ahead scheduler started.")
     thread = threading.Thread(target=poll_sqs_queue)
     thread.daemon = True  # Allows main thread to exit even if this thread is running
     thread.start()
     print("SQS consumer thread launched in the background.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Quit supervised browsers so no Chrome processes outlive the app."""
+    if cdp_browser:
+        await cdp_browser.close()
+    if refresher:
+        refresher.stop()
+    if warm_profile:
+        warm_profile.stop()
+    if affinity_dispatcher:
+        affinity_dispatcher.shutdown(wait=False)
+    scheduler.shutdown(wait=False)
+    if browser_supervisor:
+        browser_supervisor.stop()
+
 class QuoteRequest(BaseModel):
     """Defines the structure for a quote request."""
     name: str = Field(..., example="Amit Shah", description="Your full name.")
@@ -167,6 +416,23 @@ class QuoteRequest(BaseModel):
     service_type: Literal["trucks", "two_wheelers", "packers_and_movers"] = Field(default="trucks", example="trucks")
 
 
+class QuoteJobRequest(QuoteRequest):
+    """A quote request to run in the background."""
+    callback_url: Optional[HttpUrl] = Field(default=None, example="https://example.com/porter-webhook", description="Optional https URL to POST the finished job to (host must be in PORTER_CALLBACK_HOSTS).")
+
+    @field_validator("callback_url")
+    @classmethod
+    def check_callback_host(cls, url: Optional[HttpUrl]) -> Optional[HttpUrl]:
+        # The server POSTs to this URL, so only allowlisted hosts: no internal addresses or metadata endpoints
+        if url is None:
+            return url
+        if url.scheme != "https":
+            raise ValueError("callback_url must use https")
+        if (url.host or "").lower() not in CALLBACK_HOSTS:
+            raise ValueError(f"callback_url host '{url.host}' is not allowed (see PORTER_CALLBACK_HOSTS)")
+        return url
+
+
 @app.get("/")
 def read_root():
     """A root endpoint to confirm the API is running."""
@@ -176,6 +442,79 @@ def read_root():
         "usage_docs": "/docs"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+def metrics_endpoint():
+    """Prometheus metrics (browser memory, recycle events, ...)."""
+    return metrics.render()
+
+@app.get("/scheduler", tags=["Monitoring"])
+def scheduler_endpoint():
+    """Queued and running scrapes per priority class."""
+    return {"workers": scheduler.workers, "weights": scheduler.weights, "lanes": scheduler.stats()}
+
+@app.get("/cache", tags=["Monitoring"])
+def cache_endpoint():
+    """Quote cache size, hit rate, and what refresh-ahead gained versus what it cost."""
+    if quote_cache is None:
+        return {"enabled": False}
+    stats = {"enabled": True, "entries": len(quote_cache), "ttl_seconds": quote_cache.ttl}
+    if refresher:
+        stats["refresh_ahead"] = refresher.stats()
+    return stats
+
+@app.get("/affinity", tags=["Monitoring"])
+def affinity_endpoint():
+    """Warm workers' page states, affinity hit rate and the scrape time warm pages saved."""
+    if affinity_dispatcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **affinity_dispatcher.stats()}
+
+@app.get("/healthz", tags=["Monitoring"])
+def healthz():
+    """Liveness: the app answers, its scrape workers are running and the CDP engine's Chrome is up
+    (it relaunches itself within seconds, so a lasting failure means it can't). Never talks to a browser."""
+    alive = scheduler.alive_workers()
+    ok = alive == scheduler.workers
+    body = {"scrape_workers_alive": alive, "uptime_seconds": round(time.time() - STARTED_AT)}
+    if cdp_browser:
+        ok = ok and cdp_browser.running
+        body["cdp_browser"] = {"running": cdp_browser.running, "relaunches": cdp_browser.relaunches}
+    return RecordResponse({"status": "ok" if ok else "degraded", **body}, status_code=200 if ok else 503)
+
+@app.get("/readyz", tags=["Monitoring"])
+def readyz():
+    """Readiness: browsers are up, the scrape queue is not backed up and the circuit is not open."""
+    checks = {}
+    if browser_supervisor:
+        healthy = browser_supervisor.healthy()
+        checks["browsers"] = {"ok": healthy > 0, "healthy": healthy, "free_contexts": browser_supervisor.available()}
+    if cdp_browser:
+        checks["cdp_browser"] = {"ok": cdp_browser.running}
+    queued = scheduler.queue_depth()
+    checks["queue"] = {"ok": queued <= READY_MAX_QUEUE, "queued": queued, "max": READY_MAX_QUEUE}
+    circuit = breaker.stats()
+    checks["circuit"] = {"ok": circuit["state"] != OPEN, **circuit}
+
+    ready = all(check["ok"] for check in checks.values())
+    return RecordResponse({"ready": ready, "checks": checks}, status_code=200 if ready else 503)
+
+@app.get("/autoscale", tags=["Monitoring"])
+def autoscale():
+    """
+    Scaling signal for the orchestrator: local saturation combined with the SQS backlog.
+    Target an average `signal` of 1 per pod.
+    """
+    lanes = scheduler.stats()
+    backlog = sqs_backlog.get() if sqs_backlog else None
+    return autoscale_signal(
+        running=sum(lane["running"] for lane in lanes.values()),
+        queued=sum(lane["queued"] for lane in lanes.values()),
+        capacity=scheduler.workers,
+        backlog=backlog["visible"] if backlog else None,
+        target_utilization=AUTOSCALE_TARGET_UTILIZATION,
+        backlog_per_worker=AUTOSCALE_BACKLOG_PER_WORKER,
+    )
+
 @app.get("/test", tags=["Testing"])
 def test_endpoint():
     """
@@ -214,17 +553,19 @@ async def get_quote_endpoint(request: QuoteRequest):
     try:
         print(f"Received quote request for {request.name} in {request.city}")
         
-        # Initialize the PorterAPI with data from the request.
-        # headless=True is essential for running in Docker.
-        api = PorterAPI(name=request.name, phone=request.phone, headless=True)
-
-        # Call the get_quote method from your core scraping logic
-        quote_result = api.get_quote(
-            pickup_address=request.pickup_address,
-            drop_address=request.drop_address,
-            city=request.city,
-            service_type=request.service_type,
-        )
+        # Validate the user details before touching the cache or a browser
+        api = PorterAPI(name=request.name, phone=request.phone, headless=True, hooks=quote_hooks)
+
+        # Serve hot routes from the cache; otherwise scrape on the shared
+        # scraping capacity, so the event loop stays free while Chrome works
+        request_data = request.model_dump()
+        quote_result = cached_quote(request_data)
+        if quote_result is None and cdp_browser is not None:
+            quote_result = await scrape_with_cdp(api, request_data)
+        elif quote_result is None:
+            quote_result = await asyncio.wrap_future(
+                scheduler.submit(scrape_and_cache, request_data, priority=INTERACTIVE)
+            )
 
         # The scraper returns a dictionary with a 'success' key.
         # We check this to determine the outcome.
@@ -243,16 +584,26 @@ async def get_quote_endpoint(request: QuoteRequest):
             #         detail="Failed to update quote in backend."
             #     )
 
-            return quote_result
+            # Returned as a response so FastAPI's generic encoder doesn't walk the record
+            return RecordResponse(quote_result)
         else:
             # If the scrape was not successful, the scraper returns a
             # structured error message which we can pass to the user.
             print(f"Scraping failed: {quote_result.get('error')}")
+            if "retry_after" in quote_result:
+                # Refused before scraping (circuit open, no free browser): try again later
+                raise HTTPException(
+                    status_code=503,
+                    detail=quote_result,
+                    headers={"Retry-After": str(max(1, round(quote_result["retry_after"])))},
+                )
             raise HTTPException(
                 status_code=400, # Bad Request
                 detail=quote_result
             )
 
+    except HTTPException:
+        raise
     except PorterAPIError as e:
         # This catches validation errors, like an invalid phone number.
         print(f"Validation Error: {e}")
@@ -263,4 +614,213 @@ async def get_quote_endpoint(request: QuoteRequest):
         raise HTTPException(
             status_code=500, # Internal Server Error
             detail=f"An unexpected internal error occurred. Please check the server logs."
-        )
\ No newline at end of file
+        )
+
+
+def stream_error(e: Exception) -> dict:
+    print(f"An unexpected error occurred while streaming a quote: {e}")
+    return {"success": False, "error": f"Unexpected error: {e}", "error_type": BROWSER_ERROR}
+
+def stream_quote(request: dict, emit, cancelled: threading.Event) -> None:
+    """Scheduler task for /quote/stream (already let through by the breaker): pass every iter_quote
+    event to `emit`, caching a successful result. Stops the scrape once `cancelled` is set."""
+    api = PorterAPI(name=request["name"], phone=request["phone"], headless=True, hooks=quote_hooks)
+    route = {field: request[field] for field in ROUTE_FIELDS}
+    result = None
+    abandoned = False
+    try:
+        # The context is closed after the last event was emitted, off the response path
+        with ExitStack() as stack:
+            context = None
+            if browser_supervisor is not None:
+                try:
+                    context = stack.enter_context(browser_supervisor.lease(timeout=LEASE_TIMEOUT))
+                except PorterAPIError as e:
+                    result = browsers_busy_response(e)
+                    emit(("error", result))
+                    return
+            for event in stack.enter_context(closing(api.iter_quote(**route, driver=context))):
+                if cancelled.is_set():
+                    # Closing iter_quote quits its browser; the lease goes back to the pool
+                    print("🔌 Stream client went away, stopping its scrape")
+                    abandoned = True
+                    break
+                emit(event)
+                result = event[1]
+    except Exception as e:
+        result = None
+        emit(("error", stream_error(e)))
+    finally:
+        if abandoned:
+            breaker.release()  # says nothing about porter.in
+        else:
+            breaker.record_result(result)
+    if quote_cache is not None and result is not None and result.get("success"):
+        quote_cache.put(request_route_key(request), result)
+
+async def stream_with_cdp(api: PorterAPI, request: dict, emit) -> None:
+    """/quote/stream on the CDP engine (already let through by the breaker). The engine reads
+    every card at once, so the context and quotes arrive together once the scrape is done."""
+    try:
+        result = await run_cdp_quote(api, request)
+    except Exception as e:
+        emit(("error", stream_error(e)))
+        return
+    if result.get("success"):
+        for event in cached_events(result):
+            emit(event)
+    else:
+        emit(("error", result))
+
+
+def cached_events(result) -> list:
+    """The iter_quote events for an already finished result"""
+    context = {field: result[field] for field in (
+        "pickup_address", "drop_address", "city", "service_type", "user_name", "user_phone",
+    )}
+    return [("context", context)] + [("quote", quote) for quote in result["quotes"]] + [("done", result)]
+
+
+def _format_event(event: str, payload, fmt: str) -> bytes:
+    if event == "done":
+        # Every quote has already been sent; the final event only closes the stream
+        payload = {"success": True, "quotes": len(payload["quotes"]), "timestamp": payload["timestamp"]}
+    if fmt == "ndjson":
+        return dumps({"event": event, "data": payload}) + b"\n"
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), dumps(payload))
+
+
+# Seconds between checks for a stream client that went away without the server noticing
+STREAM_DISCONNECT_CHECK = 1.0
+
+@app.post("/quote/stream", tags=["Scraping"])
+async def stream_quote_endpoint(request: QuoteRequest, http_request: Request, format: Literal["sse", "ndjson"] = "sse"):
+    """
+    Like `/quote`, but streams events as soon as each is known: `context` (the route),
+    one `quote` per vehicle as its card is parsed, then `done` or `error`.
+    Server-Sent Events by default, newline-delimited JSON with `?format=ndjson`.
+    If the client disconnects, the scrape is stopped and its browser freed.
+    """
+    try:
+        # validate before streaming
+        api = PorterAPI(name=request.name, phone=request.phone, headless=True, hooks=quote_hooks)
+    except PorterAPIError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    request_data = request.model_dump()
+    cached = cached_quote(request_data)
+    # The breaker is asked once, here, so a refused stream is a 503 instead of an error event
+    if cached is None and not breaker.allow():
+        refusal = circuit_open_response()
+        raise HTTPException(
+            status_code=503,
+            detail=refusal,
+            headers={"Retry-After": str(max(1, round(refusal["retry_after"])))},
+        )
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    producer = None
+    if cached is not None:
+        for event in cached_events(cached):
+            queue.put_nowait(event)
+    elif cdp_browser is not None:
+        producer = asyncio.create_task(stream_with_cdp(api, request_data, queue.put_nowait))
+        await asyncio.sleep(0)  # let it start, so a cancel always reaches run_cdp_quote's breaker release
+    else:
+        producer = scheduler.submit(
+            stream_quote, request_data, lambda event: loop.call_soon_threadsafe(queue.put_nowait, event),
+            cancelled, priority=INTERACTIVE,
+        )
+
+    async def events():
+        finished = False
+        try:
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), STREAM_DISCONNECT_CHECK)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        return
+                    continue
+                yield _format_event(event, payload, format)
+                if event in ("done", "error"):
+                    finished = True
+                    return
+        finally:
+            if not finished:
+                # The client went away mid-scrape: stop it rather than finish for nobody
+                cancelled.set()
+                if producer is not None and producer.cancel() and not isinstance(producer, asyncio.Task):
+                    breaker.release()  # never started, so it never reached the breaker
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+def run_quote_job(request: dict) -> dict:
+    """Serve one job's quote from the cache or scrape it; the job store records the result."""
+    return cached_quote(request) or scrape_and_cache(request)
+
+
+@app.post("/quote/jobs", status_code=202, tags=["Jobs"])
+def create_quote_job(request: QuoteJobRequest):
+    """
+    Queues a quote request and returns its job ID immediately.
+    Poll `GET /quote/jobs/{job_id}`, subscribe to `/quote/jobs/{job_id}/events`,
+    or pass a `callback_url` to get the result POSTed when it is ready.
+    """
+    try:
+        PorterAPI(name=request.name, phone=request.phone)  # validate before queueing
+    except PorterAPIError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        job = job_store.create(
+            request.model_dump(exclude={"callback_url"}),
+            str(request.callback_url) if request.callback_url else None,
+        )
+    except PorterAPIError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    scheduler.submit(job_store.run, job, run_quote_job, priority=INTERACTIVE)
+    print(f"Queued quote job {job.id} for {request.name} in {request.city}")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/quote/jobs/{job.id}",
+        "events_url": f"/quote/jobs/{job.id}/events",
+    }
+
+
+@app.get("/quote/jobs/{job_id}", tags=["Jobs"])
+def get_quote_job(job_id: str):
+    """Returns the job's status, and its result once finished."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return RecordResponse(job.to_dict())
+
+
+@app.get("/quote/jobs/{job_id}/events", tags=["Jobs"])
+async def quote_job_events(job_id: str):
+    """Server-Sent Events: one `status` event per change, then a final `result` event."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+
+    async def events():
+        version = -1
+        while True:
+            current = await job.changed_since(version, 15)
+            if current == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            snapshot = job.to_dict()
+            if job.finished:
+                yield f"event: result\ndata: {dumps(snapshot).decode()}\n\n"
+                return
+            yield f"event: status\ndata: {json.dumps({'job_id': job.id, 'status': snapshot['status']})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,233 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Alternate spellings and old names that Porter.in (and our users) use for
+# the same city. Values are the lowercase names from PorterAPI.SUPPORTED_CITIES.
+CITY_ALIASES = {
+    "bengaluru": "bangalore",
+    "bengalooru": "bangalore",
+    "blr": "bangalore",
+    "bombay": "mumbai",
+    "bom": "mumbai",
+    "new delhi": "delhi",
+    "ncr": "delhi",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "poona": "pune",
+    "thiruvananthapuram": "trivandrum",
+    "cochin": "kochi",
+    "ernakulam": "kochi",
+    "baroda": "vadodara",
+    "vizag": "visakhapatnam",
+    "amdavad": "ahmedabad",
+    "kovai": "coimbatore",
+    "cawnpore": "kanpur",
+}
+
+# Common abbreviations folded to a single spelling
+ABBREVIATIONS = {
+    "rd": "road",
+    "st": "street",
+    "ln": "lane",
+    "nr": "near",
+    "opp": "opposite",
+    "sec": "sector",
+    "blk": "block",
+    "stn": "station",
+    "apts": "apartments",
+    "apt": "apartment",
+    "ft": "feet",
+    "extn": "extension",
+    "ext": "extension",
+}
+
+# Tokens that carry no information for telling two addresses apart.
+# Directions, state names and ordinals stay: "Andheri West"/"Andheri East" are different places.
+NOISE_TOKENS = frozenset({"india"})
+
+# Tokens two addresses must agree on before they count as a fuzzy match, however
+# much else they share ("5th Block" vs "6th Block", "East" vs "West")
+DISTINGUISHING_TOKENS = frozenset({
+    "east", "west", "north", "south", "central", "upper", "lower", "old", "new",
+    "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+})
+
+_PINCODE_RE = re.compile(r"(?<!\d)([1-9]\d{2})\s?(\d{3})(?!\d)")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+_MULTI_WORD_ALIASES = sorted(
+    (alias for alias in CITY_ALIASES if " " in alias), key=len, reverse=True
+)
+
+
+def extract_pincode(address: str) -> Optional[str]:
+    """Extract a 6-digit Indian pincode from text like 'Koramangala 560 034'"""
+    match = _PINCODE_RE.search(address or "")
+    return match.group(1) + match.group(2) if match else None
+
+
+def normalize_city(city: str) -> str:
+    """Fold a city name to its canonical lowercase form ('Bengaluru' -> 'bangalore')"""
+    folded = " ".join(_NON_WORD_RE.sub(" ", (city or "").lower()).split())
+    return CITY_ALIASES.get(folded, folded)
+
+
+def normalize_address(address: str) -> str:
+    """
+    Fold case, punctuation, whitespace, city aliases and abbreviations.
+
+    'Koramangala,  BENGALURU - 560034' -> 'koramangala bangalore 560034'
+    """
+    text = unicodedata.normalize("NFKC", address or "").lower()
+    pincode = extract_pincode(text)
+    if pincode:
+        text = _PINCODE_RE.sub(" ", text)
+    text = " " + " ".join(_NON_WORD_RE.sub(" ", text).split()) + " "
+    for alias in _MULTI_WORD_ALIASES:
+        text = text.replace(f" {alias} ", f" {CITY_ALIASES[alias]} ")
+
+    tokens = []
+    for token in text.split():
+        token = CITY_ALIASES.get(token, token)
+        token = ABBREVIATIONS.get(token, token)
+        if token not in NOISE_TOKENS:
+            tokens.append(token)
+    if pincode:
+        tokens.append(pincode)
+    return " ".join(tokens)
+
+
+def address_tokens(address: str, city: str = None) -> Tuple[FrozenSet[str], Optional[str]]:
+    """
+    Split an address into its (token set, pincode).
+
+    When a city is given its name is dropped from the tokens, so 'Koramangala'
+    and 'Koramangala, Bangalore' compare equal within Bangalore.
+    """
+    normalized = normalize_address(address)
+    pincode = extract_pincode(normalized)
+    drop = set(normalize_city(city).split()) if city else set()
+    if pincode:
+        drop.add(pincode)
+    return frozenset(t for t in normalized.split() if t not in drop), pincode
+
+
+def canonical_address(address: str, city: str = None) -> str:
+    """
+    Order-independent canonical form of an address: its sorted tokens, then its pincode.
+
+    Only exact variants share it, so it is safe as a cache key; 'Koramangala'
+    and 'Koramangala 560034' stay apart since the bare name may be another pincode.
+    """
+    tokens, pincode = address_tokens(address, city)
+    return " ".join(sorted(tokens) + ([pincode] if pincode else []))
+
+
+def _distinguishing(tokens: FrozenSet[str]) -> FrozenSet[str]:
+    return frozenset(t for t in tokens if t in DISTINGUISHING_TOKENS or any(c.isdigit() for c in t))
+
+
+class AddressIndex:
+    """
+    Token-based fuzzy match index for finding known addresses similar to a new one.
+
+    Candidates come from the rarest tokens' posting lists within the same city
+    (narrowed to the same pincode when both sides have one), which keeps
+    lookups bounded as the index grows. A pincode alone never makes a match,
+    and candidates must agree on numbers, ordinals and directions. Fuzzy
+    matches are suggestions only: `add` and `route_key` always use the exact
+    canonical form, so keys don't depend on what was indexed first.
+    """
+
+    def __init__(self, min_score: float = 0.8, max_postings: int = 1000, probe_tokens: int = 3):
+        """
+        Args:
+            min_score: Minimum Jaccard similarity for a fuzzy match
+            max_postings: Tokens seen in more entries than this are too common to probe
+            probe_tokens: How many of the rarest tokens to probe per lookup
+        """
+        self.min_score = min_score
+        self.max_postings = max_postings
+        self.probe_tokens = probe_tokens
+        self._keys: List[str] = []
+        self._tokens: List[FrozenSet[str]] = []
+        self._pincodes: List[Optional[str]] = []
+        self._by_key: Dict[Tuple[str, str], int] = {}
+        self._postings: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _match(self, city: str, tokens: FrozenSet[str], pincode: Optional[str]) -> Optional[int]:
+        key = " ".join(sorted(tokens) + ([pincode] if pincode else []))
+        entry = self._by_key.get((city, key))
+        if entry is not None:
+            return entry
+        if not tokens:
+            return None
+
+        postings = [self._postings.get((city, t), ()) for t in tokens]
+        postings = sorted((p for p in postings if 0 < len(p) <= self.max_postings), key=len)
+        overlap = Counter()
+        for posting in postings[:self.probe_tokens]:
+            overlap.update(posting)
+
+        distinguishing = _distinguishing(tokens)
+        best, best_score = None, 0.0
+        for candidate, _ in overlap.most_common(20):
+            other = self._tokens[candidate]
+            other_pincode = self._pincodes[candidate]
+            if pincode and other_pincode and pincode != other_pincode:
+                continue
+            if _distinguishing(other) != distinguishing:
+                continue
+            score = len(tokens & other) / len(tokens | other)
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= self.min_score else None
+
+    def lookup(self, address: str, city: str = None) -> Optional[str]:
+        """Return the canonical key of the closest known address, or None"""
+        city = normalize_city(city) if city else ""
+        tokens, pincode = address_tokens(address, city)
+        with self._lock:
+            entry = self._match(city, tokens, pincode)
+            return self._keys[entry] if entry is not None else None
+
+    def add(self, address: str, city: str = None) -> str:
+        """Index an address and return its exact canonical key"""
+        city = normalize_city(city) if city else ""
+        tokens, pincode = address_tokens(address, city)
+        key = " ".join(sorted(tokens) + ([pincode] if pincode else []))
+        with self._lock:
+            if (city, key) not in self._by_key:
+                entry = len(self._keys)
+                self._keys.append(key)
+                self._tokens.append(tokens)
+                self._pincodes.append(pincode)
+                self._by_key[(city, key)] = entry
+                for token in tokens:
+                    self._postings.setdefault((city, token), []).append(entry)
+        return key
+
+
+def route_key(pickup_address: str, drop_address: str, city: str,
+              service_type: str = "trucks", index: AddressIndex = None) -> str:
+    """
+    Build the canonical cache/dedupe key for a quote request.
+
+    The key folds case, punctuation, aliases, abbreviations and token order,
+    nothing fuzzier, so two routes only share a key (and cached quotes) when
+    they are the same route. With an index the addresses are also recorded
+    for `AddressIndex.lookup`.
+    """
+    if index is not None:
+        pickup = index.add(pickup_address, city)
+        drop = index.add(drop_address, city)
+    else:
+        pickup = canonical_address(pickup_address, city)
+        drop = canonical_address(drop_address, city)
+    return f"{normalize_city(city)}|{service_type}|{pickup}|{drop}"
@@ -0,0 +1,300 @@
+"""
+City-affinity dispatch of queue work onto warm browser sessions.
+
+A warm worker keeps its browser session between jobs, and with it the page
+of its last quote: a Bangalore/trucks results page can take the next
+Bangalore/trucks route by refilling the addresses, skipping navigation, the
+city modal and the category step. The dispatcher remembers each worker's
+(city, service_type) page state and hands a free worker the oldest job that
+no other free worker matches better. A job that has waited `max_wait`
+seconds goes to the next free worker regardless of affinity.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from .core import get_selenium_driver
+from .metrics import metrics
+
+EXACT = "exact"  # same city and service type: only addresses are refilled
+CITY = "city"    # same city: the category is switched on the page
+COLD = "cold"    # new session or another city: full navigation
+
+_SCORES = {EXACT: 2, CITY: 1, COLD: 0}
+
+metrics.describe("porter_affinity_jobs_total", "Dispatched scrapes, by how well the worker's page matched")
+metrics.describe("porter_affinity_saved_seconds_total", "Estimated scrape time saved by reusing warm pages")
+metrics.describe("porter_affinity_starved_total", "Jobs handed out regardless of affinity after waiting too long")
+metrics.describe("porter_affinity_queue_depth", "Jobs waiting for a warm worker")
+
+PageState = Tuple[str, str]
+
+
+def affinity_key(request: Dict) -> PageState:
+    return request["city"], request["service_type"]
+
+
+def _match(state: Optional[PageState], key: PageState) -> str:
+    if state == key:
+        return EXACT
+    if state and state[0] == key[0]:
+        return CITY
+    return COLD
+
+
+@contextmanager
+def fresh_browser() -> Iterator:
+    """Default session: a Chrome of its own, quit when the session ends"""
+    driver = get_selenium_driver(remote_debugging_port=0)
+    try:
+        yield driver
+    finally:
+        driver.quit()
+
+
+class _Job:
+    __slots__ = ("request", "key", "future", "enqueued")
+
+    def __init__(self, request: Dict):
+        self.request = request
+        self.key = affinity_key(request)
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class _Worker:
+    """One warm worker: its open session and the page state it was left in"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session: Optional[ExitStack] = None
+        self.driver = None
+        self.state: Optional[PageState] = None
+        self.quotes = 0
+        self.idle = True
+
+
+class AffinityDispatcher:
+    """
+    Runs scrapes on warm workers, routing each job to the best-matching free worker.
+
+    `scrape(request, driver, page_state)` runs one quote on the worker's driver
+    (e.g. `PorterAPI.get_quote(..., driver=driver, page_state=page_state)`).
+    After a successful quote the worker's page state becomes the job's
+    (city, service_type); after a failure its session is closed, since the
+    page (or the browser) can no longer be trusted.
+    """
+
+    def __init__(
+        self,
+        scrape: Callable[[Dict, object, Optional[PageState]], Dict],
+        workers: int = 2,
+        session_factory: Callable[[], ContextManager] = fresh_browser,
+        max_wait: float = 30,
+        session_quotes: int = 50,
+        idle_timeout: float = 60,
+        run_task: Callable[[Callable], Dict] = None,
+    ):
+        """
+        Args:
+            scrape: Runs one request on a driver, given the page state it is in
+            workers: Warm workers (each holds one browser session)
+            session_factory: Context manager yielding a driver, e.g. BrowserSupervisor.lease
+            max_wait: Seconds after which a job goes to any free worker
+            session_quotes: Quotes before a session is handed back (0 = never)
+            idle_timeout: Seconds without work before a session is handed back
+            run_task: Runs the scrape callable and returns its result (default: inline),
+                      e.g. on the scheduler's background lane
+        """
+        self.scrape = scrape
+        self.session_factory = session_factory
+        self.max_wait = max_wait
+        self.session_quotes = session_quotes
+        self.idle_timeout = idle_timeout
+        self.run_task = run_task or (lambda fn: fn())
+        self._jobs: List[_Job] = []
+        self._workers = [_Worker(i) for i in range(workers)]
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._counts: Dict[str, int] = {level: 0 for level in _SCORES}
+        self._seconds: Dict[str, float] = {level: 0.0 for level in _SCORES}
+        self._cold_avg: Optional[float] = None
+        self._saved = 0.0
+        self._starved = 0
+        self._threads = [
+            threading.Thread(target=self._run_worker, args=(w,), name=f"affinity-{w.index}", daemon=True)
+            for w in self._workers
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, request: Dict) -> Future:
+        """Queue a QuoteRequest-shaped dict; the future resolves to the scrape result"""
+        job = _Job(request)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot dispatch new jobs after shutdown")
+            self._jobs.append(job)
+            metrics.set("porter_affinity_queue_depth", len(self._jobs))
+            self._cond.notify_all()
+        return job.future
+
+    # --- dispatch --------------------------------------------------------
+
+    def _pick(self, worker: _Worker) -> Optional[_Job]:
+        """The job `worker` should take next (caller holds the lock), or None to keep waiting"""
+        if not self._jobs:
+            return None
+        if time.monotonic() - self._jobs[0].enqueued >= self.max_wait:
+            oldest = self._jobs[0]
+            if _match(worker.state, oldest.key) != EXACT:
+                self._starved += 1
+                metrics.inc("porter_affinity_starved_total")
+            return oldest
+
+        idle = [w for w in self._workers if w.idle]
+        best, best_score = None, -1
+        for job in self._jobs:
+            score = _SCORES[_match(worker.state, job.key)]
+            # Leave the job to a free worker whose page fits it better
+            if score <= best_score or any(_SCORES[_match(w.state, job.key)] > score for w in idle):
+                continue
+            best, best_score = job, score
+            if score == _SCORES[EXACT]:
+                break
+        return best
+
+    def _next_job(self, worker: _Worker) -> Optional[_Job]:
+        """Block until there is a job for `worker`; None on shutdown or when its session idled out"""
+        idle_since = time.monotonic()
+        with self._cond:
+            while not self._shutdown:
+                job = self._pick(worker)
+                if job is not None:
+                    self._jobs.remove(job)
+                    worker.idle = False
+                    metrics.set("porter_affinity_queue_depth", len(self._jobs))
+                    # Another worker may now be the best free match for what is left
+                    self._cond.notify_all()
+                    return job
+                timeouts = []
+                if self._jobs:
+                    timeouts.append(self._jobs[0].enqueued + self.max_wait - time.monotonic())
+                if worker.session and self.idle_timeout:
+                    idle_left = idle_since + self.idle_timeout - time.monotonic()
+                    if idle_left <= 0:
+                        return None
+                    timeouts.append(idle_left)
+                self._cond.wait(max(0.0, min(timeouts)) if timeouts else None)
+        return None
+
+    def _run_worker(self, worker: _Worker):
+        while True:
+            job = self._next_job(worker)
+            if job is None:
+                self._close_session(worker)
+                if self._shutdown:
+                    return
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                self._finish(worker)
+                continue
+            try:
+                job.future.set_result(self._run_job(worker, job))
+            except BaseException as e:
+                self._close_session(worker)
+                job.future.set_exception(e)
+            finally:
+                self._finish(worker)
+
+    def _run_job(self, worker: _Worker, job: _Job) -> Dict:
+        level = _match(worker.state, job.key)
+        state = worker.state
+        start = time.monotonic()
+        result = self.run_task(lambda: self._scrape_on_session(worker, job.request, state))
+        self._record(level, time.monotonic() - start, result.get("success"))
+
+        worker.quotes += 1
+        if not result.get("success"):
+            self._close_session(worker)
+        else:
+            worker.state = job.key
+            if self.session_quotes and worker.quotes >= self.session_quotes:
+                self._close_session(worker)
+        return result
+
+    def _scrape_on_session(self, worker: _Worker, request: Dict, state: Optional[PageState]) -> Dict:
+        """Runs inside run_task, so a new session is only opened once the task has its slot
+        (the same order as every other scrape; opening it first could deadlock the two)"""
+        if worker.session is None:
+            worker.session = ExitStack()
+            try:
+                worker.driver = worker.session.enter_context(self.session_factory())
+            except BaseException:
+                worker.session = None
+                raise
+        return self.scrape(request, worker.driver, state)
+
+    def _finish(self, worker: _Worker):
+        with self._cond:
+            worker.idle = True
+            self._cond.notify_all()
+
+    def _close_session(self, worker: _Worker):
+        session, worker.session, worker.driver = worker.session, None, None
+        worker.state, worker.quotes = None, 0
+        if session is not None:
+            try:
+                session.close()
+            except Exception as e:
+                print(f"⚠️ Could not close warm session {worker.index}: {e}")
+
+    # --- accounting ------------------------------------------------------
+
+    def _record(self, level: str, seconds: float, success: bool):
+        """Count the job and estimate the time a warm page saved against recent cold runs"""
+        metrics.inc("porter_affinity_jobs_total", match=level)
+        with self._cond:
+            self._counts[level] += 1
+            self._seconds[level] += seconds
+            if not success:
+                return
+            if level == COLD:
+                self._cold_avg = seconds if self._cold_avg is None else 0.8 * self._cold_avg + 0.2 * seconds
+            elif self._cold_avg is not None:
+                saved = max(0.0, self._cold_avg - seconds)
+                self._saved += saved
+                metrics.inc("porter_affinity_saved_seconds_total", saved)
+
+    def stats(self) -> Dict:
+        """Affinity hit rate, mean scrape seconds per match level and estimated time saved"""
+        with self._cond:
+            total = sum(self._counts.values())
+            return {
+                "workers": [
+                    {"state": "/".join(w.state) if w.state else None, "busy": not w.idle, "quotes": w.quotes}
+                    for w in self._workers
+                ],
+                "queued": len(self._jobs),
+                "jobs": dict(self._counts),
+                "hit_rate": round((self._counts[EXACT] + self._counts[CITY]) / total, 3) if total else None,
+                "mean_seconds": {
+                    level: round(self._seconds[level] / n, 2) for level, n in self._counts.items() if n
+                },
+                "saved_seconds": round(self._saved, 1),
+                "starved": self._starved,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers and close their sessions; queued jobs are cancelled"""
+        with self._cond:
+            self._shutdown = True
+            jobs, self._jobs = self._jobs, []
+            self._cond.notify_all()
+        for job in jobs:
+            job.future.cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join()
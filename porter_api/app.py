@@ -12,7 +12,7 @@ def get_selenium_driver():
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")  # This is important for some versions of Chrome
-    chrome_options.add_argument("--remote-debugging-port=9222")  # This is recommended
+    chrome_options.add_argument("--remote-debugging-port=0")  # This is recommended; 0 = any free port
 
     # Path to the chromedriver installed by apt-get in the Dockerfile
     service = ChromeService(executable_path="/usr/bin/chromedriver")
@@ -0,0 +1,207 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from selenium.webdriver.remote.webelement import WebElement
+
+from .core import get_selenium_driver
+from .exceptions import PorterAPIError
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and all of its descendants (Linux /proc)"""
+    children: Dict[int, list] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so split after its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(current, ()))
+    return total
+
+
+class _ContextBound:
+    """
+    Forwards attribute access to a Selenium object after activating its browser context.
+
+    The browser lock is held for the whole command, because the session has
+    one current window. That includes blocking ones: `get` (until the page
+    has loaded) and clicks that navigate, during which every other context of
+    the same Chrome waits.
+    """
+
+    def __init__(self, context: "BrowserContext", target):
+        object.__setattr__(self, "_context", context)
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name):
+        context = self._context
+        with context.browser.lock:
+            context.activate()
+            attr = getattr(self._target, name)
+        if not callable(attr):
+            return context.wrap(attr)
+
+        def call(*args, **kwargs):
+            args = [a._target if isinstance(a, _ContextBound) else a for a in args]
+            with context.browser.lock:
+                context.activate()
+                return context.wrap(attr(*args, **kwargs))
+
+        return call
+
+    def __eq__(self, other):
+        if isinstance(other, _ContextBound):
+            other = other._target
+        return self._target == other
+
+    def __hash__(self):
+        return hash(self._target)
+
+
+class BrowserContext(_ContextBound):
+    """
+    A driver-like handle for one isolated browser context of a SharedBrowser.
+
+    Each context is a CDP `Target.createBrowserContext` (its own cookies,
+    storage and cache) with a single tab. Every WebDriver command first
+    switches the shared session to this tab under the browser lock, so the
+    handle can be passed to `PorterAPI.get_quote(driver=...)` like a driver.
+    Commands of different contexts therefore run one at a time: contexts
+    share Chrome's memory and overlap only while their pages wait on the
+    network between commands, not during page loads.
+    """
+
+    def __init__(self, browser: "SharedBrowser", context_id: str, handle: str):
+        super().__init__(self, browser.driver)
+        object.__setattr__(self, "browser", browser)
+        object.__setattr__(self, "context_id", context_id)
+        object.__setattr__(self, "handle", handle)
+
+    def activate(self):
+        """Make this context's tab the session's current window (caller holds the lock)"""
+        if self.browser.active_handle != self.handle:
+            self.browser.driver.switch_to.window(self.handle)
+            self.browser.active_handle = self.handle
+
+    def wrap(self, value):
+        """Bind WebElements returned by a command to this context"""
+        if isinstance(value, WebElement):
+            return _ContextBound(self, value)
+        if isinstance(value, list):
+            return [self.wrap(v) for v in value]
+        return value
+
+    def quit(self):
+        """Close the context only; the shared Chrome keeps running"""
+        self.browser.close_context(self)
+
+    close = quit
+
+
+class SharedBrowser:
+    """
+    One Chrome process serving several concurrent quotes through isolated contexts.
+
+    All contexts drive Chrome through one WebDriver session, so their commands
+    (page loads included) are serialized; the win is memory per quote, and
+    throughput only where quotes spend their time waiting between commands.
+
+    Usage:
+        browser = SharedBrowser(max_contexts=4)
+        with browser.context() as ctx:
+            api.get_quote(..., driver=ctx)
+        browser.quit()
+    """
+
+    def __init__(self, max_contexts: int = 4, remote_debugging_port: int = 0):
+        """
+        Args:
+            max_contexts: How many quotes may run in this browser at once
+            remote_debugging_port: Passed to get_selenium_driver (0 = any free port)
+        """
+        self.driver = get_selenium_driver(remote_debugging_port=remote_debugging_port)
+        self.max_contexts = max_contexts
+        self.lock = threading.RLock()
+        # The initial tab is never closed; it keeps the session alive between contexts
+        self.anchor_handle = self.driver.current_window_handle
+        self.active_handle = self.anchor_handle
+        self._slots = threading.BoundedSemaphore(max_contexts)
+        self._contexts: Dict[str, BrowserContext] = {}
+
+    @property
+    def pid(self) -> int:
+        """PID of chromedriver, the root of this browser's process tree"""
+        return self.driver.service.process.pid
+
+    @property
+    def active_contexts(self) -> int:
+        return len(self._contexts)
+
+    def rss(self) -> int:
+        """Resident memory in bytes of chromedriver, Chrome and its renderers"""
+        return process_tree_rss(self.pid)
+
+    def new_context(self, timeout: float = None) -> BrowserContext:
+        """Open an isolated context, waiting up to `timeout` seconds for a free slot"""
+        if not self._slots.acquire(timeout=timeout):
+            raise PorterAPIError(f"No free browser context after {timeout}s ({self.max_contexts} in use)")
+        try:
+            with self.lock:
+                context_id = self.driver.execute_cdp_cmd(
+                    "Target.createBrowserContext", {"disposeOnDetach": True}
+                )["browserContextId"]
+                target_id = self.driver.execute_cdp_cmd(
+                    "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+                )["targetId"]
+                # chromedriver uses the DevTools target id as the window handle
+                context = BrowserContext(self, context_id, target_id)
+                self._contexts[target_id] = context
+            return context
+        except Exception:
+            self._slots.release()
+            raise
+
+    def close_context(self, context: BrowserContext):
+        """Close a context's tab and dispose of its cookies and storage"""
+        with self.lock:
+            if self._contexts.pop(context.handle, None) is None:
+                return
+            try:
+                self.driver.execute_cdp_cmd("Target.closeTarget", {"targetId": context.handle})
+                self.driver.execute_cdp_cmd(
+                    "Target.disposeBrowserContext", {"browserContextId": context.context_id}
+                )
+            finally:
+                self.driver.switch_to.window(self.anchor_handle)
+                self.active_handle = self.anchor_handle
+                self._slots.release()
+
+    @contextmanager
+    def context(self, timeout: float = None) -> Iterator[BrowserContext]:
+        context = self.new_context(timeout)
+        try:
+            yield context
+        finally:
+            self.close_context(context)
+
+    def quit(self):
+        with self.lock:
+            self._contexts.clear()
+            self.driver.quit()
@@ -0,0 +1,249 @@
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+from .scheduler import REFRESH, PriorityScheduler
+
+metrics.describe("porter_cache_requests_total", "Quote cache lookups, by outcome (hit, refreshed_hit, miss)")
+metrics.describe("porter_refresh_scrapes_total", "Refresh-ahead scrapes, by outcome")
+metrics.describe("porter_refresh_scrape_seconds_total", "Scrape time spent on refresh-ahead")
+
+
+class _Entry:
+    __slots__ = ("result", "expires", "gained_after")
+
+    def __init__(self, result: Dict, expires: float, gained_after: Optional[float]):
+        self.result = result
+        self.expires = expires
+        # For refreshed entries: when the replaced entry would have expired.
+        # Hits after this moment are hits that only the refresh made possible.
+        self.gained_after = gained_after
+
+
+class QuoteCache:
+    """
+    TTL + LRU cache of successful quote results, keyed by `address.route_key`.
+
+    Entries written by the refresh-ahead scheduler remember when the entry
+    they replaced would have expired, so hits that only happened because of
+    the refresh are counted separately (`refreshed_hit`).
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= now:
+                metrics.inc("porter_cache_requests_total", outcome="miss")
+                return None
+            self._entries.move_to_end(key)
+        gained = entry.gained_after is not None and now >= entry.gained_after
+        metrics.inc("porter_cache_requests_total", outcome="refreshed_hit" if gained else "hit")
+        return entry.result
+
+    def put(self, key: str, result: Dict, refreshed: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            gained_after = None
+            if refreshed:
+                previous = self._entries.get(key)
+                gained_after = previous.expires if previous else now
+            self._entries[key] = _Entry(result, now + self.ttl, gained_after)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until `key` expires (negative if expired), or None if not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else entry.expires - time.monotonic()
+
+
+class RefreshAhead:
+    """
+    Re-scrapes popular routes shortly before their cache entries expire.
+
+    Every request is recorded with an exponentially decaying popularity
+    score. Each tick, the `top_n` most popular cached routes that expire
+    within `refresh_window` seconds are refreshed through the scheduler's
+    `refresh` lane - only while workers beyond the interactive reserve are
+    idle and nothing is queued, and never more than `budget_per_minute`
+    scrapes per minute, so live traffic is never starved.
+    """
+
+    def __init__(
+        self,
+        cache: QuoteCache,
+        scheduler: PriorityScheduler,
+        refresh_fn: Callable[[Dict], Dict],
+        top_n: int = 50,
+        refresh_window: float = 120,
+        budget_per_minute: float = 6,
+        interval: float = 10,
+        half_life: float = 3600,
+        max_tracked: int = 10000,
+    ):
+        """
+        Args:
+            cache: Cache to keep warm
+            scheduler: Scheduler whose idle capacity refreshes run on
+            refresh_fn: Scrapes a recorded request dict and returns its quote result; it should
+                        go through the same circuit breaker as live scrapes
+            top_n: How many of the most requested routes are eligible for refresh
+            refresh_window: Refresh routes expiring within this many seconds
+            budget_per_minute: Maximum refresh scrapes per minute
+            interval: Seconds between refresh ticks
+            half_life: Seconds for a route's popularity score to halve
+            max_tracked: Routes whose popularity is tracked
+        """
+        self.cache = cache
+        self.scheduler = scheduler
+        self.refresh_fn = refresh_fn
+        self.top_n = top_n
+        self.refresh_window = refresh_window
+        self.budget_per_minute = budget_per_minute
+        self.interval = interval
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        # key -> [level, latest request]. A route's level is log2 of its score
+        # scaled back to time 0, so levels compare like scores at any moment and
+        # never change while a route isn't requested.
+        self._routes: Dict[str, list] = {}
+        # Min-heap of (level, key), coldest route first; entries for levels a
+        # route has since left are skipped on pop and dropped on compaction
+        self._coldest: List[Tuple[float, str]] = []
+        self._in_flight = set()
+        self._tokens = budget_per_minute
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _score(self, level: float, now: float) -> float:
+        return 2 ** (level - now / self.half_life)
+
+    def record(self, key: str, request: Dict):
+        """Count one request for a route (call for hits and misses alike)"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._routes.get(key)
+            if state is None:
+                if len(self._routes) >= self.max_tracked:
+                    self._evict_coldest()
+                score = 1.0
+            else:
+                score = self._score(state[0], now) + 1
+            level = math.log2(score) + now / self.half_life
+            self._routes[key] = [level, request]
+            heapq.heappush(self._coldest, (level, key))
+            if len(self._coldest) > 2 * len(self._routes):
+                self._coldest = [(s[0], k) for k, s in self._routes.items()]
+                heapq.heapify(self._coldest)
+
+    def _evict_coldest(self):
+        while self._coldest:
+            level, key = heapq.heappop(self._coldest)
+            state = self._routes.get(key)
+            if state is not None and state[0] == level:
+                del self._routes[key]
+                return
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            self.budget_per_minute,
+            self._tokens + (now - self._last_refill) * self.budget_per_minute / 60,
+        )
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _has_spare_capacity(self) -> bool:
+        return (
+            self.scheduler.queue_depth() == 0
+            and self.scheduler.idle_workers() > self.scheduler.reserved_interactive
+        )
+
+    def tick(self) -> int:
+        """Submit refreshes for hot routes about to expire; returns how many were submitted"""
+        with self._lock:
+            hottest = heapq.nlargest(self.top_n, self._routes.items(), key=lambda kv: kv[1][0])
+            candidates = [(k, s[1]) for k, s in hottest if k not in self._in_flight]
+
+        submitted = 0
+        for key, request in candidates:
+            expires_in = self.cache.expires_in(key)
+            if expires_in is None or expires_in <= 0 or expires_in > self.refresh_window:
+                continue
+            if not self._has_spare_capacity():
+                break
+            with self._lock:
+                if not self._take_token():
+                    break
+                self._in_flight.add(key)
+            self.scheduler.submit(self._refresh, key, request, priority=REFRESH)
+            submitted += 1
+        return submitted
+
+    def _refresh(self, key: str, request: Dict):
+        start = time.monotonic()
+        try:
+            result = self.refresh_fn(request)
+        except Exception as e:
+            print(f"⚠️ Refresh of {key} failed: {e}")
+            result = {"success": False}
+        finally:
+            elapsed = time.monotonic() - start
+            metrics.inc("porter_refresh_scrape_seconds_total", elapsed)
+            with self._lock:
+                self._in_flight.discard(key)
+        if result.get("success"):
+            self.cache.put(key, result, refreshed=True)
+            metrics.inc("porter_refresh_scrapes_total", outcome="success")
+        else:
+            metrics.inc("porter_refresh_scrapes_total", outcome="failed")
+
+    def stats(self) -> Dict[str, float]:
+        """What refreshing bought (refreshed hits) against what it cost (scrape seconds)"""
+        hits = metrics.get("porter_cache_requests_total", outcome="hit")
+        refreshed_hits = metrics.get("porter_cache_requests_total", outcome="refreshed_hit")
+        misses = metrics.get("porter_cache_requests_total", outcome="miss")
+        lookups = hits + refreshed_hits + misses
+        scrapes = sum(metrics.get("porter_refresh_scrapes_total", outcome=o) for o in ("success", "failed"))
+        seconds = metrics.get("porter_refresh_scrape_seconds_total")
+        return {
+            "tracked_routes": len(self._routes),
+            "hit_rate": round((hits + refreshed_hits) / lookups, 4) if lookups else 0.0,
+            "hit_rate_gained": round(refreshed_hits / lookups, 4) if lookups else 0.0,
+            "refresh_scrapes": scrapes,
+            "refresh_scrape_seconds": round(seconds, 2),
+            "refreshed_hits_per_scrape": round(refreshed_hits / scrapes, 2) if scrapes else 0.0,
+        }
+
+    def start(self):
+        threading.Thread(target=self._loop, name="refresh-ahead", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Refresh-ahead tick failed: {e}")
@@ -0,0 +1,371 @@
+"""
+A minimal asyncio Chrome DevTools Protocol client.
+
+One Chrome process and one websocket serve every page: each page is its own
+browser context (separate cookies & storage) with a flattened target
+session, so hundreds of in-flight steps share one event loop and no thread
+is parked per scrape.
+
+    async with CDPBrowser() as browser:
+        page = await browser.new_page()
+        await page.navigate("https://porter.in/")
+        title = await page.evaluate("document.title")
+        await browser.close_page(page)
+"""
+import asyncio
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import websockets
+
+from .browser import process_tree_rss
+from .exceptions import PorterAPIError
+from .metrics import metrics
+from .supervisor import register_browser_pid, unregister_browser_pid
+
+CHROME_CANDIDATES = ("chromium", "chromium-browser", "google-chrome", "google-chrome-stable")
+
+
+class CDPError(PorterAPIError):
+    """A DevTools command failed or the browser connection was lost"""
+    pass
+
+
+def find_chrome() -> str:
+    """CHROME_BIN, or the first Chrome/Chromium on PATH"""
+    path = os.getenv("CHROME_BIN") or next(filter(None, map(shutil.which, CHROME_CANDIDATES)), None)
+    if not path:
+        raise PorterAPIError("Chrome/Chromium not found. Install it or set CHROME_BIN")
+    return path
+
+
+class CDPPage:
+    """One tab in its own browser context, driven through a flattened session"""
+
+    def __init__(self, browser: "CDPBrowser", context_id: str, session_id: str):
+        self.browser = browser
+        self.context_id = context_id
+        self.session_id = session_id
+
+    async def send(self, method: str, params: Dict = None) -> Dict:
+        return await self.browser.send(method, params, session_id=self.session_id)
+
+    async def evaluate(self, expression: str):
+        """Evaluate JS in the page (awaiting promises) and return its JSON value"""
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True,
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CDPError(details.get("exception", {}).get("description") or details.get("text", "JS error"))
+        return result["result"].get("value")
+
+    async def call(self, function: str, *args):
+        """Call a JS function expression with JSON-serialisable arguments"""
+        return await self.evaluate(f"({function})(...{json.dumps(args)})")
+
+    async def wait_for(self, function: str, *args, timeout: float = 15, interval: float = 0.1):
+        """Poll `function(*args)` until it returns something truthy; raises asyncio.TimeoutError"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not self.browser.running:
+                raise CDPError("Browser is not running")
+            try:
+                value = await self.call(function, *args)
+            except CDPError:
+                value = None  # e.g. the execution context was replaced by a navigation
+            if value:
+                return value
+            if loop.time() >= deadline:
+                raise asyncio.TimeoutError(f"Timed out after {timeout}s waiting for {function[:60]}")
+            await asyncio.sleep(interval)
+
+    async def navigate(self, url: str, timeout: float = 30):
+        await self.send("Page.navigate", {"url": url})
+        await self.wait_for(
+            "() => document.readyState === 'complete' && location.href !== 'about:blank'",
+            timeout=timeout,
+        )
+
+
+class CDPBrowser:
+    """
+    A headless Chrome launched with a DevTools websocket.
+
+    Chrome is relaunched when its process dies or the websocket closes, and
+    recycled like a supervised browser: after `max_pages` pages, `max_age`
+    seconds or above `max_rss_mb` of memory. A recycle first drains the
+    browser (new pages wait) and happens once its last page is closed; a
+    crash relaunches right away. Call `start()` once; a monitor task then
+    samples memory and relaunches a dead Chrome even while no quotes arrive.
+    """
+
+    def __init__(
+        self,
+        chrome_path: str = None,
+        extra_args=(),
+        max_pages: int = 0,
+        max_age: float = 0,
+        max_rss_mb: float = 0,
+        monitor_interval: float = 5,
+    ):
+        """
+        Args:
+            chrome_path: Chrome binary (default: find_chrome())
+            extra_args: Extra Chrome command-line flags
+            max_pages: Relaunch Chrome after this many pages (0 = never)
+            max_age: Relaunch Chrome after this many seconds (0 = never)
+            max_rss_mb: Relaunch Chrome above this resident memory (0 = never)
+            monitor_interval: Seconds between health checks / memory samples
+        """
+        self.chrome_path = chrome_path
+        self.extra_args = list(extra_args)
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.monitor_interval = monitor_interval
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._tasks = []
+        self._monitor: Optional[asyncio.Task] = None
+        self._profile_dir = None
+        self._cond = asyncio.Condition()
+        self._started = 0.0
+        self._open_pages = 0
+        self._rss = 0
+        self.pages = 0
+        self.relaunches = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def running(self) -> bool:
+        """Chrome is up and its DevTools socket connected"""
+        return self._ws is not None and self.process is not None and self.process.returncode is None
+
+    async def start(self) -> "CDPBrowser":
+        async with self._cond:
+            await self._launch()
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_loop())
+        return self
+
+    async def _launch(self):
+        self._profile_dir = tempfile.mkdtemp(prefix="porter-cdp-")
+        try:
+            self.process = process = await asyncio.create_subprocess_exec(
+                self.chrome_path or find_chrome(),
+                "--headless", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+                "--remote-debugging-port=0", f"--user-data-dir={self._profile_dir}",
+                *self.extra_args, "about:blank",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            # Our direct child, which the supervisor's orphan reaper would otherwise take for a leftover
+            register_browser_pid(process.pid)
+            ws_url = await asyncio.wait_for(self._devtools_url(), 30)
+            self._ws = await websockets.connect(ws_url, max_size=None, ping_interval=None)
+        except Exception:
+            await self._shutdown()
+            raise
+        # Each connection gets its own table, so a dying read loop only fails its own commands
+        self._pending = {}
+        self._tasks = [
+            asyncio.create_task(self._read_loop(self._ws, self._pending)),
+            # Chrome keeps logging to stderr; an undrained pipe would eventually block it
+            asyncio.create_task(self._drain_stderr(process)),
+        ]
+        self._started = asyncio.get_running_loop().time()
+        self._rss = 0
+        self.pages = 0
+        print(f"🧩 CDP browser started (pid {self.pid})")
+
+    async def _devtools_url(self) -> str:
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                raise PorterAPIError("Chrome exited before its DevTools endpoint came up")
+            match = re.search(rb"DevTools listening on (ws://\S+)", line)
+            if match:
+                return match.group(1).decode()
+
+    @staticmethod
+    async def _drain_stderr(process):
+        while await process.stderr.readline():
+            pass
+
+    async def _read_loop(self, ws, pending: Dict[int, asyncio.Future]):
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                future = pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue  # events are not used; pages poll instead
+                if "error" in message:
+                    future.set_exception(CDPError(message["error"].get("message", "CDP error")))
+                else:
+                    future.set_result(message.get("result", {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self._ws is ws:
+                self._ws = None  # not running any more: the next page or monitor check relaunches
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("Browser connection closed"))
+            pending.clear()
+
+    async def send(self, method: str, params: Dict = None, session_id: str = None) -> Dict:
+        ws, pending = self._ws, self._pending
+        if ws is None:
+            raise CDPError("Browser is not running")
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        pending[message_id] = future
+        try:
+            await ws.send(json.dumps(message))
+        except Exception as e:
+            pending.pop(message_id, None)
+            raise CDPError(f"Could not send {method}: {e}") from e
+        return await future
+
+    # --- recycling -------------------------------------------------------
+
+    def _due_reason(self) -> Optional[str]:
+        if not self.running:
+            return "crashed"
+        if self.max_pages and self.pages >= self.max_pages:
+            return "pages"
+        if self.max_age and asyncio.get_running_loop().time() - self._started >= self.max_age:
+            return "age"
+        if self.max_rss and self._rss >= self.max_rss:
+            return "memory"
+        return None
+
+    async def _relaunch(self, reason: str):
+        """Replace Chrome; called holding self._cond"""
+        print(f"♻️ Relaunching CDP browser ({reason}, {self.pages} pages)")
+        metrics.inc("porter_browser_recycles_total", reason=reason)
+        self.relaunches += 1
+        await self._shutdown()
+        try:
+            await self._launch()
+        except Exception as e:
+            raise CDPError(f"Could not relaunch Chrome: {e}") from e
+
+    async def _ready(self):
+        """Wait until Chrome can take a new page: relaunch it if it died, or drain and recycle it"""
+        async with self._cond:
+            while True:
+                reason = self._due_reason()
+                if reason is None:
+                    return
+                if reason != "crashed" and self._open_pages:
+                    await self._cond.wait()  # draining: the last close_page wakes us
+                    continue
+                await self._relaunch(reason)
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            try:
+                if self.running and self.max_rss:
+                    self._rss = await asyncio.to_thread(process_tree_rss, self.pid)
+                    metrics.set("porter_browser_rss_bytes", self._rss, browser="cdp")
+                metrics.set("porter_browser_pages", self._open_pages + 1, browser="cdp")
+                async with self._cond:
+                    reason = self._due_reason()
+                    if reason and (reason == "crashed" or not self._open_pages):
+                        await self._relaunch(reason)
+            except Exception as e:
+                print(f"⚠️ CDP browser check failed: {e}")
+
+    # --- pages -----------------------------------------------------------
+
+    async def new_page(self) -> CDPPage:
+        await self._ready()
+        self._open_pages += 1
+        try:
+            context = await self.send("Target.createBrowserContext", {"disposeOnDetach": True})
+            context_id = context["browserContextId"]
+            try:
+                target = await self.send("Target.createTarget", {"url": "about:blank", "browserContextId": context_id})
+                session = await self.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+            except Exception:
+                await self._dispose(context_id)
+                raise
+        except Exception:
+            await self._page_closed()
+            raise
+        self.pages += 1
+        return CDPPage(self, context_id, session["sessionId"])
+
+    async def close_page(self, page: CDPPage):
+        """Dispose the page's browser context (closing its tab and storage)"""
+        try:
+            await self._dispose(page.context_id)
+        finally:
+            await self._page_closed()
+
+    async def _dispose(self, context_id: str):
+        try:
+            await self.send("Target.disposeBrowserContext", {"browserContextId": context_id})
+        except CDPError as e:
+            print(f"⚠️ Could not dispose browser context: {e}")
+
+    async def _page_closed(self):
+        async with self._cond:
+            self._open_pages -= 1
+            self._cond.notify_all()
+
+    # --- shutdown --------------------------------------------------------
+
+    async def _shutdown(self):
+        """Stop this Chrome and its connection, leaving the object ready to launch again"""
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            await ws.close()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        process = self.process
+        if process and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+        if process:
+            unregister_browser_pid(process.pid)
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        await self._shutdown()
+        metrics.remove("porter_browser_rss_bytes", browser="cdp")
+        metrics.remove("porter_browser_pages", browser="cdp")
+
+    async def __aenter__(self) -> "CDPBrowser":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -1,7 +1,9 @@
+import os
 import time
 import re
+import threading
 from datetime import datetime
-from typing import Optional, Tuple, List, Dict
+from typing import Optional, Tuple, List, Dict, Iterator
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -16,29 +18,90 @@ from selenium.common.exceptions import (
     ElementClickInterceptedException
 )
 
+from . import profile, ratelimit, records
 from .exceptions import PorterAPIError
 
+# Overridable so the scraper can be pointed at a local fixture or replay server
+PORTER_URL = os.getenv("PORTER_URL", "https://porter.in/")
+RESULT_CARD_CLASS = 'FareEstimateResultVehicleCard_container__BdMav'
+
+# error_type of an error response. Only browser errors and timeouts say porter.in (or Chrome)
+# is in trouble; the circuit breaker ignores the others.
+INPUT_ERROR = "input"            # this route can't be quoted (unsupported city, unserviceable route)
+PAGE_ERROR = "page"              # the page didn't behave as the scraper expects
+RATE_LIMITED = "rate_limited"    # no rate-limit token in time
+TIMEOUT_ERROR = "timeout"        # porter.in didn't answer in time
+BROWSER_ERROR = "browser"        # WebDriver/CDP failure or crash
+
 time.sleep(2) 
-def get_selenium_driver():
+def get_selenium_driver(
+    remote_debugging_port: int = 0,
+    performance_log: bool = False,
+    user_data_dir: str = None,
+    warm: bool = True,
+):
+    """
+    Start headless Chrome. With `user_data_dir` the browser uses that profile; otherwise,
+    when a warm profile is configured (and `warm` is set), it gets its own clone of the
+    template, deleted again on driver.quit().
+    """
+    template = profile.current() if user_data_dir is None and warm else None
+    clone = template.clone() if template else None
+    user_data_dir = user_data_dir or clone
+
     # Setup Chrome options
     chrome_options = Options()
+    if performance_log:
+        # Exposes CDP Network.* events through driver.get_log("performance") (used by the session recorder)
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")  # This is important for some versions of Chrome
-    chrome_options.add_argument("--remote-debugging-port=9222")  # This is recommended
+    # This is recommended. 0 lets Chrome pick a free port, so concurrent quotes never fight over 9222.
+    chrome_options.add_argument(f"--remote-debugging-port={remote_debugging_port}")
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
 
     # Path to the chromedriver installed by apt-get in the Dockerfile
     service = ChromeService(executable_path="/usr/bin/chromedriver")
 
     # Set up driver.
     # Explicitly use the service to avoid SeleniumManager's architecture issue.
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        if clone:
+            template.release(clone)
+        raise
+
+    if clone:
+        quit = driver.quit
+
+        def quit_and_release():
+            try:
+                quit()
+            finally:
+                template.release(clone)
+
+        driver.quit = quit_and_release
     return driver
 
 
 
+def _quit_driver(driver):
+    try:
+        driver.quit()
+        print("🛑 Browser closed")
+    except Exception:
+        pass
+
+def _quit_in_background(driver):
+    """Quit a driver without making the caller wait; not a daemon, so Python still waits for it at exit"""
+    threading.Thread(target=_quit_driver, args=(driver,), name="driver-quit").start()
+
+
+
 def _validate_phone(phone: str) -> str:
     """Validate phone number format"""
     if not re.fullmatch(r"\d{10}", phone):
@@ -62,13 +125,26 @@ def _parse_capacity(capacity_text: str) -> Optional[int]:
     match = re.search(r"(\d+)", capacity_text.replace(",", ""))
     return int(match.group(1)) if match else None
 
+def _read_result_card(card) -> Tuple[str, str, str]:
+    """Raw (vehicle name, fare, capacity) texts of one result card element"""
+    return (
+        card.find_element(By.CLASS_NAME, 'FareEstimateResultVehicleCard_vehicle-name__d4107').text,
+        card.find_element(By.CSS_SELECTOR, '.FareEstimateResultVehicleCard_vehicle-fare__3YMOc p').text,
+        card.find_element(By.CLASS_NAME, 'VehicleCapacity_vehicle-capacity__P53Z0').text,
+    )
+
+def _parse_quote_card(vehicle_name: str, price_text: str, capacity: str) -> Dict:
+    """Build a quote from the texts of one result card"""
+    min_price, max_price = _parse_price_range(price_text)
+    return records.quote(vehicle_name, price_text, min_price, max_price, capacity, _parse_capacity(capacity))
+
 class PorterAPI:
     SUPPORTED_CITIES = [
         "Ahmedabad", "Bangalore", "Chandigarh", "Chennai", "Coimbatore", "Delhi", "Hyderabad", "Indore", "Jaipur", "Kanpur", "Kochi", "Kolkata", "Lucknow", "Ludhiana", "Mumbai", "Nagpur", "Nashik", "Pune", "Surat", "Trivandrum", "Vadodara", "Visakhapatnam"
     ]
     SERVICE_TYPES = ["two_wheelers", "trucks", "packers_and_movers"]
 
-    def __init__(self, name: str, phone: str, headless: bool = True):
+    def __init__(self, name: str, phone: str, headless: bool = True, hooks: List = None):
         """
         Initialize Porter API client
         
@@ -76,10 +152,24 @@ class PorterAPI:
             name: Your name (be nice, use your real name!)
             phone: 10-digit phone number
             headless: Run browser in headless mode (True = invisible, False = see the magic)
+            hooks: Observers of get_quote runs. Each may define on_start(driver),
+                   on_stage(driver, stage), on_restart(driver) (a warm page
+                   failed and the quote starts over) and on_finish(driver, result).
         """
         self.name = name
         self.phone = _validate_phone(phone)
         self.headless = headless
+        self.hooks = list(hooks or [])
+
+    def _notify(self, event: str, *args):
+        """Call `event` on every hook that defines it; hook errors never fail a quote"""
+        for hook in self.hooks:
+            callback = getattr(hook, event, None)
+            if callback:
+                try:
+                    callback(*args)
+                except Exception as e:
+                    print(f"⚠️ {type(hook).__name__}.{event} failed: {e}")
 
     def get_supported_cities(self) -> List[str]:
         """Get list of supported cities"""
@@ -89,11 +179,12 @@ class PorterAPI:
         """Get list of supported service types"""
         return self.SERVICE_TYPES.copy()
 
-    def _create_error_response(self, error_msg: str, details: str = None, suggestion: str = None) -> Dict:
+    def _create_error_response(self, error_msg: str, details: str = None, suggestion: str = None, error_type: str = PAGE_ERROR) -> Dict:
         """Create a standardized error response"""
         response = {
             "success": False,
             "error": error_msg,
+            "error_type": error_type,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
@@ -323,25 +414,224 @@ class PorterAPI:
             print(f"❌ Error in select_service_type: {e}")
             return False
         
-    def get_quote(self, pickup_address: str, drop_address: str, city: str, service_type: str = "trucks") -> Dict:
-        """
-        Get delivery quotes from Porter.in
+    def _wait_for_rate_limit(self, city: str) -> Optional[Dict]:
+        """Wait for a porter.in rate-limit token. Returns an error response if none comes in time."""
+        try:
+            waited = ratelimit.acquire(city)
+        except PorterAPIError as e:
+            return self._rate_limit_error_response(e)
+        if waited:
+            print(f"🚦 Waited {waited:.1f}s for the rate limiter")
+        return None
+
+    def _rate_limit_error_response(self, error: PorterAPIError) -> Dict:
+        return self._create_error_response(
+            "Too many requests to Porter.in right now 🚦",
+            str(error),
+            "Try again in a minute",
+            error_type=RATE_LIMITED,
+        )
+
+    def _open_estimate_form(self, driver, wait, city: str) -> Optional[Dict]:
+        """Navigate to Porter.in, select the city and open the estimate form. Returns an error response on failure."""
+        error = self._wait_for_rate_limit(city)
+        if error:
+            return error
+        print(f"🚀 Driver initialized. Navigating to {PORTER_URL}")
+        driver.get(PORTER_URL)
+        return self._select_city(driver, wait, city)
+
+    def _select_city(self, driver, wait, city: str) -> Optional[Dict]:
+        """Pick the city on the loaded home page and open the estimate form. Returns an error response on failure."""
+        print(f"🏙️ Selecting city: {city}")
+        city_selector = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "CitySelector_city-selected-text__1dNz4")))
+        city_selector.click()
         
-        Args:
-            pickup_address: Where to pick up from
-            drop_address: Where to deliver to  
-            city: City name (must be supported)
-            service_type: Type of service needed
+        city_elements = driver.find_elements(By.CSS_SELECTOR, '[class^="CitySelectorModal_city-title"]')
+        city_found = False
+        for el in city_elements:
+            if city.lower() in el.text.lower():
+                el.click()
+                city_found = True
+                print(f"✅ Selected city: {city}")
+                break
+                
+        if not city_found:
+            return self._create_error_response(
+                f"Could not find city '{city}' on Porter.in 🗺️",
+                "The city might not be available or Porter.in changed their interface",
+                "Double-check the city name or try a different supported city",
+                error_type=INPUT_ERROR,
+            )
+            
+        # Open estimate form
+        print("📋 Opening estimate form...")
+        estimate_card = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "EstimateCard_estimate-card__NgFIr")))
+        estimate_card.click()
+        return None
+
+    def _choose_service_type(self, driver, wait, service_type: str) -> Optional[Dict]:
+        """Select the service category. Returns an error response on failure."""
+        if not self.select_service_type(driver, wait, service_type):
+            return self._create_error_response(
+                f"Could not select service type: {service_type} 🚛",
+                "Porter.in might have changed their interface",
+                "Try a different service type or report this issue"
+            )
+        return None
+
+    def _fill_route_form(self, driver, wait, pickup_address: str, drop_address: str) -> Optional[Dict]:
+        """Fill requirement type, addresses and contact details. Returns an error response on failure."""
+        # Select requirement type
+        print("👤 Selecting requirement type...")
+        self.select_requirement_type(driver, wait, "business")
+        
+        # Fill pickup address
+        print("📍 Filling pickup address...")
+        try:
+            pickup_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="Enter pickup address"]')))
+            self.select_address_from_autocomplete(driver, wait, pickup_input, pickup_address)
+        except TimeoutException:
+            return self._create_error_response(
+                "Could not find pickup address field 📍",
+                "Porter.in might have changed their form structure"
+            )
+        
+        # Fill drop address
+        print("🎯 Filling drop address...")
+        try:
+            drop_input = driver.find_element(By.CSS_SELECTOR, 'input[placeholder="Enter drop address"]')
+            self.select_address_from_autocomplete(driver, wait, drop_input, drop_address)
+        except NoSuchElementException:
+            return self._create_error_response(
+                "Could not find drop address field 🎯",
+                "Porter.in might have changed their form structure"
+            )
+        
+        # Fill contact details
+        print("📱 Filling contact details...")
+        try:
+            mobile_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.FareEstimateForms_mobile-input__jy5wR')))
+            mobile_input.clear()
+            mobile_input.send_keys(self.phone)
             
+            name_input = driver.find_element(By.CSS_SELECTOR, '.FareEstimateForms_name-input__n8xyD')
+            name_input.clear()
+            name_input.send_keys(self.name)
+        except (TimeoutException, NoSuchElementException):
+            return self._create_error_response(
+                "Could not fill contact details 📱",
+                "Porter.in might have changed their form fields"
+            )
+        return None
+
+    def _submit_form(self, driver, wait_submit) -> Optional[Dict]:
+        """Click the enabled submit button. Returns an error response on failure."""
+        print("🚀 Submitting form...")
+        try:
+            submit_btn = wait_submit.until(EC.element_to_be_clickable((By.CSS_SELECTOR, '.FormInput_submit__ea0jJ.FormInput_submit-enabled__DbSnE.FareEstimateForms_submit-container___lB5u')))
+            submit_btn.click()
+        except TimeoutException:
+            return self._create_error_response(
+                "Could not submit the form 🚀",
+                "The submit button might not be clickable or form validation failed",
+                "Check if all fields are properly filled"
+            )
+        return None
+
+    def _collect_quotes(self, driver, wait, stale_card=None) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Wait for the result cards and parse them into quotes.
+
+        Args:
+            stale_card: A result card from a previous search; results are only
+                        read once it has been replaced
+        
         Returns:
-            Dictionary with quotes or error information
+            (quotes, None) on success or ([], error response)
         """
-        # Validate inputs
-        if city not in self.SUPPORTED_CITIES:
+        result_cards, error = self._wait_for_result_cards(driver, wait, stale_card)
+        if error:
+            return [], error
+        
+        card_texts = []
+        for i, card in enumerate(result_cards):
+            try:
+                card_texts.append(_read_result_card(card))
+            except Exception as e:
+                print(f"⚠️ Error reading quote card {i+1}: {e}")
+        return self._quotes_from_cards(card_texts)
+
+    def _wait_for_result_cards(self, driver, wait, stale_card=None) -> Tuple[List, Optional[Dict]]:
+        """Wait for the result card elements. Returns (cards, None) or ([], error response)"""
+        print("⏳ Waiting for results...")
+        try:
+            if stale_card is not None:
+                wait.until(EC.staleness_of(stale_card))
+            wait.until(EC.presence_of_element_located((By.CLASS_NAME, RESULT_CARD_CLASS)))
+            result_cards = driver.find_elements(By.CLASS_NAME, RESULT_CARD_CLASS)
+        except TimeoutException:
+            return [], self._create_error_response(
+                "Results took too long to load ⏰",
+                "Porter.in might be slow or the addresses couldn't be processed",
+                "Try different addresses or run the script again",
+                error_type=TIMEOUT_ERROR,
+            )
+        
+        if not result_cards:
+            return [], self._create_error_response(
+                "No delivery options found 📦",
+                "Porter.in couldn't find any vehicles for your route",
+                "Try different addresses or check if the route is serviceable",
+                error_type=INPUT_ERROR,
+            )
+        return result_cards, None
+
+    def _unparsable_results_error(self) -> Dict:
+        return self._create_error_response(
+            "Could not parse any quotes 📊",
+            "Porter.in returned results but we couldn't understand the format",
+            "Porter.in might have changed their result structure"
+        )
+
+    def _quotes_from_cards(self, card_texts: List[Tuple[str, str, str]]) -> Tuple[List[Dict], Optional[Dict]]:
+        """Parse raw (vehicle name, fare, capacity) card texts into quotes"""
+        quotes = []
+        for i, texts in enumerate(card_texts):
+            try:
+                quotes.append(_parse_quote_card(*texts))
+                print(f"✅ Parsed quote {i+1}: {texts[0]}")
+            except Exception as e:
+                print(f"⚠️ Error parsing quote card {i+1}: {e}")
+        
+        if not quotes:
+            return [], self._unparsable_results_error()
+        return quotes, None
+
+    def _driver_error_response(self, e: Exception) -> Dict:
+        """Map an exception raised while driving the browser to an error response"""
+        if isinstance(e, WebDriverException):
             return self._create_error_response(
+                "Browser automation failed 🌐",
+                f"WebDriver error: {str(e)}",
+                "Make sure Chrome is installed and try updating ChromeDriver",
+                error_type=TIMEOUT_ERROR if isinstance(e, TimeoutException) else BROWSER_ERROR,
+            )
+        return self._create_error_response(
+            "Unexpected error occurred 🤯",
+            f"Error: {str(e)}",
+            "This is probably a bug - please report it on GitHub!",
+            error_type=BROWSER_ERROR,
+        )
+
+    def _validate_route(self, city: str, service_type: str) -> Tuple[str, Optional[Dict]]:
+        """Returns (service type to use, error response if the city is unsupported)"""
+        if city not in self.SUPPORTED_CITIES:
+            return service_type, self._create_error_response(
                 f"City '{city}' is not supported 🏙️",
                 f"Supported cities: {', '.join(self.SUPPORTED_CITIES)}",
-                "Please use one of the supported cities or request Porter.in to expand!"
+                "Please use one of the supported cities or request Porter.in to expand!",
+                error_type=INPUT_ERROR,
             )
             
         if service_type not in self.SERVICE_TYPES:
@@ -351,189 +641,351 @@ class PorterAPI:
             #     f"Supported services: {', '.join(self.SERVICE_TYPES)}",
             #     "Check your service_type parameter spelling!"
             # )
+        return service_type, None
+
+    def _quote_response(self, pickup_address: str, drop_address: str, city: str, service_type: str, quotes: List[Dict]) -> Dict:
+        """The success response for a completed quote"""
+        print(f"🎉 Successfully retrieved {len(quotes)} quotes!")
+        return records.quote_result(
+            pickup_address=pickup_address,
+            drop_address=drop_address,
+            city=city,
+            service_type=service_type,
+            user_name=self.name,
+            user_phone=self.phone,
+            quotes=quotes,
+        )
+
+    def get_quote(self, pickup_address: str, drop_address: str, city: str, service_type: str = "trucks", driver=None, page_state: Tuple[str, str] = None) -> Dict:
+        """
+        Get delivery quotes from Porter.in
+        
+        Args:
+            pickup_address: Where to pick up from
+            drop_address: Where to deliver to  
+            city: City name (must be supported)
+            service_type: Type of service needed
+            driver: Optional driver or BrowserContext to run on instead of launching
+                    a new browser. It is left open for the caller to reuse.
+            page_state: (city, service_type) the driver's page already shows results
+                        for. The city and service steps it matches are skipped; if
+                        the warm page doesn't work out, the quote starts over.
+            
+        Returns:
+            Dictionary with quotes on success, or error information
+        """
+        # Validate inputs
+        service_type, error = self._validate_route(city, service_type)
+        if error:
+            return error
         
         # Initialize the Selenium driver
-        driver = None
+        owns_driver = driver is None
+        result = None
         try:
-            driver = get_selenium_driver()
-            wait = WebDriverWait(driver, 15)
-            waitFormSubmit = WebDriverWait(driver, 30)
-            print("🚀 Driver initialized. Navigating to https://porter.in")
-
-            driver.get("https://porter.in/")
-            
-            # Select city
-            print(f"🏙️ Selecting city: {city}")
-            city_selector = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "CitySelector_city-selected-text__1dNz4")))
-            city_selector.click()
-            
-            city_elements = driver.find_elements(By.CSS_SELECTOR, '[class^="CitySelectorModal_city-title"]')
-            city_found = False
-            for el in city_elements:
-                if city.lower() in el.text.lower():
-                    el.click()
-                    city_found = True
-                    print(f"✅ Selected city: {city}")
-                    break
-                    
-            if not city_found:
-                return self._create_error_response(
-                    f"Could not find city '{city}' on Porter.in 🗺️",
-                    "The city might not be available or Porter.in changed their interface",
-                    "Double-check the city name or try a different supported city"
-                )
-                
-            # Open estimate form
-            print("📋 Opening estimate form...")
-            estimate_card = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "EstimateCard_estimate-card__NgFIr")))
-            estimate_card.click()
-            
-            # Select service type
-            if not self.select_service_type(driver, wait, service_type):
-                return self._create_error_response(
-                    f"Could not select service type: {service_type} 🚛",
-                    "Porter.in might have changed their interface",
-                    "Try a different service type or report this issue"
-                )
-            
-            # Select requirement type
-            print("👤 Selecting requirement type...")
-            self.select_requirement_type(driver, wait, "business")
-            
-            # Fill pickup address
-            print("📍 Filling pickup address...")
-            try:
-                pickup_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="Enter pickup address"]')))
-                self.select_address_from_autocomplete(driver, wait, pickup_input, pickup_address)
-            except TimeoutException:
-                return self._create_error_response(
-                    "Could not find pickup address field 📍",
-                    "Porter.in might have changed their form structure"
-                )
-            
-            # Fill drop address
-            print("🎯 Filling drop address...")
-            try:
-                drop_input = driver.find_element(By.CSS_SELECTOR, 'input[placeholder="Enter drop address"]')
-                self.select_address_from_autocomplete(driver, wait, drop_input, drop_address)
-            except NoSuchElementException:
-                return self._create_error_response(
-                    "Could not find drop address field 🎯",
-                    "Porter.in might have changed their form structure"
-                )
+            if owns_driver:
+                driver = get_selenium_driver()
+            self._notify("on_start", driver)
+            if page_state:
+                result = self._run_warm_quote(driver, pickup_address, drop_address, city, service_type, page_state)
+                if result is None:
+                    self._notify("on_restart", driver)
+            if result is None:
+                result = self._run_quote(driver, pickup_address, drop_address, city, service_type)
             
-            # Fill contact details
-            print("📱 Filling contact details...")
-            try:
-                mobile_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.FareEstimateForms_mobile-input__jy5wR')))
-                mobile_input.clear()
-                mobile_input.send_keys(self.phone)
-                
-                name_input = driver.find_element(By.CSS_SELECTOR, '.FareEstimateForms_name-input__n8xyD')
-                name_input.clear()
-                name_input.send_keys(self.name)
-            except (TimeoutException, NoSuchElementException):
-                return self._create_error_response(
-                    "Could not fill contact details 📱",
-                    "Porter.in might have changed their form fields"
-                )
-            
-            # Submit form
-            print("🚀 Submitting form...")
-            try:
-                submit_btn = waitFormSubmit.until(EC.element_to_be_clickable((By.CSS_SELECTOR, '.FormInput_submit__ea0jJ.FormInput_submit-enabled__DbSnE.FareEstimateForms_submit-container___lB5u')))
-                submit_btn.click()
-            except TimeoutException:
-                return self._create_error_response(
-                    "Could not submit the form 🚀",
-                    "The submit button might not be clickable or form validation failed",
-                    "Check if all fields are properly filled"
-                )
-            
-            # Wait for results
-            print("⏳ Waiting for results...")
-            try:
-                wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'FareEstimateResultVehicleCard_container__BdMav')))
-                result_cards = driver.find_elements(By.CLASS_NAME, 'FareEstimateResultVehicleCard_container__BdMav')
-            except TimeoutException:
-                return self._create_error_response(
-                    "Results took too long to load ⏰",
-                    "Porter.in might be slow or the addresses couldn't be processed",
-                    "Try different addresses or run the script again"
-                )
-            
-            if not result_cards:
-                return self._create_error_response(
-                    "No delivery options found 📦",
-                    "Porter.in couldn't find any vehicles for your route",
-                    "Try different addresses or check if the route is serviceable"
-                )
-            
-            # Parse results
-            quotes = []
-            for i, card in enumerate(result_cards):
-                try:
-                    vehicle_name = card.find_element(By.CLASS_NAME, 'FareEstimateResultVehicleCard_vehicle-name__d4107').text
-                    price_text = card.find_element(By.CSS_SELECTOR, '.FareEstimateResultVehicleCard_vehicle-fare__3YMOc p').text
-                    min_price, max_price = _parse_price_range(price_text)
-                    capacity = card.find_element(By.CLASS_NAME, 'VehicleCapacity_vehicle-capacity__P53Z0').text
-                    capacity_kg = _parse_capacity(capacity)
-                    
-                    quotes.append({
-                        "vehicle_name": vehicle_name,
-                        "price_range": price_text,
-                        "min_price": min_price,
-                        "max_price": max_price,
-                        "capacity": capacity,
-                        "capacity_kg": capacity_kg
-                    })
-                    print(f"✅ Parsed quote {i+1}: {vehicle_name}")
-                    
-                except Exception as e:
-                    print(f"⚠️ Error parsing quote card {i+1}: {e}")
-                    continue
-            
-            if not quotes:
-                return self._create_error_response(
-                    "Could not parse any quotes 📊",
-                    "Porter.in returned results but we couldn't understand the format",
-                    "Porter.in might have changed their result structure"
-                )
-                    
-            print(f"🎉 Successfully retrieved {len(quotes)} quotes!")
-            return {
-                "success": True,
-                "pickup_address": pickup_address,
-                "drop_address": drop_address,
-                "city": city,
-                "service_type": service_type,
-                "user_name": self.name,
-                "user_phone": self.phone,
-                "quotes": quotes,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+        except Exception as e:
+            result = self._driver_error_response(e)
             
-        except WebDriverException as e:
-            return self._create_error_response(
-                "Browser automation failed 🌐",
-                f"WebDriver error: {str(e)}",
-                "Make sure Chrome is installed and try updating ChromeDriver"
+        finally:
+            if driver and result is not None:
+                self._notify("on_finish", driver, result)
+            if driver and owns_driver:
+                _quit_driver(driver)
+
+        return result
+
+    def iter_quote(self, pickup_address: str, drop_address: str, city: str, service_type: str = "trucks", driver=None) -> Iterator[Tuple[str, object]]:
+        """
+        Streaming get_quote: yields (event, payload) pairs as soon as each is known.
+
+            ("context", dict)  the route and user, before the browser starts
+            ("quote", dict)    each vehicle card, as soon as it is parsed
+            ("done", dict) or ("error", dict)  the same result get_quote returns
+
+        A browser launched here is quit in the background, so the final event
+        isn't held back by Chrome shutting down. Closing the generator early
+        stops the scrape.
+        """
+        service_type, error = self._validate_route(city, service_type)
+        if error:
+            yield "error", error
+            return
+        yield "context", {
+            "pickup_address": pickup_address,
+            "drop_address": drop_address,
+            "city": city,
+            "service_type": service_type,
+            "user_name": self.name,
+            "user_phone": self.phone,
+        }
+
+        owns_driver = driver is None
+        result = None
+        try:
+            if owns_driver:
+                driver = get_selenium_driver()
+            self._notify("on_start", driver)
+            wait = WebDriverWait(driver, 15)
+            result = self._fill_and_submit(driver, pickup_address, drop_address, city, service_type)
+            if result is None:
+                cards, result = self._wait_for_result_cards(driver, wait)
+            if result is None:
+                quotes = []
+                for i, card in enumerate(cards):
+                    try:
+                        quote = _parse_quote_card(*_read_result_card(card))
+                    except Exception as e:
+                        print(f"⚠️ Error reading quote card {i+1}: {e}")
+                        continue
+                    quotes.append(quote)
+                    yield "quote", quote
+                if quotes:
+                    self._notify("on_stage", driver, "results")
+                    result = self._quote_response(pickup_address, drop_address, city, service_type, quotes)
+                else:
+                    result = self._unparsable_results_error()
+
+        except Exception as e:
+            result = self._driver_error_response(e)
+
+        finally:
+            if driver and result is not None:
+                self._notify("on_finish", driver, result)
+            if driver and owns_driver:
+                _quit_in_background(driver)
+
+        yield ("done" if result.get("success") else "error"), result
+
+    def _run_warm_quote(self, driver, pickup_address: str, drop_address: str, city: str, service_type: str, page_state: Tuple[str, str]) -> Optional[Dict]:
+        """Quote on a page left on earlier results; None if the page is unusable or the run fails"""
+        if page_state[0] != city:
+            return None
+        cards = driver.find_elements(By.CLASS_NAME, RESULT_CARD_CLASS)
+        if not cards:
+            return None
+        print(f"♨️ Page already shows {page_state[0]}/{page_state[1]} results, reusing it")
+        try:
+            result = self._run_quote(
+                driver, pickup_address, drop_address, city, service_type,
+                same_service=page_state[1] == service_type, stale_card=cards[0],
             )
-            
         except Exception as e:
-            return self._create_error_response(
-                "Unexpected error occurred 🤯",
-                f"Error: {str(e)}",
-                "This is probably a bug - please report it on GitHub!"
+            print(f"⚠️ Warm page failed ({e}), starting over")
+            return None
+        if not result.get("success"):
+            print(f"⚠️ Warm page failed ({result.get('error')}), starting over")
+            return None
+        return result
+
+    def _run_quote(self, driver, pickup_address: str, drop_address: str, city: str, service_type: str, same_service: bool = False, stale_card=None) -> Dict:
+        """The get_quote flow on an open driver (see _fill_and_submit for the warm-page arguments)"""
+        error = self._fill_and_submit(driver, pickup_address, drop_address, city, service_type, same_service, stale_card)
+        if error:
+            return error
+
+        quotes, error = self._collect_quotes(driver, WebDriverWait(driver, 15), stale_card=stale_card)
+        if error:
+            return error
+        self._notify("on_stage", driver, "results")
+        return self._quote_response(pickup_address, drop_address, city, service_type, quotes)
+
+    def _fill_and_submit(self, driver, pickup_address: str, drop_address: str, city: str, service_type: str, same_service: bool = False, stale_card=None) -> Optional[Dict]:
+        """
+        Every stage up to the submitted form; hooks are told about each completed stage.
+        With `stale_card` (a result card of the city's previous search) the page is
+        reused: only the rate-limit token is taken instead of navigating and picking
+        the city, and `same_service` skips the category too. Returns an error response on failure.
+        """
+        wait = WebDriverWait(driver, 15)
+        waitFormSubmit = WebDriverWait(driver, 30)
+        warm = stale_card is not None
+
+        steps = (
+            ("estimate_form", lambda: self._wait_for_rate_limit(city) if warm else self._open_estimate_form(driver, wait, city)),
+            ("service_selected", lambda: None if same_service else self._choose_service_type(driver, wait, service_type)),
+            ("form_filled", lambda: self._fill_route_form(driver, wait, pickup_address, drop_address)),
+            ("submitted", lambda: self._submit_form(driver, waitFormSubmit)),
+        )
+        for stage, step in steps:
+            error = step()
+            if error:
+                return error
+            self._notify("on_stage", driver, stage)
+        return None
+
+    def get_quotes_multi(self, pickup_address: str, drop_address: str, city: str, service_types: List[str] = None, driver=None, breaker=None) -> Dict:
+        """
+        Get quotes for several service types of one route from a single form fill.
+
+        The addresses and contact details are filled once; for every further
+        service type only the category is switched on the same page and the
+        new results are collected. Like get_quote, every porter.in request
+        waits for the rate limiter and the hooks hear about each stage.
+
+        Args:
+            pickup_address: Where to pick up from
+            drop_address: Where to deliver to
+            city: City name (must be supported)
+            service_types: Service types to quote (default: all supported)
+            driver: Optional driver or BrowserContext to run on (left open)
+            breaker: Optional health.CircuitBreaker asked before the browser
+                     starts and told the outcome afterwards
+
+        Returns:
+            Dictionary with a per-service-type result under "results". Each entry
+            has "success" and either "quotes" or error information. When no type
+            could be quoted, "error_type" says why (the most serious failure).
+        """
+        _, error = self._validate_route(city, "trucks")
+        if error:
+            return error
+
+        results: Dict[str, Dict] = {}
+        requested = list(dict.fromkeys(service_types or self.SERVICE_TYPES))
+        for service_type in requested:
+            if service_type not in self.SERVICE_TYPES:
+                results[service_type] = {**self._create_error_response(
+                    f"Service type '{service_type}' is not supported 🚛",
+                    f"Supported services: {', '.join(self.SERVICE_TYPES)}",
+                    "Check your service_types parameter spelling!",
+                    error_type=INPUT_ERROR,
+                ), "service_type": service_type}
+        pending = [s for s in requested if s not in results]
+        if pending and breaker is not None and not breaker.allow():
+            retry_after = breaker.retry_after()
+            response = self._create_error_response(
+                "Porter.in scrapes are failing, pausing for a moment 🔌",
+                f"{breaker.failure_threshold} scrapes in a row failed",
+                f"Try again in {retry_after:.0f}s",
+                error_type="circuit_open",
             )
-            
+            response["retry_after"] = retry_after
+            return response
+
+        owns_driver = driver is None
+        started = False
+        response = None
+        try:
+            if pending:
+                if owns_driver:
+                    driver = get_selenium_driver()
+                self._notify("on_start", driver)
+                started = True
+                self._quote_service_types(driver, pickup_address, drop_address, city, pending, results)
+
+        except Exception as e:
+            error = self._driver_error_response(e)
+            for service_type in pending:
+                results.setdefault(service_type, {**error, "service_type": service_type})
+
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                    print("🛑 Browser closed")
-                except Exception:
-                    pass
+            response = self._multi_response(pickup_address, drop_address, city, requested, results)
+            if started:
+                self._notify("on_finish", driver, response)
+            if breaker is not None and pending:
+                breaker.record_result(response)
+            if driver and owns_driver:
+                _quit_driver(driver)
+
+        return response
+
+    def _quote_service_types(self, driver, pickup_address: str, drop_address: str, city: str, service_types: List[str], results: Dict[str, Dict]):
+        """The get_quotes_multi flow on an open driver: one entry in `results` per service type"""
+        wait = WebDriverWait(driver, 15)
+        waitFormSubmit = WebDriverWait(driver, 30)
+
+        error = self._open_estimate_form(driver, wait, city)
+        if error:
+            for service_type in service_types:
+                results[service_type] = {**error, "service_type": service_type}
+            return
+        self._notify("on_stage", driver, "estimate_form")
+
+        last_card = None
+        for i, service_type in enumerate(service_types):
+            try:
+                quotes, error = self._quote_service_type(driver, wait, waitFormSubmit, pickup_address, drop_address, city, service_type, i, last_card)
+            except Exception as e:
+                quotes, error = None, self._driver_error_response(e)
+            if error:
+                print(f"❌ {service_type}: {error['error']}")
+                results[service_type] = {**error, "service_type": service_type}
+                continue
+            cards = driver.find_elements(By.CLASS_NAME, RESULT_CARD_CLASS)
+            last_card = cards[0] if cards else None
+            results[service_type] = {"success": True, "service_type": service_type, "quotes": quotes}
+            print(f"🎉 {service_type}: retrieved {len(quotes)} quotes")
+
+    def _quote_service_type(self, driver, wait, waitFormSubmit, pickup_address: str, drop_address: str, city: str, service_type: str, index: int, last_card) -> Tuple[Optional[List[Dict]], Optional[Dict]]:
+        """Switch to one service type on the open form and collect its quotes: (quotes, None) or (None, error)"""
+        # Every further category is another estimate request to porter.in
+        error = self._wait_for_rate_limit(city) if index else None
+        error = error or self._choose_service_type(driver, wait, service_type)
+        if error:
+            return None, error
+        self._notify("on_stage", driver, "service_selected")
+
+        pickup_input = driver.find_elements(By.CSS_SELECTOR, 'input[placeholder="Enter pickup address"]')
+        # The form is filled once; refill only if switching category reset it
+        if index == 0 or not pickup_input or not pickup_input[0].get_attribute("value"):
+            error = self._fill_route_form(driver, wait, pickup_address, drop_address)
+            if error:
+                return None, error
+            self._notify("on_stage", driver, "form_filled")
+
+        if last_card is None:
+            error = self._submit_form(driver, waitFormSubmit)
+            if error:
+                return None, error
+        else:
+            # Some categories refresh results by themselves, others need a
+            # resubmit, so a submit button that never enables is not an error
+            self._submit_form(driver, WebDriverWait(driver, 3))
+        self._notify("on_stage", driver, "submitted")
+
+        quotes, error = self._collect_quotes(driver, wait, stale_card=last_card)
+        if error and last_card is not None and error["error_type"] == TIMEOUT_ERROR:
+            # The previous category's results never went away: the switch didn't take
+            error = self._create_error_response(
+                f"Results didn't change after switching to {service_type} 🚛",
+                "Porter.in kept showing the previous service type's results",
+                "Quote this service type on its own with get_quote",
+            )
+        if error:
+            return None, error
+        self._notify("on_stage", driver, "results")
+        return quotes, None
+
+    def _multi_response(self, pickup_address: str, drop_address: str, city: str, requested: List[str], results: Dict[str, Dict]) -> Dict:
+        entries = {s: results[s] for s in requested}
+        response = {
+            "success": any(r.get("success") for r in entries.values()),
+            "pickup_address": pickup_address,
+            "drop_address": drop_address,
+            "city": city,
+            "service_types": requested,
+            "user_name": self.name,
+            "user_phone": self.phone,
+            "results": entries,
+            "timestamp": records.now_text(),
+        }
+        if not response["success"]:
+            # A browser failure or timeout outranks bad input, so the breaker sees it
+            error_types = [r.get("error_type") for r in entries.values()]
+            response["error_type"] = next(
+                (t for t in error_types if t in (BROWSER_ERROR, TIMEOUT_ERROR)), error_types[0] if error_types else PAGE_ERROR
+            )
+        return response
 
 def scrape_h2_heading():
     """
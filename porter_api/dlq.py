@@ -0,0 +1,206 @@
+"""
+Dead-letter queues for pipeline items that won't be retried, and a tool to inspect and replay them.
+
+Items land here when their failure is permanent (bad payload, unsupported
+city) or they ran out of attempts. Each entry keeps the original body, the
+reason, the attempt count and the scrape seconds the last attempt wasted.
+
+    python -m porter_api.dlq list --file dlq.jsonl
+    python -m porter_api.dlq list --queue-url https://sqs.../porter-dlq
+    python -m porter_api.dlq replay --file dlq.jsonl --reason "scrape failed" --to-queue https://sqs.../porter
+    python -m porter_api.dlq replay --file dlq.jsonl --to-file routes.jsonl
+"""
+import argparse
+import fcntl
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .records import dumps, now_text
+
+
+def _entry(item, reason: str) -> Dict:
+    body = item.body if isinstance(item.body, str) else (
+        item.body.decode() if isinstance(item.body, bytes) else dumps(item.body).decode()
+    )
+    return {
+        "id": item.id,
+        "reason": reason,
+        "receive_count": item.receive_count,
+        "wasted_seconds": round(item.scrape_seconds, 2),
+        "dead_lettered_at": now_text(),
+        "body": body,
+    }
+
+
+class JSONLDeadLetterQueue:
+    """
+    Appends dead-lettered items to a local JSONL file.
+
+    Writers and replays in every process on the host serialize on an flock'ed
+    `<path>.lock` file. It can't be the data file itself, since a replay
+    swaps that file out and an append to the old one would be lost.
+    """
+
+    def __init__(self, path: str = "dlq.jsonl"):
+        self.path = path
+
+    @contextmanager
+    def _locked(self, operation: int = fcntl.LOCK_EX):
+        # flock belongs to the open file, so each call opens its own: threads exclude each other too
+        with open(os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o666)) as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def put(self, item, reason: str):
+        line = dumps(_entry(item, reason))
+        with self._locked(), open(self.path, "ab") as f:
+            f.write(line + b"\n")
+
+    def _read(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entries(self) -> List[Dict]:
+        with self._locked(fcntl.LOCK_SH):
+            return self._read()
+
+    def remove(self, ids: set):
+        """Drop the entries with these ids (after a replay)"""
+        with self._locked():
+            kept = [entry for entry in self._read() if entry["id"] not in ids]
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                for entry in kept:
+                    f.write(dumps(entry) + b"\n")
+            os.replace(tmp, self.path)
+
+
+class SQSDeadLetterQueue:
+    """
+    Sends dead-lettered items to an SQS queue with the reason as message attributes.
+    Unlike a redrive policy this takes permanent failures on their first receive.
+    """
+
+    def __init__(self, client, queue_url: str):
+        self.client = client
+        self.queue_url = queue_url
+
+    def put(self, item, reason: str):
+        entry = _entry(item, reason)
+        self.client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=entry.pop("body"),
+            MessageAttributes={
+                f"porter_{name}": {"DataType": "String", "StringValue": str(value)}
+                for name, value in entry.items()
+            },
+        )
+
+    def receive(self, max_messages: int = None) -> Iterator[Tuple[Dict, Callable[[], None]]]:
+        """(entry, delete) pairs until the queue looks empty. Received messages stay hidden until deleted or their timeout ends."""
+        received = 0
+        while max_messages is None or received < max_messages:
+            messages = self.client.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=10 if max_messages is None else min(10, max_messages - received),
+                MessageAttributeNames=["All"],
+                WaitTimeSeconds=1,
+            ).get("Messages", [])
+            if not messages:
+                return
+            for message in messages:
+                received += 1
+                attributes = message.get("MessageAttributes", {})
+                entry = {
+                    name[len("porter_"):]: value.get("StringValue")
+                    for name, value in attributes.items() if name.startswith("porter_")
+                }
+                entry.setdefault("id", message["MessageId"])
+                entry["body"] = message["Body"]
+                yield entry, lambda handle=message["ReceiptHandle"]: self.client.delete_message(
+                    QueueUrl=self.queue_url, ReceiptHandle=handle
+                )
+
+
+def _sqs_client():
+    import boto3
+
+    return boto3.client("sqs", region_name=os.getenv("AWS_REGION"))
+
+
+def _matches(entry: Dict, reason: Optional[str]) -> bool:
+    return not reason or str(entry.get("reason", "")).startswith(reason)
+
+
+def _print_entries(entries: List[Dict]):
+    for entry in entries:
+        body = entry["body"] if len(entry["body"]) <= 80 else entry["body"][:77] + "..."
+        print(f"{entry.get('dead_lettered_at', '')}  {entry['id']}  attempts={entry.get('receive_count')}  "
+              f"wasted={entry.get('wasted_seconds')}s  {entry.get('reason')}\n    {body}")
+    by_reason = Counter(str(entry.get("reason", "")).split(":")[0] for entry in entries)
+    print(f"📭 {len(entries)} dead-lettered message(s): {dict(by_reason)}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Inspect and replay dead-lettered pipeline messages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("list", "Show dead-lettered messages"), ("replay", "Send dead-lettered messages back for processing")):
+        command = commands.add_parser(name, help=help_text)
+        source = command.add_mutually_exclusive_group()
+        source.add_argument("--file", default="dlq.jsonl", help="Local JSONL dead-letter file")
+        source.add_argument("--queue-url", help="SQS dead-letter queue")
+        command.add_argument("--reason", help="Only messages whose reason starts with this (e.g. 'scrape failed')")
+        command.add_argument("--limit", type=int, help="At most this many messages")
+        if name == "replay":
+            target = command.add_mutually_exclusive_group(required=True)
+            target.add_argument("--to-queue", help="SQS queue to send the bodies to (usually the main queue)")
+            target.add_argument("--to-file", help="JSONL file for `python -m porter_api.pipeline --input`")
+    args = parser.parse_args(argv)
+
+    sqs = _sqs_client() if args.queue_url or getattr(args, "to_queue", None) else None
+    if args.queue_url:
+        # Listing an SQS queue means receiving from it; entries not replayed reappear after the visibility timeout
+        received = [
+            (entry, delete) for entry, delete in SQSDeadLetterQueue(sqs, args.queue_url).receive(args.limit)
+            if _matches(entry, args.reason)
+        ]
+    else:
+        local = JSONLDeadLetterQueue(args.file)
+        received = [(entry, None) for entry in local.entries() if _matches(entry, args.reason)][:args.limit]
+
+    entries = [entry for entry, _ in received]
+    if args.command == "list":
+        _print_entries(entries)
+        return
+
+    out = open(args.to_file, "a", encoding="utf-8") if args.to_file else None
+    replayed = set()
+    try:
+        for entry, delete in received:
+            if out:
+                try:
+                    line = dumps(json.loads(entry["body"])).decode()
+                except ValueError:
+                    print(f"⚠️ Skipping {entry['id']}: its body is not JSON")
+                    continue
+                out.write(line + "\n")
+            else:
+                sqs.send_message(QueueUrl=args.to_queue, MessageBody=entry["body"])
+            if delete:
+                delete()
+            replayed.add(entry["id"])
+    finally:
+        if out:
+            out.close()
+        if not args.queue_url and replayed:
+            local.remove(replayed)
+    print(f"🔁 Replayed {len(replayed)} message(s) to {args.to_queue or args.to_file}")
+
+
+if __name__ == "__main__":
+    main()
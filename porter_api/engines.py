@@ -0,0 +1,384 @@
+"""
+Scrape engines: the get_quote flow behind one asyncio interface.
+
+    SeleniumEngine  the PorterAPI Selenium steps, each run in a worker thread
+    CDPEngine       raw CDP over one websocket, entirely on the event loop
+
+    async with CDPBrowser() as browser:
+        result = await CDPEngine(api, browser).get_quote(pickup, drop, "Bangalore")
+
+An engine instance runs one quote at a time; create one per quote.
+"""
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from . import core, ratelimit
+from .cdp import CDPBrowser, CDPPage
+from .core import INPUT_ERROR, TIMEOUT_ERROR, PorterAPI, RESULT_CARD_CLASS, get_selenium_driver
+from .exceptions import PorterAPIError
+
+
+class ScrapeEngine(ABC):
+    """
+    One browser backend for the quote flow.
+
+    Every step returns None on success or an error response (as built by
+    PorterAPI._create_error_response); `get_quote` chains them and tells the
+    API's hooks about each completed stage, under the same stage names as
+    PorterAPI.get_quote.
+    """
+
+    def __init__(self, api: PorterAPI):
+        self.api = api
+
+    @property
+    def hook_target(self):
+        """What the hooks receive as `driver`: the page being scraped"""
+        return None
+
+    async def notify(self, event: str, *args):
+        """Call the API's hooks; they are quick and synchronous, so they run right here"""
+        self.api._notify(event, self.hook_target, *args)
+
+    @abstractmethod
+    async def open(self):
+        """Get a fresh page to scrape on"""
+
+    @abstractmethod
+    async def close(self):
+        """Release the page"""
+
+    @abstractmethod
+    async def navigate(self, url: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    async def select_city(self, city: str) -> Optional[Dict]:
+        """Pick the city and open the estimate form"""
+
+    @abstractmethod
+    async def select_service(self, service_type: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    async def fill_addresses(self, pickup_address: str, drop_address: str) -> Optional[Dict]:
+        """Fill the requirement type, both addresses and the API's contact details"""
+
+    @abstractmethod
+    async def submit(self) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    async def extract(self) -> Tuple[List[Dict], Optional[Dict]]:
+        """Wait for the result cards and parse them into quotes"""
+
+    async def get_quote(self, pickup_address: str, drop_address: str, city: str, service_type: str = "trucks") -> Dict:
+        """Same contract and response as PorterAPI.get_quote"""
+        service_type, error = self.api._validate_route(city, service_type)
+        if error:
+            return error
+        # The reserved slot is awaited, so a quote waiting for a token holds no thread
+        try:
+            waited = await ratelimit.acquire_async(city)
+        except PorterAPIError as e:
+            return self.api._rate_limit_error_response(e)
+        if waited:
+            print(f"🚦 Waited {waited:.1f}s for the rate limiter")
+
+        result = None
+        try:
+            await self.open()
+            await self.notify("on_start")
+            result = await self._run_steps(pickup_address, drop_address, city, service_type)
+        except asyncio.TimeoutError as e:
+            result = self.api._driver_error_response(TimeoutException(str(e)))
+        except Exception as e:
+            result = self.api._driver_error_response(e)
+        finally:
+            if result is not None:
+                await self.notify("on_finish", result)
+            await self.close()
+        return result
+
+    async def _run_steps(self, pickup_address: str, drop_address: str, city: str, service_type: str) -> Dict:
+        async def open_form():
+            return await self.navigate(core.PORTER_URL) or await self.select_city(city)
+
+        steps = (
+            ("estimate_form", open_form),
+            ("service_selected", lambda: self.select_service(service_type)),
+            ("form_filled", lambda: self.fill_addresses(pickup_address, drop_address)),
+            ("submitted", self.submit),
+        )
+        for stage, step in steps:
+            error = await step()
+            if error:
+                return error
+            await self.notify("on_stage", stage)
+        quotes, error = await self.extract()
+        if error:
+            return error
+        await self.notify("on_stage", "results")
+        return self.api._quote_response(pickup_address, drop_address, city, service_type, quotes)
+
+
+class SeleniumEngine(ScrapeEngine):
+    """
+    The existing Selenium steps, each run on `executor` (default: asyncio's).
+
+    Pass a driver or BrowserContext to run on it (it is left open);
+    otherwise a Chrome is launched per quote.
+    """
+
+    def __init__(self, api: PorterAPI, driver=None, executor: Executor = None):
+        super().__init__(api)
+        self.driver = driver
+        self.executor = executor
+        self._owns_driver = driver is None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+
+    @property
+    def hook_target(self):
+        return self.driver
+
+    async def notify(self, event: str, *args):
+        # Hooks like the tracer issue WebDriver commands, which must not block the loop
+        await self._run(self.api._notify, event, self.driver, *args)
+
+    async def open(self):
+        if self.driver is None:
+            self.driver = await self._run(get_selenium_driver, 0)
+        self.wait = WebDriverWait(self.driver, 15)
+        self.wait_submit = WebDriverWait(self.driver, 30)
+
+    async def close(self):
+        if self._owns_driver and self.driver is not None:
+            try:
+                await self._run(self.driver.quit)
+            except Exception:
+                pass
+            self.driver = None
+
+    async def navigate(self, url: str) -> Optional[Dict]:
+        print(f"🚀 Navigating to {url}")
+        await self._run(self.driver.get, url)
+
+    async def select_city(self, city: str) -> Optional[Dict]:
+        return await self._run(self.api._select_city, self.driver, self.wait, city)
+
+    async def select_service(self, service_type: str) -> Optional[Dict]:
+        return await self._run(self.api._choose_service_type, self.driver, self.wait, service_type)
+
+    async def fill_addresses(self, pickup_address: str, drop_address: str) -> Optional[Dict]:
+        return await self._run(self.api._fill_route_form, self.driver, self.wait, pickup_address, drop_address)
+
+    async def submit(self) -> Optional[Dict]:
+        return await self._run(self.api._submit_form, self.driver, self.wait_submit)
+
+    async def extract(self) -> Tuple[List[Dict], Optional[Dict]]:
+        return await self._run(self.api._collect_quotes, self.driver, self.wait)
+
+
+SERVICE_LABELS = {
+    "two_wheelers": "Two Wheelers",
+    "trucks": "Trucks",
+    "packers_and_movers": "Packers & Movers",
+}
+SERVICE_SELECTOR = (
+    ".CategorySelector_category-select-container__LgXjx, "
+    "[class*='CategorySelector'][class*='container'], [class*='category-select-container']"
+)
+PICKUP_INPUT = 'input[placeholder="Enter pickup address"]'
+DROP_INPUT = 'input[placeholder="Enter drop address"]'
+MOBILE_INPUT = '.FareEstimateForms_mobile-input__jy5wR'
+NAME_INPUT = '.FareEstimateForms_name-input__n8xyD'
+SUBMIT_BUTTON = '.FormInput_submit__ea0jJ.FormInput_submit-enabled__DbSnE.FareEstimateForms_submit-container___lB5u'
+# Suggestion lists only: generic selectors ("ul li") would match the nav or footer before the list renders
+AUTOCOMPLETE_CONTAINERS = "[class*='autocomplete'], [class*='suggestion'], [role='listbox'], .pac-container"
+AUTOCOMPLETE_OPTION = "li, [role='option'], .pac-item"
+CARD_FIELDS = [
+    '.FareEstimateResultVehicleCard_vehicle-name__d4107',
+    '.FareEstimateResultVehicleCard_vehicle-fare__3YMOc p',
+    '.VehicleCapacity_vehicle-capacity__P53Z0',
+]
+
+_EXISTS = "(selector) => !!document.querySelector(selector)"
+_CLICK = """(selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    el.click();
+    return true;
+}"""
+_CLICK_TEXT = """(selector, text) => {
+    const el = Array.from(document.querySelectorAll(selector))
+        .find(e => e.textContent.toLowerCase().includes(text.toLowerCase()));
+    if (!el) return false;
+    el.click();
+    return true;
+}"""
+_CHECK = """(selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    if (!el.checked) el.click();
+    return true;
+}"""
+# The native setter makes frameworks that track input values (React) see the change
+_SET_VALUE = """(selector, value) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    el.focus();
+    Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set.call(el, value);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return true;
+}"""
+# The first option of a visible suggestion list around the input; Google Places puts its list under <body>
+_PICK_SUGGESTION = """(inputSelector, containers, optionSelector) => {
+    const input = document.querySelector(inputSelector);
+    if (!input) return false;
+    const pick = (root) => {
+        for (const list of root.querySelectorAll(containers)) {
+            if (list.offsetParent === null && getComputedStyle(list).position !== 'fixed') continue;
+            const option = list.querySelector(optionSelector);
+            if (option) { option.click(); return true; }
+        }
+        return false;
+    };
+    for (let scope = input.parentElement, depth = 0; scope && depth < 3; scope = scope.parentElement, depth++) {
+        if (pick(scope)) return true;
+    }
+    return pick(document.body);
+}"""
+_PRESS_ENTER = """(selector) => {
+    document.querySelector(selector).dispatchEvent(new KeyboardEvent('keydown', {key: 'Enter', bubbles: true}));
+    return true;
+}"""
+_READ_CARDS = """(cardClass, fields) => Array.from(document.getElementsByClassName(cardClass)).map(
+    card => fields.map(selector => { const el = card.querySelector(selector); return el ? el.innerText.trim() : null; })
+)"""
+
+
+class CDPEngine(ScrapeEngine):
+    """
+    The quote flow over raw CDP: every step is a few Runtime.evaluate calls,
+    and waits poll the page instead of sleeping, so a step costs one
+    websocket round trip rather than a parked thread.
+    """
+
+    def __init__(self, api: PorterAPI, browser: CDPBrowser):
+        super().__init__(api)
+        self.browser = browser
+        self.page: Optional[CDPPage] = None
+
+    @property
+    def hook_target(self):
+        return self.page
+
+    async def open(self):
+        self.page = await self.browser.new_page()
+
+    async def close(self):
+        if self.page is not None:
+            await self.browser.close_page(self.page)
+            self.page = None
+
+    async def navigate(self, url: str) -> Optional[Dict]:
+        print(f"🚀 Navigating to {url}")
+        await self.page.navigate(url)
+
+    async def select_city(self, city: str) -> Optional[Dict]:
+        print(f"🏙️ Selecting city: {city}")
+        await self.page.wait_for(_CLICK, ".CitySelector_city-selected-text__1dNz4")
+        await self.page.wait_for(_EXISTS, '[class^="CitySelectorModal_city-title"]')
+        if not await self.page.call(_CLICK_TEXT, '[class^="CitySelectorModal_city-title"]', city):
+            return self.api._create_error_response(
+                f"Could not find city '{city}' on Porter.in 🗺️",
+                "The city might not be available or Porter.in changed their interface",
+                "Double-check the city name or try a different supported city",
+                error_type=INPUT_ERROR,
+            )
+        print("📋 Opening estimate form...")
+        await self.page.wait_for(_CLICK, ".EstimateCard_estimate-card__NgFIr")
+
+    async def select_service(self, service_type: str) -> Optional[Dict]:
+        target_text = SERVICE_LABELS.get(service_type, "Trucks")
+        print(f"🚛 Selecting service: {target_text}")
+        try:
+            await self.page.wait_for(_CLICK_TEXT, SERVICE_SELECTOR, target_text)
+        except asyncio.TimeoutError:
+            return self.api._create_error_response(
+                f"Could not select service type: {service_type} 🚛",
+                "Porter.in might have changed their interface",
+                "Try a different service type or report this issue"
+            )
+
+    async def _fill_address(self, selector: str, address: str):
+        await self.page.call(_SET_VALUE, selector, address)
+        try:
+            # Polls until the suggestions for this input have rendered
+            await self.page.wait_for(_PICK_SUGGESTION, selector, AUTOCOMPLETE_CONTAINERS, AUTOCOMPLETE_OPTION, timeout=5)
+        except asyncio.TimeoutError:
+            await self.page.call(_PRESS_ENTER, selector)
+
+    async def fill_addresses(self, pickup_address: str, drop_address: str) -> Optional[Dict]:
+        if not await self.page.call(_CHECK, 'input[value="business"]'):
+            print("⚠️ Could not select requirement type (continuing anyway)")
+
+        print("📍 Filling pickup address...")
+        try:
+            await self.page.wait_for(_EXISTS, PICKUP_INPUT)
+        except asyncio.TimeoutError:
+            return self.api._create_error_response(
+                "Could not find pickup address field 📍",
+                "Porter.in might have changed their form structure"
+            )
+        await self._fill_address(PICKUP_INPUT, pickup_address)
+
+        print("🎯 Filling drop address...")
+        if not await self.page.call(_EXISTS, DROP_INPUT):
+            return self.api._create_error_response(
+                "Could not find drop address field 🎯",
+                "Porter.in might have changed their form structure"
+            )
+        await self._fill_address(DROP_INPUT, drop_address)
+
+        print("📱 Filling contact details...")
+        if not (await self.page.call(_SET_VALUE, MOBILE_INPUT, self.api.phone)
+                and await self.page.call(_SET_VALUE, NAME_INPUT, self.api.name)):
+            return self.api._create_error_response(
+                "Could not fill contact details 📱",
+                "Porter.in might have changed their form fields"
+            )
+
+    async def submit(self) -> Optional[Dict]:
+        print("🚀 Submitting form...")
+        try:
+            await self.page.wait_for(_CLICK, SUBMIT_BUTTON, timeout=30)
+        except asyncio.TimeoutError:
+            return self.api._create_error_response(
+                "Could not submit the form 🚀",
+                "The submit button might not be clickable or form validation failed",
+                "Check if all fields are properly filled"
+            )
+
+    async def extract(self) -> Tuple[List[Dict], Optional[Dict]]:
+        print("⏳ Waiting for results...")
+        try:
+            await self.page.wait_for(_EXISTS, "." + RESULT_CARD_CLASS)
+        except asyncio.TimeoutError:
+            return [], self.api._create_error_response(
+                "Results took too long to load ⏰",
+                "Porter.in might be slow or the addresses couldn't be processed",
+                "Try different addresses or run the script again",
+                error_type=TIMEOUT_ERROR,
+            )
+        rows = await self.page.call(_READ_CARDS, RESULT_CARD_CLASS, CARD_FIELDS)
+        return self.api._quotes_from_cards([tuple(row) for row in rows if all(row)])
@@ -0,0 +1,178 @@
+"""
+Cheap health signals built from internal state: a circuit breaker over
+scrape outcomes, a cached SQS backlog reading and the autoscaling signal
+that combines them with local saturation. Nothing here launches a browser.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from .core import BROWSER_ERROR, TIMEOUT_ERROR
+from .metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# error_type values that count against porter.in; bad input, rate-limit waits and refusals don't
+FAILURE_ERROR_TYPES = (BROWSER_ERROR, TIMEOUT_ERROR)
+
+metrics.describe("porter_circuit_state", "Scrape circuit breaker state (0 closed, 1 half-open, 2 open)")
+metrics.describe("porter_circuit_opened_total", "Times the scrape circuit breaker opened")
+metrics.describe("porter_sqs_messages", "Cached SQS ApproximateNumberOfMessages (visible) and NotVisible (in flight)")
+metrics.describe("porter_autoscale_signal", "Load relative to target: above 1 scale out, below scale_in_below scale in")
+
+
+class CircuitBreaker:
+    """
+    Stops sending work to porter.in after `failure_threshold` scrapes in a row failed.
+
+    Open for `reset_timeout` seconds, then half-open: one trial scrape at a
+    time is let through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        metrics.set("porter_circuit_state", _STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str):
+        if state == OPEN and self._state != OPEN:
+            self._opened_at = time.monotonic()
+            metrics.inc("porter_circuit_opened_total")
+            print(f"🔌 Circuit opened after {self._failures} failed scrapes in a row")
+        elif state == CLOSED and self._state != CLOSED:
+            print("🔌 Circuit closed, scrapes are succeeding again")
+        self._state = state
+        metrics.set("porter_circuit_state", _STATE_VALUES[state])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial scrape through"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a scrape may start now; in half-open state only one trial runs at a time"""
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            self._trial = False
+            if success:
+                self._failures = 0
+                self._set_state(CLOSED)
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._set_state(OPEN)
+
+    def release(self):
+        """End an allowed scrape whose outcome says nothing about porter.in (lets the next trial through)"""
+        with self._lock:
+            self._trial = False
+
+    def record_result(self, result: Optional[Dict]):
+        """Record a scrape by its response; None means it crashed"""
+        if result is not None and result.get("success"):
+            self.record(True)
+        elif result is None or result.get("error_type") in FAILURE_ERROR_TYPES:
+            self.record(False)
+        else:
+            self.release()
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
+
+
+class QueueBacklog:
+    """SQS queue depth, fetched with GetQueueAttributes at most once per `ttl` seconds"""
+
+    def __init__(self, client, queue_url: str, ttl: float = 15):
+        self.client = client
+        self.queue_url = queue_url
+        self.ttl = ttl
+        self._value: Optional[Dict[str, int]] = None
+        self._fetched = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Dict[str, int]]:
+        """{"visible": ..., "in_flight": ...}; the last reading if SQS can't be reached, None if there never was one"""
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._fetched < self.ttl:
+                return self._value
+            # Failed reads are retried only after another ttl, so probes never hammer SQS
+            self._fetched = time.monotonic()
+            try:
+                attributes = self.client.get_queue_attributes(
+                    QueueUrl=self.queue_url,
+                    AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+                )["Attributes"]
+            except Exception as e:
+                print(f"⚠️ Could not read SQS queue depth: {e}")
+                return self._value
+            self._value = {
+                "visible": int(attributes.get("ApproximateNumberOfMessages", 0)),
+                "in_flight": int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0)),
+            }
+            metrics.set("porter_sqs_messages", self._value["visible"], state="visible")
+            metrics.set("porter_sqs_messages", self._value["in_flight"], state="in_flight")
+            return self._value
+
+
+def autoscale_signal(
+    running: int,
+    queued: int,
+    capacity: int,
+    backlog: Optional[int] = None,
+    target_utilization: float = 0.7,
+    backlog_per_worker: float = 5,
+    scale_in_below: float = 0.5,
+) -> Dict:
+    """
+    Load of this pod relative to its target, from local saturation and the shared SQS backlog.
+
+    `signal` is the larger of utilization / target_utilization and
+    backlog / (capacity * backlog_per_worker): averaged over pods and
+    targeted at 1, it asks for more pods as soon as either the pod's
+    workers or the queue outgrow what the current replicas drain.
+    """
+    capacity = max(capacity, 1)
+    utilization = (running + queued) / capacity
+    signal = utilization / target_utilization
+    if backlog is not None:
+        signal = max(signal, backlog / (capacity * backlog_per_worker))
+    metrics.set("porter_autoscale_signal", signal)
+    return {
+        "signal": round(signal, 3),
+        "scale": "out" if signal > 1 else "in" if signal < scale_in_below else "hold",
+        "utilization": round(utilization, 3),
+        "running": running,
+        "queued": queued,
+        "capacity": capacity,
+        "sqs_backlog": backlog,
+    }
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from .exceptions import PorterAPIError
+from .records import dumps
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Job:
+    """One asynchronous quote request and its eventual result"""
+
+    def __init__(self, request: Dict, callback_url: str = None):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.callback_url = callback_url
+        self.status = QUEUED
+        self.result: Optional[Dict] = None
+        self.created_at = _now()
+        self.updated_at = self.created_at
+        self.expires = None
+        # Bumped on every status change so subscribers can wait for the next one
+        self.version = 0
+        self._cond = threading.Condition()
+        # Event-loop subscribers, woken with call_soon_threadsafe instead of holding a thread each
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def _update(self, status: str, result: Dict = None):
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.updated_at = _now()
+            self.version += 1
+            self._cond.notify_all()
+            for loop, changed in self._waiters:
+                try:
+                    loop.call_soon_threadsafe(changed.set)
+                except RuntimeError:
+                    pass  # the subscriber's loop is already closed
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the job moves past `version` (or timeout) and return the current version"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    async def changed_since(self, version: int, timeout: float) -> int:
+        """wait_for_change for coroutines: waits on the event loop, holding no thread"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            if self.version != version:
+                return self.version
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters.remove(waiter)
+        return self.version
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+        }
+
+
+class JobStore:
+    """
+    Bounded in-memory store of quote jobs.
+
+    Finished jobs are kept for `ttl` seconds so clients can poll for the
+    result; when the store is full the oldest finished jobs are evicted first
+    and new submissions are refused if every job is still pending.
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl: float = 3600):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _evict(self):
+        now = time.monotonic()
+        for job_id in [j.id for j in self._jobs.values() if j.expires is not None and j.expires <= now]:
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_jobs:
+            for job in list(self._jobs.values()):
+                if job.finished:
+                    del self._jobs[job.id]
+                    if len(self._jobs) < self.max_jobs:
+                        break
+
+    def create(self, request: Dict, callback_url: str = None) -> Job:
+        with self._lock:
+            self._evict()
+            if len(self._jobs) >= self.max_jobs:
+                raise PorterAPIError(f"Too many pending quote jobs ({self.max_jobs}), try again later")
+            job = Job(request, callback_url)
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.expires is not None and job.expires <= time.monotonic():
+            return None
+        return job
+
+    def run(self, job: Job, fn: Callable[[Dict], Dict]):
+        """Execute `fn(job.request)`, record its result and notify the webhook, if any"""
+        job._update(RUNNING)
+        try:
+            result = fn(job.request)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        job.expires = time.monotonic() + self.ttl
+        job._update(SUCCEEDED if result.get("success") else FAILED, result)
+
+        if job.callback_url:
+            deliver_webhook(job)
+
+
+def deliver_webhook(job: Job, timeout: float = 10) -> bool:
+    """POST the finished job to its callback URL"""
+    try:
+        # Redirects aren't followed: the callback host was checked against the allowlist, its redirect target wasn't
+        response = requests.post(
+            job.callback_url, data=dumps(job.to_dict()),
+            headers={"Content-Type": "application/json"}, timeout=timeout, allow_redirects=False,
+        )
+        print(f"  -> Webhook for job {job.id} answered {response.status_code}")
+        return response.ok
+    except requests.RequestException as e:
+        print(f"  -> Webhook for job {job.id} failed: {e}")
+        return False
@@ -0,0 +1,125 @@
+import threading
+from typing import Dict, List, Tuple
+
+# Latency buckets in seconds, sized for scrapes that take anywhere from
+# a few milliseconds (cache hits) to a minute (slow porter.in responses)
+DEFAULT_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """
+    A small thread-safe metrics registry (counters, gauges, histograms).
+
+    Rendered in the Prometheus text format by `render()` for the `/metrics`
+    endpoint, and as plain dicts by `snapshot()` for benchmarks and logs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def remove(self, name: str, **labels):
+        """Drop one gauge series (e.g. for a browser that no longer exists)"""
+        with self._lock:
+            self._gauges.get(name, {}).pop(_label_key(labels), None)
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            bounds = self._buckets.setdefault(name, buckets)
+            # Layout: one slot per bucket, then +Inf, sum
+            state = self._histograms.setdefault(name, {}).setdefault(key, [0] * (len(bounds) + 2))
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(bounds)] += 1
+            state[-1] += value
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge series (0 if never recorded)"""
+        key = _label_key(labels)
+        with self._lock:
+            for kind in (self._counters, self._gauges):
+                if key in kind.get(name, {}):
+                    return kind[name][key]
+        return 0
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Counters and gauges as values, histograms as count/sum/mean"""
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            for kind in (self._counters, self._gauges):
+                for name, series in kind.items():
+                    out[name] = {_format_labels(k): v for k, v in series.items()}
+            for name, series in self._histograms.items():
+                out[name] = {}
+                for key, state in series.items():
+                    count = sum(state[:-1])
+                    out[name][_format_labels(key)] = {
+                        "count": count,
+                        "sum": round(state[-1], 6),
+                        "mean": round(state[-1] / count, 6) if count else 0,
+                    }
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, type_name in ((self._counters, "counter"), (self._gauges, "gauge")):
+                for name, series in sorted(kind.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {type_name}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                bounds = self._buckets[name]
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(bounds) + ["+Inf"], state[:-1]):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-1]}")
+                    lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the scraper, workers and the API
+metrics = Metrics()
@@ -0,0 +1,647 @@
+"""
+Streaming quote pipeline: source -> validate -> dedupe -> scrape -> sink.
+
+Stages run in their own threads connected by bounded queues, so a slow
+stage back-pressures the ones before it instead of buffering without limit.
+Sources and sinks are pluggable:
+
+    sources: SQSSource, JSONLSource (a file, or stdin with "-")
+    sinks:   BackendSink (save-quote HTTP API), JSONLSink
+
+Failed items are retried with exponential backoff (RetryPolicy); permanent
+failures and items out of attempts go to a dead-letter queue (porter_api.dlq).
+
+Run an offline route list at full throughput:
+
+    python -m porter_api.pipeline --input routes.jsonl --output quotes.jsonl --workers 4
+"""
+import argparse
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, IO, Iterator, List, Optional, Set, Tuple
+
+import requests
+
+from .address import route_key
+from .core import PorterAPI
+from .dlq import JSONLDeadLetterQueue
+from .exceptions import PorterAPIError
+from .metrics import metrics
+from .records import dumps
+
+# Fields every message must carry to be worth a scrape (the backend save-quote contract)
+REQUIRED_FIELDS = ("pickup_address", "drop_address", "reference_id", "reference_type")
+REQUEST_FIELDS = (
+    "name", "phone", "pickup_address", "drop_address", "city", "service_type",
+    "reference_id", "reference_type",
+)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+metrics.describe("porter_pipeline_items_total", "Pipeline work items, by outcome")
+metrics.describe("porter_backend_save_seconds", "Duration of save-quote calls to the backend")
+metrics.describe("porter_pipeline_wasted_scrape_seconds", "Scrape time spent on messages that failed, by reason")
+
+# Message ids whose refused receives are remembered (oldest are forgotten first)
+MAX_DEFERRED_TRACKED = 10000
+
+# SQS caps a message's visibility timeout at 12 hours
+MAX_VISIBILITY_TIMEOUT = 43200
+
+_DONE = object()
+
+
+class WorkItem:
+    """One message flowing through the pipeline"""
+
+    def __init__(
+        self,
+        body,
+        item_id: str = None,
+        ack: Callable[[], None] = None,
+        nack: Callable[[Optional[float]], None] = None,
+        receive_count: int = 1,
+    ):
+        """
+        Args:
+            body: Raw message body (JSON string or dict)
+            item_id: Identifier used in logs (e.g. the SQS MessageId)
+            ack: Called once the item is fully handled (e.g. delete the SQS message)
+            nack: Called with a delay in seconds (or None) when the item should be retried later
+            receive_count: Delivery attempt this is (SQS ApproximateReceiveCount)
+        """
+        self.body = body
+        self.id = item_id or uuid.uuid4().hex[:8]
+        self._ack = ack
+        self._nack = nack
+        self.receive_count = receive_count
+        self.request: Optional[Dict] = None
+        self.key: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.scrape_seconds = 0.0
+        self.followers: List["WorkItem"] = []
+
+    def ack(self):
+        if self._ack:
+            self._ack()
+
+    def nack(self, delay: float = None):
+        if self._nack:
+            self._nack(delay)
+
+
+class RetryPolicy:
+    """Exponential backoff by delivery attempt, and when to stop retrying"""
+
+    def __init__(self, base_delay: float = 30, max_delay: float = 3600, max_attempts: int = 5, jitter: float = 0.2):
+        """
+        Args:
+            base_delay: Seconds before the first retry; doubles with every attempt
+            max_delay: Longest delay between attempts
+            max_attempts: Deliveries before a failing item is dead-lettered (0 = retry forever)
+            jitter: Random +/- share of the delay, so a failed batch doesn't come back at once
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (max(attempt, 1) - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return min(delay, MAX_VISIBILITY_TIMEOUT)
+
+    def exhausted(self, attempt: int) -> bool:
+        return bool(self.max_attempts) and attempt >= self.max_attempts
+
+
+# --- sources -------------------------------------------------------------
+
+class SQSSource:
+    """
+    Long-polls an SQS queue. Acked items are deleted; nacked ones reappear
+    after the given delay (via ChangeMessageVisibility) or, without one,
+    after the queue's visibility timeout.
+
+    At most `max_in_flight` messages are held at a time (received but not yet
+    acked or nacked), so nothing sits in the pipeline's queues behind slow
+    scrapes, and the visibility of held messages is extended every
+    `visibility_timeout / 3` seconds so SQS never redelivers one mid-scrape.
+    """
+
+    def __init__(
+        self,
+        client,
+        queue_url: str,
+        batch_size: int = 10,
+        wait_seconds: int = 20,
+        max_in_flight: int = 1,
+        visibility_timeout: int = 60,
+        pause: Callable[[], float] = None,
+    ):
+        """
+        Args:
+            client: boto3 SQS client
+            queue_url: Queue to poll
+            batch_size: Most messages per ReceiveMessage call (SQS allows 10)
+            wait_seconds: Long-poll wait
+            max_in_flight: Most messages held at once; set it to the pipeline's scrape workers
+            visibility_timeout: Seconds a held message stays hidden between heartbeats
+            pause: Returns seconds to hold off receiving (e.g. while the scrape circuit is open)
+        """
+        self.client = client
+        self.queue_url = queue_url
+        self.batch_size = batch_size
+        self.wait_seconds = wait_seconds
+        self.max_in_flight = max_in_flight
+        self.visibility_timeout = visibility_timeout
+        self.pause = pause
+        self._held: Dict[str, str] = {}
+        # Handles a heartbeat is extending right now, and retry delays to apply once it is done
+        self._extending: Set[str] = set()
+        self._delays: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def __iter__(self) -> Iterator[WorkItem]:
+        from botocore.exceptions import ClientError
+
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._extend_visibility, name="sqs-heartbeat", daemon=True)
+            self._heartbeat.start()
+        while True:
+            paused = self.pause() if self.pause else 0
+            if paused > 0:
+                print(f"⏸️ Not receiving from SQS for {paused:.0f}s (scrapes are failing)")
+                time.sleep(paused)
+                continue
+            with self._released:
+                while len(self._held) >= self.max_in_flight:
+                    self._released.wait()
+                free = self.max_in_flight - len(self._held)
+            try:
+                response = self.client.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=min(self.batch_size, free),
+                    WaitTimeSeconds=self.wait_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                    MessageAttributeNames=['All'],
+                    AttributeNames=['ApproximateReceiveCount'],
+                    ReceiveRequestAttemptId=str(uuid.uuid4()),
+                )
+            except ClientError as e:
+                print(f"A Boto3 client error occurred while polling SQS: {e}")
+                time.sleep(10)
+                continue
+
+            messages = response.get('Messages', [])
+            with self._lock:
+                for message in messages:
+                    self._held[message['ReceiptHandle']] = message['MessageId']
+            for message in messages:
+                yield WorkItem(
+                    message['Body'],
+                    item_id=message['MessageId'],
+                    ack=lambda handle=message['ReceiptHandle']: self._delete(handle),
+                    nack=lambda delay, handle=message['ReceiptHandle']: self._retry_later(handle, delay),
+                    receive_count=int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1)),
+                )
+
+    def _release(self, receipt_handle: str):
+        with self._released:
+            self._held.pop(receipt_handle, None)
+            self._released.notify_all()
+
+    def _delete(self, receipt_handle: str):
+        self._release(receipt_handle)
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+
+    def _retry_later(self, receipt_handle: str, delay: Optional[float]):
+        with self._released:
+            self._held.pop(receipt_handle, None)
+            self._released.notify_all()
+            if delay is not None and receipt_handle in self._extending:
+                # A heartbeat in flight would overwrite the delay; it applies it after its own call
+                self._delays[receipt_handle] = delay
+                return
+        if delay is not None:
+            self._delay(receipt_handle, delay)
+
+    def _delay(self, receipt_handle: str, delay: float):
+        try:
+            self.client.change_message_visibility(
+                QueueUrl=self.queue_url, ReceiptHandle=receipt_handle, VisibilityTimeout=int(delay),
+            )
+        except Exception as e:
+            # The message still comes back after the queue's visibility timeout
+            print(f"Could not delay the retry of an SQS message: {e}")
+
+    def _extend_visibility(self):
+        while True:
+            time.sleep(self.visibility_timeout / 3)
+            self.heartbeat()
+
+    def heartbeat(self):
+        """Keep every held message hidden for another visibility_timeout"""
+        # SQS is called outside the lock, so acks, nacks and receives never wait on its latency
+        with self._lock:
+            handles = list(self._held)
+            self._extending.update(handles)
+        try:
+            for i in range(0, len(handles), 10):
+                entries = [
+                    {"Id": str(n), "ReceiptHandle": handle, "VisibilityTimeout": self.visibility_timeout}
+                    for n, handle in enumerate(handles[i:i + 10])
+                ]
+                try:
+                    self.client.change_message_visibility_batch(QueueUrl=self.queue_url, Entries=entries)
+                except Exception as e:
+                    print(f"Could not extend the visibility of held SQS messages: {e}")
+        finally:
+            with self._lock:
+                self._extending.difference_update(handles)
+                delays = [(handle, self._delays.pop(handle)) for handle in handles if handle in self._delays]
+            for handle, delay in delays:
+                self._delay(handle, delay)
+
+
+class JSONLSource:
+    """Reads one request per line from a JSONL file, or from stdin when path is '-'"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[WorkItem]:
+        stream = sys.stdin if self.path == "-" else open(self.path, encoding="utf-8")
+        try:
+            for line_no, line in enumerate(stream, 1):
+                if line.strip():
+                    yield WorkItem(line, item_id=f"line-{line_no}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+# --- sinks ---------------------------------------------------------------
+
+class BackendSink:
+    """
+    Saves quotes to the backend's /save-quote endpoint.
+
+    per_quote=False posts all quotes of a request in one call ("quotes": [...]);
+    per_quote=True posts one call per vehicle quote ("quote": {...}).
+    """
+
+    def __init__(self, api_url: str, per_quote: bool = False, timeout: float = 30):
+        self.api_url = api_url
+        self.per_quote = per_quote
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def bodies(self, request: Dict, result: Dict) -> List[bytes]:
+        """The encoded /save-quote bodies for one result"""
+        # The request fields are encoded once and each quote is spliced in after
+        # them, so no payload dict is built or copied per quote
+        base = dumps({field: request.get(field) for field in REQUEST_FIELDS})[:-1]
+        quotes = result.get("quotes", [])
+        if self.per_quote:
+            return [b'%s,"quote":%s}' % (base, dumps(quote)) for quote in quotes]
+        return [b'%s,"quotes":%s}' % (base, dumps(quotes))]
+
+    def write(self, item: WorkItem) -> bool:
+        quotes = item.result.get("quotes", [])
+        for body in self.bodies(item.request, item.result):
+            start = time.monotonic()
+            response = self.session.post(
+                f"{self.api_url}/save-quote", data=body, headers=JSON_HEADERS, timeout=self.timeout
+            )
+            metrics.observe("porter_backend_save_seconds", time.monotonic() - start)
+            if response.status_code != 200:
+                print(f"  -> FAILED to save quotes for {item.id}. Status: {response.status_code}, Response: {response.text}")
+                return False
+        print(f"  -> Saved {len(quotes)} quotes for reference_id: {item.request.get('reference_id')}")
+        return True
+
+
+class JSONLSink:
+    """Appends {"request": ..., "result": ...} lines to a file, or stdout when path is '-'"""
+
+    def __init__(self, path: str):
+        self.stream: IO = sys.stdout.buffer if path == "-" else open(path, "ab")
+        self._lock = threading.Lock()
+
+    def write(self, item: WorkItem) -> bool:
+        line = dumps({"request": item.request, "result": item.result})
+        with self._lock:
+            self.stream.write(line + b"\n")
+            self.stream.flush()
+        return True
+
+
+# --- pipeline ------------------------------------------------------------
+
+def scrape_with_porter_api(request: Dict) -> Dict:
+    """Default scrape stage: one get_quote run per request"""
+    api = PorterAPI(name=request["name"], phone=request["phone"], headless=True)
+    return api.get_quote(
+        pickup_address=request["pickup_address"],
+        drop_address=request["drop_address"],
+        city=request["city"],
+        service_type=request["service_type"],
+    )
+
+
+class Pipeline:
+    """
+    source -> validate -> dedupe -> scrape -> sink, with bounded queues in between.
+
+    Dedupe coalesces the scrape, not the delivery: items for a route that
+    is already being scraped wait for that scrape's result, and items for a
+    route scraped successfully within `dedupe_window` seconds reuse its
+    result. Every item still goes to the sinks with its own request fields.
+
+    An item is acked once every sink accepted it. If the scrape or a sink
+    failed it is nacked with a backoff delay from `retry_policy`, until it
+    runs out of attempts. Invalid items (bad payload, unsupported city) are
+    permanent failures and are never retried. Items that are not retried go
+    to `dead_letter` when one is set; otherwise invalid items are dropped and
+    failing ones keep being retried.
+    """
+
+    def __init__(
+        self,
+        source,
+        sinks: list,
+        scrape: Callable[[Dict], Dict] = scrape_with_porter_api,
+        workers: int = 2,
+        queue_size: int = None,
+        required_fields: Tuple[str, ...] = REQUIRED_FIELDS,
+        defaults: Dict = None,
+        dedupe_window: float = 300,
+        retry_policy: RetryPolicy = None,
+        dead_letter=None,
+    ):
+        """
+        Args:
+            source: Iterable of WorkItems
+            sinks: Objects with write(item) -> bool
+            scrape: Turns a request dict into a get_quote-style result
+            workers: Concurrent scrapes
+            queue_size: Capacity of each inter-stage queue (default 2 * workers)
+            required_fields: Fields an item needs to be valid
+            defaults: Values for request fields missing from a message (e.g. name/phone)
+            dedupe_window: Seconds a successful result is reused for the same route
+            retry_policy: Backoff and attempt limit for failed items
+            dead_letter: Object with put(item, reason) that keeps items which won't be retried
+        """
+        self.source = source
+        self.sinks = sinks
+        self.scrape = scrape
+        self.workers = workers
+        self.required_fields = required_fields
+        self.defaults = defaults or {}
+        self.dedupe_window = dedupe_window
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letter = dead_letter
+        size = queue_size or 2 * workers
+        self._to_scrape: "queue.Queue" = queue.Queue(size)
+        self._to_sink: "queue.Queue" = queue.Queue(size)
+        self._inflight: Dict[str, WorkItem] = {}
+        self._recent: Dict[str, Tuple[float, Dict]] = {}
+        # Receives per message id that were refused rather than attempted
+        self._deferred: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, outcome: str):
+        # The source, scrape and sink threads all count
+        with self._stats_lock:
+            self.stats[outcome] += 1
+        metrics.inc("porter_pipeline_items_total", outcome=outcome)
+
+    def stop(self):
+        """Stop reading from the source; items already read are finished"""
+        self._stop.set()
+
+    def run(self) -> Counter:
+        """Run until the source is exhausted (or stop() is called) and every item is handled"""
+        threads = [threading.Thread(target=self._scrape_worker, name=f"pipeline-scrape-{i}", daemon=True)
+                   for i in range(self.workers)]
+        threads.append(threading.Thread(target=self._sink_worker, name="pipeline-sink", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in self.source:
+                self._validate(item)
+                if self._stop.is_set():
+                    break
+        finally:
+            for _ in range(self.workers):
+                self._to_scrape.put(_DONE)
+            for thread in threads:
+                thread.join()
+        print(f"🏁 Pipeline finished: {dict(self.stats)}")
+        return self.stats
+
+    # --- stages ----------------------------------------------------------
+
+    def parse(self, item: WorkItem) -> Dict:
+        """Turn a raw body into a request dict, raising PorterAPIError if it is unusable"""
+        try:
+            body = json.loads(item.body) if isinstance(item.body, (str, bytes)) else dict(item.body)
+        except (TypeError, ValueError) as e:
+            raise PorterAPIError(f"Message body is not valid JSON: {e}")
+        if not isinstance(body, dict):
+            raise PorterAPIError("Message body must be a JSON object")
+
+        request = {field: body.get(field) or self.defaults.get(field) for field in REQUEST_FIELDS}
+        request["service_type"] = request["service_type"] or "trucks"
+        missing = [field for field in self.required_fields if not request.get(field)]
+        if missing:
+            raise PorterAPIError(f"Required fields are missing: {', '.join(missing)}")
+        api = PorterAPI(name=request["name"], phone=request["phone"] or "")  # validates the phone number
+        if not request["city"]:
+            raise PorterAPIError("City is missing")
+        if request["city"] not in api.SUPPORTED_CITIES:
+            raise PorterAPIError(f"City '{request['city']}' is not supported")
+        return request
+
+    def _validate(self, item: WorkItem):
+        print(f"Processing message: {item.id}")
+        try:
+            item.request = self.parse(item)
+        except PorterAPIError as e:
+            print(f"  -> Invalid message {item.id}: {e}. Skipping.")
+            self._count("invalid")
+            self._fail(item, f"invalid: {e}", permanent=True)
+            return
+
+        item.key = route_key(
+            item.request["pickup_address"], item.request["drop_address"],
+            item.request["city"], item.request["service_type"],
+        )
+        with self._lock:
+            recent = self._recent.get(item.key)
+            if recent and time.monotonic() - recent[0] <= self.dedupe_window:
+                item.result = recent[1]
+            elif item.key in self._inflight:
+                self._inflight[item.key].followers.append(item)
+                self._count("deduped")
+                return
+            else:
+                self._inflight[item.key] = item
+
+        if item.result is not None:
+            self._count("deduped")
+            self._to_sink.put(item)
+        else:
+            self._to_scrape.put(item)
+
+    def _scrape_worker(self):
+        while True:
+            item = self._to_scrape.get()
+            if item is _DONE:
+                self._to_sink.put(_DONE)
+                return
+            start = time.monotonic()
+            try:
+                item.result = self.scrape(item.request)
+            except Exception as e:
+                item.result = {"success": False, "error": f"Unexpected error: {e}"}
+            item.scrape_seconds = time.monotonic() - start
+
+            with self._lock:
+                self._inflight.pop(item.key, None)
+                if item.result.get("success"):
+                    now = time.monotonic()
+                    self._recent[item.key] = (now, item.result)
+                    for key in [k for k, (t, _) in self._recent.items() if now - t > self.dedupe_window]:
+                        del self._recent[key]
+            self._count("scraped" if item.result.get("success") else "scrape_failed")
+
+            for follower in item.followers:
+                follower.result = item.result
+            for entry in [item] + item.followers:
+                self._to_sink.put(entry)
+
+    def _sink_worker(self):
+        remaining = self.workers
+        while remaining:
+            item = self._to_sink.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            try:
+                self._deliver(item)
+            except Exception as e:
+                print(f"An error occurred while processing the message {item.id}: {e}")
+                self._count("error")
+                self._fail(item, f"error: {e}")
+
+    def _deliver(self, item: WorkItem):
+        result = item.result
+        if "retry_after" in result:
+            # Refused before any scrape (circuit open): not the message's fault, so not an attempt
+            delay = result["retry_after"] or self.retry_policy.base_delay
+            print(f"  -> Scrape refused for {item.id}, retrying in {delay:.0f}s: {result.get('error')}")
+            self._count("deferred")
+            with self._lock:
+                self._deferred[item.id] = self._deferred.get(item.id, 0) + 1
+                if len(self._deferred) > MAX_DEFERRED_TRACKED:
+                    self._deferred.pop(next(iter(self._deferred)))
+            item.nack(delay)
+            return
+        if not result.get("success"):
+            print(f"   -> Scraping failed for {item.id}. Error: {result.get('error')}")
+            self._fail(item, f"scrape failed: {result.get('error')}")
+            return
+        if not result.get("quotes"):
+            print(f"  -> No quotes found to save for {item.id}. Marking as complete.")
+            self._count("empty")
+            self._forget(item)
+            item.ack()
+            return
+
+        if all(sink.write(item) for sink in self.sinks):
+            self._count("saved")
+            self._forget(item)
+            item.ack()
+        else:
+            self._count("save_failed")
+            self._fail(item, "save failed")
+
+    def _forget(self, item: WorkItem):
+        with self._lock:
+            self._deferred.pop(item.id, None)
+
+    def _fail(self, item: WorkItem, reason: str, permanent: bool = False):
+        """Retry the item later with backoff, or dead-letter it when the failure is permanent or attempts ran out"""
+        if item.scrape_seconds:
+            metrics.observe("porter_pipeline_wasted_scrape_seconds", item.scrape_seconds, reason=reason.split(":")[0])
+        with self._lock:
+            attempt = item.receive_count - self._deferred.get(item.id, 0)
+        if not permanent and not self.retry_policy.exhausted(attempt):
+            delay = self.retry_policy.delay(attempt)
+            print(f"  -> Retrying {item.id} in {delay:.0f}s (attempt {attempt})")
+            self._count("retried")
+            item.nack(delay)
+            return
+        self._forget(item)
+        if self.dead_letter is None:
+            # Nowhere to keep it: drop what can never succeed, keep retrying the rest
+            if permanent:
+                item.ack()
+            else:
+                item.nack()
+            return
+        try:
+            self.dead_letter.put(item, reason)
+        except Exception as e:
+            print(f"  -> Could not dead-letter {item.id}: {e}")
+            item.nack()
+            return
+        print(f"  -> Dead-lettered {item.id} after {attempt} attempt(s): {reason}")
+        self._count("dead_lettered")
+        item.ack()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Bulk-run quote requests through the streaming pipeline.")
+    parser.add_argument("--input", default="-", help="JSONL file of requests ('-' for stdin)")
+    parser.add_argument("--output", default="quotes.jsonl", help="JSONL file for results ('-' for stdout)")
+    parser.add_argument("--backend", help="Also save quotes to this backend base URL (e.g. http://localhost:8080/porter)")
+    parser.add_argument("--per-quote", action="store_true", help="Save one backend call per vehicle quote")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent scrapes")
+    parser.add_argument("--name", help="Default name for requests without one")
+    parser.add_argument("--phone", help="Default phone for requests without one")
+    parser.add_argument("--dead-letter", help="JSONL file for requests that are invalid or fail (see porter_api.dlq)")
+    args = parser.parse_args(argv)
+
+    sinks = [JSONLSink(args.output)]
+    if args.backend:
+        sinks.append(BackendSink(args.backend, per_quote=args.per_quote))
+    pipeline = Pipeline(
+        JSONLSource(args.input),
+        sinks,
+        workers=args.workers,
+        # Offline route lists usually carry no backend reference
+        required_fields=("pickup_address", "drop_address", "city", "name", "phone"),
+        defaults={"name": args.name, "phone": args.phone},
+        # A file can't redeliver, so failures are dead-lettered on the first attempt
+        retry_policy=RetryPolicy(max_attempts=1),
+        dead_letter=JSONLDeadLetterQueue(args.dead_letter) if args.dead_letter else None,
+    )
+    pipeline.run()
+
+
+if __name__ == "__main__":
+    main()
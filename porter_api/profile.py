@@ -0,0 +1,183 @@
+"""
+Warm Chrome profiles: one seeded template, cloned for every browser.
+
+A fresh --user-data-dir means every quote downloads porter.in's JS, CSS and
+fonts again and runs first-visit flows. WarmProfile seeds a template
+profile by loading the site once (filling the HTTP disk cache), and each
+new driver gets a copy of it: `cp --reflink=auto` makes that a
+copy-on-write clone on btrfs/XFS, and a plain copy of a few MB elsewhere.
+The template is never written to by the browsers and is re-seeded every
+`refresh_interval` seconds, so cached assets follow site deploys.
+
+    profile = WarmProfile("/var/cache/porter/profile")
+    profile.start()
+    configure(profile)        # every get_selenium_driver() now starts warm
+
+Isolated browser contexts (SharedBrowser, CDPBrowser) keep their cache in
+memory per context, so they don't benefit; one-Chrome-per-quote does.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from .metrics import metrics
+
+# Written by Chrome while a profile is open; a copied lock would make the clone look in use
+LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+
+metrics.describe("porter_profile_seeds_total", "Warm profile template seeds, by outcome")
+metrics.describe("porter_profile_clone_seconds", "Time to clone the warm profile for a new browser")
+metrics.describe("porter_profile_age_seconds", "Age of the warm profile template in use")
+
+_profile: Optional["WarmProfile"] = None
+
+
+def configure(profile: Optional["WarmProfile"]):
+    """Use `profile` for every driver started by get_selenium_driver (None = fresh profiles)"""
+    global _profile
+    _profile = profile
+
+
+def current() -> Optional["WarmProfile"]:
+    return _profile
+
+
+def _copy_tree(source: str, dest: str):
+    """Copy-on-write where the filesystem supports it, a regular copy otherwise"""
+    try:
+        subprocess.run(["cp", "-a", "--reflink=auto", source, dest], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(source, dest, symlinks=True)
+
+
+def _remove_locks(profile_dir: str):
+    for name in LOCK_FILES:
+        path = os.path.join(profile_dir, name)
+        if os.path.lexists(path):
+            os.remove(path)
+
+
+class WarmProfile:
+    """A seeded template profile plus cheap per-browser clones of it"""
+
+    def __init__(self, template_dir: str, refresh_interval: float = 3600, seed_url: str = None, clone_root: str = None):
+        """
+        Args:
+            template_dir: Where the template generations live (kept across restarts)
+            refresh_interval: Seconds between re-seeds (0 = seed once)
+            seed_url: Page loaded to warm the cache (default: core.PORTER_URL)
+            clone_root: Directory for the per-browser clones (default: the system temp dir)
+        """
+        self.template_dir = template_dir
+        self.refresh_interval = refresh_interval
+        self.seed_url = seed_url
+        self.clone_root = clone_root or tempfile.gettempdir()
+        self._current: Optional[str] = None
+        self._seeded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(template_dir, exist_ok=True)
+        self._adopt_existing()
+
+    def _generations(self):
+        return sorted(
+            name for name in os.listdir(self.template_dir)
+            if name.startswith("gen-") and os.path.isdir(os.path.join(self.template_dir, name))
+        )
+
+    def _adopt_existing(self):
+        """Reuse the newest generation a previous run left behind"""
+        generations = self._generations()
+        if generations:
+            self._current = os.path.join(self.template_dir, generations[-1])
+            self._seeded_at = os.path.getmtime(self._current)
+
+    @property
+    def stale(self) -> bool:
+        return self._current is None or (
+            bool(self.refresh_interval) and time.time() - self._seeded_at >= self.refresh_interval
+        )
+
+    # --- seeding ---------------------------------------------------------
+
+    def seed(self) -> bool:
+        """Load the site in a new profile and make it the template; the old one stays until the next seed"""
+        from . import core
+
+        staging = tempfile.mkdtemp(prefix="seeding-", dir=self.template_dir)
+        driver = None
+        try:
+            driver = core.get_selenium_driver(remote_debugging_port=0, user_data_dir=staging)
+            driver.get(self.seed_url or core.PORTER_URL)
+            deadline = time.monotonic() + 30
+            while driver.execute_script("return document.readyState") != "complete" and time.monotonic() < deadline:
+                time.sleep(0.2)
+            # Let late requests (lazy chunks, service worker install) finish
+            time.sleep(2)
+        except Exception as e:
+            print(f"⚠️ Could not seed the warm profile: {e}")
+            metrics.inc("porter_profile_seeds_total", outcome="failed")
+            if driver:
+                driver.quit()
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        # A clean quit flushes the disk cache index to the profile
+        driver.quit()
+        _remove_locks(staging)
+
+        generation = os.path.join(self.template_dir, f"gen-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        os.rename(staging, generation)
+        with self._lock:
+            self._current, self._seeded_at = generation, time.time()
+        # Clones are independent copies, so only the previous generation is kept (a clone may be copying it)
+        for old in self._generations()[:-2]:
+            shutil.rmtree(os.path.join(self.template_dir, old), ignore_errors=True)
+        metrics.inc("porter_profile_seeds_total", outcome="ok")
+        print(f"🔥 Warm profile seeded at {generation}")
+        return True
+
+    def start(self):
+        """Seed now if there is no fresh template, then re-seed in the background every refresh_interval"""
+        if self.stale:
+            self.seed()
+        if self.refresh_interval:
+            self._thread = threading.Thread(target=self._refresh_loop, name="profile-refresh", daemon=True)
+            self._thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(min(60.0, self.refresh_interval)):
+            if self.stale:
+                self.seed()
+
+    def stop(self):
+        self._stop.set()
+
+    # --- clones ----------------------------------------------------------
+
+    def clone(self) -> Optional[str]:
+        """A private copy of the template for one browser, or None if there is no template yet"""
+        with self._lock:
+            source, seeded_at = self._current, self._seeded_at
+        if source is None:
+            return None
+        start = time.monotonic()
+        dest = os.path.join(tempfile.mkdtemp(prefix="porter-profile-", dir=self.clone_root), "profile")
+        try:
+            _copy_tree(source, dest)
+        except Exception as e:
+            print(f"⚠️ Could not clone the warm profile, starting cold: {e}")
+            self.release(dest)
+            return None
+        metrics.observe("porter_profile_clone_seconds", time.monotonic() - start)
+        metrics.set("porter_profile_age_seconds", time.time() - seeded_at)
+        return dest
+
+    def release(self, clone_dir: str):
+        """Delete a clone once its browser has quit"""
+        shutil.rmtree(os.path.dirname(clone_dir), ignore_errors=True)
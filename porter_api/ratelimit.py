@@ -0,0 +1,229 @@
+"""
+Token-bucket rate limiting of porter.in traffic, shared across threads,
+processes and (optionally) hosts.
+
+Buckets live in a backend so every worker draws from the same budget:
+
+    LocalBackend   one process (also the stand-in for a remote backend in tests)
+    FileBackend    every process on a host, through an flock'ed state file
+    RedisBackend   every host, through an atomic Lua script (needs `redis`)
+
+Callers reserve a token and sleep until their reserved slot, so waiting
+workers never poll the backend.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .exceptions import PorterAPIError
+from .metrics import metrics
+
+metrics.describe("porter_ratelimit_wait_seconds", "Time spent waiting for porter.in rate-limit tokens")
+metrics.describe("porter_ratelimit_timeouts_total", "Navigations refused because the rate-limit wait exceeded the timeout")
+
+
+Bucket = Tuple[str, float, float]  # (key, tokens per second, burst)
+
+
+def _reserve(states: Dict[str, List[float]], buckets: List[Bucket], now: float,
+             max_wait: Optional[float]) -> Optional[float]:
+    """
+    Reserve one token from every bucket, or from none of them.
+
+    `states` maps keys to [tokens, updated] and is updated in place. Tokens
+    may go negative: a negative balance is the queue of callers that already
+    hold a future slot. Returns the seconds to wait, or None (and takes
+    nothing) if the wait for any bucket would exceed `max_wait`.
+    """
+    refilled, wait = [], 0.0
+    for key, rate, burst in buckets:
+        tokens, updated = states.get(key) or (burst, now)
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        refilled.append(tokens)
+        wait = max(wait, (1 - tokens) / rate)
+    if max_wait is not None and wait > max_wait:
+        return None
+    for (key, _, _), tokens in zip(buckets, refilled):
+        states[key] = [tokens - 1, now]
+    return wait
+
+
+class LocalBackend:
+    """Buckets in this process's memory"""
+
+    def __init__(self):
+        self._states: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, buckets: List[Bucket], max_wait: Optional[float] = None) -> Optional[float]:
+        with self._lock:
+            return _reserve(self._states, buckets, time.time(), max_wait)
+
+
+class FileBackend:
+    """Buckets in a JSON file guarded by flock, shared by every process on the host"""
+
+    def __init__(self, path: str = "/tmp/porter-ratelimit.json"):
+        self.path = path
+
+    def reserve(self, buckets: List[Bucket], max_wait: Optional[float] = None) -> Optional[float]:
+        # flock belongs to the open file, so each call opens its own: threads exclude each other too
+        with open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666), "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                states = json.loads(f.read() or "{}")
+            except ValueError:
+                states = {}
+            wait = _reserve(states, buckets, time.time(), max_wait)
+            if wait is not None:
+                f.seek(0)
+                f.truncate()
+                json.dump(states, f)
+                f.flush()
+        return wait
+
+
+# KEYS: the buckets; ARGV: max_wait (-1 = none), then rate and burst for each key
+_REDIS_RESERVE = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local max_wait = tonumber(ARGV[1])
+local tokens, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local available = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens[i] = math.min(burst, available + math.max(0, now - updated) * rate)
+    wait = math.max(wait, (1 - tokens[i]) / rate)
+end
+if max_wait >= 0 and wait > max_wait then
+    return ''
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'updated', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil((burst / rate + wait) * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Buckets in Redis, shared by every host; uses the server clock so host clock skew doesn't matter"""
+
+    def __init__(self, url: str = None, client=None):
+        """Connect to `url`, or use an existing redis-py compatible `client`"""
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise PorterAPIError("RedisBackend needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._script = self.client.register_script(_REDIS_RESERVE)
+
+    def reserve(self, buckets: List[Bucket], max_wait: Optional[float] = None) -> Optional[float]:
+        args = [-1 if max_wait is None else max_wait]
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        wait = self._script(keys=[key for key, _, _ in buckets], args=args)
+        return float(wait) if wait else None
+
+
+class RateLimiter:
+    """
+    A global bucket plus one bucket per city.
+
+    Usage:
+        limiter = RateLimiter(FileBackend(), per_minute=30, city_per_minute=10)
+        limiter.acquire("Delhi")   # blocks until this navigation may go out
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        per_minute: float = 30,
+        burst: float = 5,
+        city_per_minute: float = 0,
+        city_burst: float = None,
+        timeout: float = 60,
+        namespace: str = "porter",
+    ):
+        """
+        Args:
+            backend: LocalBackend (default), FileBackend or RedisBackend
+            per_minute: Navigations per minute across all cities (0 = unlimited)
+            burst: Navigations allowed back to back after an idle period
+            city_per_minute: Navigations per minute per city (0 = no per-city limit)
+            city_burst: Burst per city (defaults to `burst`)
+            timeout: Longest wait before acquire() gives up
+            namespace: Prefix of the bucket keys in the backend
+        """
+        self.backend = backend or LocalBackend()
+        self.per_minute = per_minute
+        self.burst = burst
+        self.city_per_minute = city_per_minute
+        self.city_burst = burst if city_burst is None else city_burst
+        self.timeout = timeout
+        self.namespace = namespace
+
+    def _buckets(self, city: Optional[str]) -> List[Bucket]:
+        # The {namespace} hash tag keeps a quote's buckets in one Redis Cluster slot for the atomic script
+        buckets = []
+        if self.per_minute:
+            buckets.append((f"{{{self.namespace}}}:global", self.per_minute / 60, self.burst))
+        if city and self.city_per_minute:
+            buckets.append((f"{{{self.namespace}}}:city:{city.strip().lower()}", self.city_per_minute / 60, self.city_burst))
+        return buckets
+
+    def reserve(self, city: str = None, timeout: float = None) -> float:
+        """
+        Reserve a token from the global and the city bucket together; returns the seconds
+        until it may be used. Both are taken atomically, so a refusal leaves no token behind.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        buckets = self._buckets(city)
+        wait = self.backend.reserve(buckets, timeout) if buckets else 0.0
+        if wait is None:
+            metrics.inc("porter_ratelimit_timeouts_total")
+            raise PorterAPIError(f"Rate limit for {city or 'porter.in'} would need a wait longer than {timeout:g}s")
+        metrics.observe("porter_ratelimit_wait_seconds", wait, city=(city or "").lower())
+        return wait
+
+    def acquire(self, city: str = None, timeout: float = None) -> float:
+        """Wait for a token from the global and the city bucket; returns the seconds waited"""
+        wait = self.reserve(city, timeout)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, city: str = None, timeout: float = None) -> float:
+        """acquire() for the event loop: the reserved slot is awaited, no thread is held"""
+        wait = self.reserve(city, timeout)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def configure(limiter: Optional[RateLimiter]):
+    """Install the limiter every get_quote consults before navigating (None disables it)"""
+    global _limiter
+    _limiter = limiter
+
+
+def acquire(city: str = None) -> float:
+    """Wait for the configured limiter, if any"""
+    return _limiter.acquire(city) if _limiter else 0.0
+
+
+async def acquire_async(city: str = None) -> float:
+    """Await the configured limiter, if any"""
+    return await _limiter.acquire_async(city) if _limiter else 0.0
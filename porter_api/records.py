@@ -0,0 +1,79 @@
+"""
+Quote results and their JSON encoding.
+
+A quote result is a plain dict, built once by `quote_result` with its
+`quote`s and handed unchanged to every consumer: the API response, the
+backend save, the journal and the job store all encode that same dict with
+orjson, so nothing copies or converts a result on its way out. Success and
+error responses are the same kind of object, so json.dumps, requests and
+callers' `result["quotes"]` all work on them as-is.
+"""
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import orjson
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_clock = (0, "")
+
+
+def now_text() -> str:
+    """Current time in the API's timestamp format; strftime runs at most once per second"""
+    global _clock
+    second = int(time.time())
+    if _clock[0] != second:
+        _clock = (second, datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT))
+    return _clock[1]
+
+
+def quote(
+    vehicle_name: str,
+    price_range: str,
+    min_price: Optional[int],
+    max_price: Optional[int],
+    capacity: str,
+    capacity_kg: Optional[int],
+) -> Dict:
+    """One vehicle option from the result cards"""
+    return {
+        "vehicle_name": vehicle_name,
+        "price_range": price_range,
+        "min_price": min_price,
+        "max_price": max_price,
+        "capacity": capacity,
+        "capacity_kg": capacity_kg,
+    }
+
+
+def quote_result(
+    *,
+    pickup_address: str,
+    drop_address: str,
+    city: str,
+    service_type: str,
+    user_name: str,
+    user_phone: str,
+    quotes: List[Dict],
+) -> Dict:
+    """A successful get_quote result"""
+    return {
+        "success": True,
+        "pickup_address": pickup_address,
+        "drop_address": drop_address,
+        "city": city,
+        "service_type": service_type,
+        "user_name": user_name,
+        "user_phone": user_phone,
+        "quotes": quotes,
+        "timestamp": now_text(),
+    }
+
+
+def dumps(obj) -> bytes:
+    """UTF-8 JSON for results, quotes and anything else JSON-shaped"""
+    return orjson.dumps(obj)
+
+
+loads = orjson.loads
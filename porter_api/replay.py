@@ -0,0 +1,349 @@
+"""
+Record a live get_quote run and replay it offline.
+
+A recording ("archive") is a directory holding:
+
+    session.json   stages, network exchanges, raw result-card texts, result
+    dom/           page_source snapshot after every stage
+    bodies/        response bodies, one file per exchange
+
+    python -m porter_api.replay record --pickup ... --drop ... --city Delhi --out runs/delhi
+    python -m porter_api.replay serve runs/delhi --port 8766 --time-scale 0.5
+    python -m porter_api.replay check runs/delhi
+    python -m porter_api.replay run runs/delhi --runs 20 --concurrency 4
+
+`serve` answers with the recorded responses (and their recorded timing,
+scaled), so PORTER_URL=<replay url> drives the real scraper against a
+frozen copy of the site. `check` re-parses the recorded card texts with the
+current parsers and reports every quote that no longer matches.
+"""
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from selenium.webdriver.common.by import By
+
+from . import core
+from .core import PorterAPI, RESULT_CARD_CLASS, _parse_quote_card, _read_result_card, get_selenium_driver
+from .records import dumps
+
+SESSION_FILE = "session.json"
+TEXT_TYPES = ("text/", "javascript", "json", "xml")
+# Dropped when replaying: bodies are stored decoded and re-measured
+HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class SessionRecorder:
+    """
+    PorterAPI hook that records one get_quote run into `archive_dir`.
+
+    Network exchanges come from Chrome's performance log, so the driver must
+    be created with `get_selenium_driver(performance_log=True)`; without it
+    only DOM snapshots and card texts are recorded.
+    """
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self._reset()
+
+    def _reset(self):
+        self.started = time.monotonic()
+        self.stages: List[Dict] = []
+        self.exchanges: List[Dict] = []
+        self.cards: List[Tuple[str, str, str]] = []
+        self._pending: Dict[str, Dict] = {}
+        self._network = True
+
+    def on_start(self, driver):
+        self._reset()
+        os.makedirs(os.path.join(self.archive_dir, "dom"), exist_ok=True)
+        os.makedirs(os.path.join(self.archive_dir, "bodies"), exist_ok=True)
+        # Discard events from anything the driver loaded before this run
+        self._drain(driver, keep=False)
+
+    def on_stage(self, driver, stage: str):
+        self._drain(driver)
+        dom = os.path.join("dom", f"{len(self.stages):02d}-{stage}.html")
+        with open(os.path.join(self.archive_dir, dom), "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
+        self.stages.append({"name": stage, "at": round(time.monotonic() - self.started, 3), "dom": dom})
+        if stage == "results":
+            self.cards = [_read_result_card(card) for card in driver.find_elements(By.CLASS_NAME, RESULT_CARD_CLASS)]
+
+    def on_finish(self, driver, result: Dict):
+        self._drain(driver)
+        session = {
+            "base_url": core.PORTER_URL,
+            "recorded_at": result.get("timestamp"),
+            "duration": round(time.monotonic() - self.started, 3),
+            "stages": self.stages,
+            "exchanges": self.exchanges,
+            "cards": self.cards,
+            "result": result,
+        }
+        with open(os.path.join(self.archive_dir, SESSION_FILE), "wb") as f:
+            f.write(dumps(session))
+        print(f"📼 Recorded {len(self.exchanges)} exchanges and {len(self.stages)} snapshots to {self.archive_dir}")
+
+    def _drain(self, driver, keep: bool = True):
+        """Turn buffered CDP Network events into exchanges (bodies are fetched while still available)"""
+        if not self._network:
+            return
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            print(f"⚠️ No performance log, recording DOM only: {e}")
+            self._network = False
+            return
+        if not keep:
+            return
+
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method, params = message.get("method"), message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.requestWillBeSent":
+                request = params["request"]
+                self._pending[request_id] = {
+                    "method": request["method"],
+                    "url": request["url"],
+                    "sent": params["timestamp"],
+                }
+            elif method == "Network.responseReceived" and request_id in self._pending:
+                response = params["response"]
+                self._pending[request_id].update(
+                    status=response["status"],
+                    mime_type=response.get("mimeType", ""),
+                    headers=response.get("headers", {}),
+                )
+            elif method == "Network.loadingFinished" and request_id in self._pending:
+                exchange = self._pending.pop(request_id)
+                if "status" in exchange:
+                    exchange["duration"] = round(params["timestamp"] - exchange.pop("sent"), 4)
+                    exchange["body"] = self._save_body(driver, request_id, len(self.exchanges))
+                    self.exchanges.append(exchange)
+            elif method == "Network.loadingFailed":
+                self._pending.pop(request_id, None)
+
+    def _save_body(self, driver, request_id: str, index: int) -> Optional[str]:
+        try:
+            response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None  # redirects and evicted resources have no body
+        body = response["body"]
+        data = base64.b64decode(body) if response.get("base64Encoded") else body.encode("utf-8")
+        path = os.path.join("bodies", f"{index:04d}")
+        with open(os.path.join(self.archive_dir, path), "wb") as f:
+            f.write(data)
+        return path
+
+
+def load_session(archive_dir: str) -> Dict:
+    with open(os.path.join(archive_dir, SESSION_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(archive_dir: str) -> List[Dict]:
+    """Re-parse the recorded card texts; returns the quotes that no longer match the recording"""
+    session = load_session(archive_dir)
+    recorded = session["result"].get("quotes", [])
+    mismatches = []
+    for i, texts in enumerate(session["cards"]):
+        parsed = _parse_quote_card(*texts)
+        expected = recorded[i] if i < len(recorded) else None
+        if parsed != expected:
+            mismatches.append({"card": i, "texts": texts, "expected": expected, "parsed": parsed})
+    return mismatches
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    routes: Dict[Tuple[str, str], Dict] = {}
+    archive_dir = ""
+    time_scale = 1.0
+    rewrites: List[Tuple[bytes, bytes]] = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _serve(self):
+        if "Content-Length" in self.headers:
+            self.rfile.read(int(self.headers["Content-Length"]))
+        exchange = self.routes.get((self.command, self.path)) or self.routes.get((self.command, self.path.split("?")[0]))
+        if exchange is None:
+            self.send_error(404, "Not recorded")
+            return
+
+        time.sleep(exchange["duration"] * self.time_scale)
+        body = b""
+        if exchange.get("body"):
+            with open(os.path.join(self.archive_dir, exchange["body"]), "rb") as f:
+                body = f.read()
+            if any(t in exchange["mime_type"] for t in TEXT_TYPES):
+                for old, new in self.rewrites:
+                    body = body.replace(old, new)
+
+        self.send_response(exchange["status"])
+        for name, value in exchange["headers"].items():
+            if name.lower() not in HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_OPTIONS = _serve
+
+
+def _local_path(url: str, base_host: str) -> str:
+    """Path an exchange is served under: the recorded site at the root, other hosts under /__host__/<host>"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return path if parts.netloc == base_host else f"/__host__/{parts.netloc}{path}"
+
+
+def serve_replay(archive_dir: str, port: int = 0, time_scale: float = 1.0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve a recording in a daemon thread and return (server, base_url).
+
+    Repeated requests for the same URL get the last recorded response, so
+    every replay is identical no matter how many run concurrently.
+    """
+    session = load_session(archive_dir)
+    base_host = urlsplit(session["base_url"]).netloc
+
+    routes = {}
+    hosts = {base_host}
+    for exchange in session["exchanges"]:
+        hosts.add(urlsplit(exchange["url"]).netloc)
+        path = _local_path(exchange["url"], base_host)
+        routes[(exchange["method"], path)] = exchange
+        routes.setdefault((exchange["method"], path.split("?")[0]), exchange)
+
+    handler = type("Handler", (ReplayHandler,), {
+        "routes": routes,
+        "archive_dir": archive_dir,
+        "time_scale": time_scale,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    local = f"http://127.0.0.1:{server.server_address[1]}"
+    rewrites = []
+    for host in sorted(hosts, key=len, reverse=True):
+        target = local if host == base_host else f"{local}/__host__/{host}"
+        for scheme in ("https://", "http://", "//"):
+            rewrites.append((f"{scheme}{host}".encode(), target.encode()))
+    handler.rewrites = rewrites
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{local}/"
+
+
+def replay_runs(archive_dir: str, runs: int = 1, concurrency: int = 1, time_scale: float = 1.0) -> Dict:
+    """Run the scraper `runs` times against a replayed recording and compare every result with it"""
+    if runs < 1 or concurrency < 1:
+        raise ValueError(f"runs and concurrency must be at least 1, got runs={runs}, concurrency={concurrency}")
+    session = load_session(archive_dir)
+    recorded = session["result"]
+    server, url = serve_replay(archive_dir, time_scale=time_scale)
+    porter_url, core.PORTER_URL = core.PORTER_URL, url
+    api = PorterAPI(recorded["user_name"], recorded["user_phone"])
+
+    def one_run(_):
+        start = time.monotonic()
+        driver = None
+        try:
+            # Every run gets its own Chrome on a free debugging port, so concurrent runs never share one
+            driver = get_selenium_driver(remote_debugging_port=0)
+            result = api.get_quote(recorded["pickup_address"], recorded["drop_address"],
+                                   recorded["city"], recorded.get("service_type", "trucks"), driver=driver)
+        except Exception as e:
+            print(f"⚠️ Replay run failed: {e}")
+            result = {}
+        elapsed = time.monotonic() - start
+        if driver:
+            core._quit_driver(driver)
+        return elapsed, result.get("quotes") == recorded.get("quotes")
+
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(one_run, range(runs)))
+    finally:
+        server.shutdown()
+        core.PORTER_URL = porter_url
+
+    timings = sorted(t for t, _ in outcomes)
+    return {
+        "runs": runs,
+        "concurrency": concurrency,
+        "matching": sum(ok for _, ok in outcomes),
+        "p50_seconds": round(timings[len(timings) // 2], 3),
+        "max_seconds": round(timings[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record porter.in sessions and replay them offline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Record one live get_quote run")
+    record.add_argument("--pickup", required=True)
+    record.add_argument("--drop", required=True)
+    record.add_argument("--city", required=True)
+    record.add_argument("--service", default="trucks")
+    record.add_argument("--name", default="Porter Replay")
+    record.add_argument("--phone", default="9999999999")
+    record.add_argument("--out", required=True, help="Archive directory")
+
+    serve = commands.add_parser("serve", help="Serve a recording on a local port")
+    serve.add_argument("archive")
+    serve.add_argument("--port", type=int, default=8766)
+    serve.add_argument("--time-scale", type=float, default=1.0, help="0 = no delay, 1 = recorded timing")
+
+    check_cmd = commands.add_parser("check", help="Re-parse recorded cards with the current parsers")
+    check_cmd.add_argument("archive")
+
+    run = commands.add_parser("run", help="Scrape a replayed recording repeatedly")
+    run.add_argument("archive")
+    run.add_argument("--runs", type=int, default=10)
+    run.add_argument("--concurrency", type=int, default=2)
+    run.add_argument("--time-scale", type=float, default=0.0)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        driver = get_selenium_driver(performance_log=True)
+        try:
+            api = PorterAPI(args.name, args.phone, hooks=[SessionRecorder(args.out)])
+            result = api.get_quote(args.pickup, args.drop, args.city, args.service, driver=driver)
+        finally:
+            driver.quit()
+        if not result.get("success"):
+            print(f"⚠️ Recorded a failed run: {result.get('error')}")
+    elif args.command == "serve":
+        server, url = serve_replay(args.archive, args.port, args.time_scale)
+        print(f"📼 Replaying {args.archive} at {url} (PORTER_URL={url})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == "check":
+        mismatches = check(args.archive)
+        for m in mismatches:
+            print(f"❌ Card {m['card']} {m['texts']}: expected {m['expected']}, parsed {m['parsed']}")
+        print("✅ All recorded cards parse as recorded" if not mismatches else f"{len(mismatches)} mismatches")
+        raise SystemExit(1 if mismatches else 0)
+    else:
+        if args.runs < 1 or args.concurrency < 1:
+            parser.error("--runs and --concurrency must be at least 1")
+        print(json.dumps(replay_runs(args.archive, args.runs, args.concurrency, args.time_scale), indent=2))
+
+
+if __name__ == "__main__":
+    main()
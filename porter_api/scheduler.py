@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import metrics
+
+INTERACTIVE = "interactive"  # a user is waiting on the response (/quote, quote jobs)
+BACKGROUND = "background"    # queue work (SQS messages, pipeline runs)
+REFRESH = "refresh"          # speculative work, e.g. refreshing cached routes
+
+PRIORITIES = (INTERACTIVE, BACKGROUND, REFRESH)
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, BACKGROUND: 3, REFRESH: 1}
+
+metrics.describe("porter_scheduler_wait_seconds", "Time scrape tasks spent queued, by priority class")
+metrics.describe("porter_scheduler_queue_depth", "Queued scrape tasks, by priority class")
+metrics.describe("porter_scheduler_running", "Running scrape tasks, by priority class")
+
+
+def _check_weights(weights: Dict[str, float]) -> Dict[str, float]:
+    """A weight for every class, each a positive number (a lane's stride is 1 / weight)"""
+    unknown = set(weights) - set(PRIORITIES)
+    if unknown:
+        raise ValueError(f"Unknown priority class '{sorted(unknown)[0]}' (expected one of {', '.join(PRIORITIES)})")
+    weights = {**DEFAULT_WEIGHTS, **weights}
+    for name, weight in weights.items():
+        if not weight > 0:
+            raise ValueError(f"Weight for '{name}' must be greater than 0, got {weight}")
+    return weights
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse 'interactive=8,background=3,refresh=1' into a weights dict"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, value = part.partition("=")
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Weight for '{name.strip()}' must be a number, got '{value}'") from None
+    return _check_weights(weights)
+
+
+class PriorityScheduler:
+    """
+    Runs scrape tasks on a fixed set of worker threads with priority lanes.
+
+    Each priority class has its own FIFO queue. Free workers pick the next
+    class by stride scheduling, so over time classes share capacity in
+    proportion to their weights. `reserved_interactive` workers are only
+    ever given interactive tasks, so a user request never waits behind a
+    backlog of queue messages.
+
+    The interface mirrors `concurrent.futures.Executor.submit`.
+    """
+
+    def __init__(self, workers: int = 2, weights: Dict[str, float] = None, reserved_interactive: int = 1):
+        """
+        Args:
+            workers: Number of concurrent scrapes
+            weights: Relative share of capacity per priority class (each > 0; missing ones use the defaults)
+            reserved_interactive: Workers kept free for interactive tasks
+                                  (capped at workers - 1 so other lanes always progress)
+        """
+        self.workers = workers
+        self.weights = _check_weights(dict(weights or {}))
+        self.reserved_interactive = max(0, min(reserved_interactive, workers - 1))
+        self._queues: Dict[str, Deque[Tuple[float, Future, Callable, tuple, dict]]] = {
+            p: deque() for p in PRIORITIES
+        }
+        self._pass: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._running: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"scrape-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args, priority: str = INTERACTIVE, **kwargs) -> Future:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            queue = self._queues[priority]
+            if not queue and self._running[priority] == 0:
+                # A lane waking up from idle must not cash in credit from its idle time
+                self._pass[priority] = max(self._pass[priority], self._min_active_pass())
+            queue.append((time.monotonic(), future, fn, args, kwargs))
+            metrics.set("porter_scheduler_queue_depth", len(queue), priority=priority)
+            self._cond.notify()
+        return future
+
+    def _min_active_pass(self) -> float:
+        active = [self._pass[p] for p in PRIORITIES if self._queues[p] or self._running[p]]
+        return min(active) if active else 0.0
+
+    def _pick(self) -> Optional[str]:
+        """Next lane to serve (caller holds the lock), or None if nothing is eligible"""
+        non_interactive_running = sum(n for p, n in self._running.items() if p != INTERACTIVE)
+        shared_slots = self.workers - self.reserved_interactive
+        eligible = [
+            p for p in PRIORITIES
+            if self._queues[p] and (p == INTERACTIVE or non_interactive_running < shared_slots)
+        ]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda p: (self._pass[p], PRIORITIES.index(p)))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                priority = self._pick()
+                while priority is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    priority = self._pick()
+                queue = self._queues[priority]
+                enqueued, future, fn, args, kwargs = queue.popleft()
+                self._running[priority] += 1
+                try:
+                    # Charged before the lock is released, so the next pick already sees it
+                    self._pass[priority] += 1.0 / self.weights[priority]
+                    metrics.set("porter_scheduler_queue_depth", len(queue), priority=priority)
+                    metrics.set("porter_scheduler_running", self._running[priority], priority=priority)
+                except Exception as e:
+                    # Fail the task rather than the worker, so its caller isn't left waiting
+                    print(f"⚠️ Scheduler could not start a {priority} task: {e}")
+                    future.set_exception(e)
+
+            try:
+                metrics.observe("porter_scheduler_wait_seconds", time.monotonic() - enqueued, priority=priority)
+                if not future.done() and future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[priority] -= 1
+                    metrics.set("porter_scheduler_running", self._running[priority], priority=priority)
+                    # A finished background task may make a queued lane eligible again
+                    self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queued and running tasks per priority class"""
+        with self._cond:
+            return {p: {"queued": len(self._queues[p]), "running": self._running[p]} for p in PRIORITIES}
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def alive_workers(self) -> int:
+        return sum(thread.is_alive() for thread in self._threads)
+
+    def idle_workers(self) -> int:
+        with self._cond:
+            return self.workers - sum(self._running.values())
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
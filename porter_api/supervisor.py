@@ -0,0 +1,328 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+
+from .browser import BrowserContext, SharedBrowser, process_tree_rss
+from .exceptions import PorterAPIError
+from .metrics import metrics
+
+CHROME_PROCESS_NAMES = ("chrome", "chromium", "chromedriver", "headless_shell")
+# Daemonizes (re-parents to init) even for live browsers, so it never looks like an orphan reliably
+CRASHPAD_PROCESS_NAMES = ("chrome_crashpad",)
+
+# Browsers started outside the supervisor (the CDP engine's Chrome), which the reaper must leave alone
+_registered_pids: Set[int] = set()
+
+
+def register_browser_pid(pid: int):
+    _registered_pids.add(pid)
+
+
+def unregister_browser_pid(pid: int):
+    _registered_pids.discard(pid)
+
+metrics.describe("porter_browser_rss_bytes", "Resident memory of each supervised browser process tree")
+metrics.describe("porter_browser_pages", "Open pages (contexts plus the anchor tab) per supervised browser")
+metrics.describe("porter_browser_quotes", "Quotes served by each supervised browser since its launch")
+metrics.describe("porter_browser_recycles_total", "Browsers recycled, by reason")
+metrics.describe("porter_browser_orphans_killed_total", "Orphaned chrome/chromedriver processes killed")
+
+
+class _ManagedBrowser:
+    """Book-keeping for one browser owned by the supervisor"""
+
+    def __init__(self, slot: int, browser: SharedBrowser):
+        self.slot = slot
+        self.browser = browser
+        self.started = time.monotonic()
+        self.quotes = 0
+        self.active = 0
+        self.drain_reason: Optional[str] = None
+
+
+class BrowserSupervisor:
+    """
+    Keeps a fixed number of long-lived SharedBrowsers healthy.
+
+    A browser is recycled after `max_quotes` quotes, after `max_age` seconds,
+    above `max_rss_mb` of memory, or when its chromedriver dies. Recycling
+    happens only between jobs: a browser due for recycling is first drained
+    (no new leases) and is restarted once its last in-flight quote finishes.
+    The restart runs on the monitor thread, never in the quote that ended
+    the lease. The monitor also samples memory, exports metrics and kills
+    chrome / chromedriver processes orphaned by earlier crashes.
+    """
+
+    def __init__(
+        self,
+        browsers: int = 1,
+        contexts_per_browser: int = 4,
+        max_quotes: int = 50,
+        max_age: float = 1800,
+        max_rss_mb: float = 1500,
+        monitor_interval: float = 15,
+        browser_factory: Callable[[int], SharedBrowser] = None,
+    ):
+        """
+        Args:
+            browsers: Number of Chrome processes to keep running
+            contexts_per_browser: Concurrent quotes per Chrome
+            max_quotes: Recycle a browser after this many quotes (0 = never)
+            max_age: Recycle a browser after this many seconds (0 = never)
+            max_rss_mb: Recycle a browser above this resident memory (0 = never)
+            monitor_interval: Seconds between memory samples / orphan sweeps
+            browser_factory: Builds a SharedBrowser given contexts_per_browser
+        """
+        self.size = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.max_quotes = max_quotes
+        self.max_age = max_age
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.monitor_interval = monitor_interval
+        self.browser_factory = browser_factory or (lambda n: SharedBrowser(max_contexts=n))
+        self._browsers: List[Optional[_ManagedBrowser]] = [None] * browsers
+        self._launching = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # a drained browser went idle: recycle it now
+        self._monitor: Optional[threading.Thread] = None
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        """Launch the browsers and the monitor thread"""
+        for slot in range(self.size):
+            self._launch(slot)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="browser-supervisor", daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        with self._cond:
+            browsers, self._browsers = self._browsers, [None] * self.size
+        for managed in browsers:
+            if managed:
+                self._quit(managed)
+
+    def _launch(self, slot: int) -> bool:
+        with self._cond:
+            if self._browsers[slot] is not None or slot in self._launching:
+                return False
+            self._launching.add(slot)
+        try:
+            browser = self.browser_factory(self.contexts_per_browser)
+        except Exception as e:
+            print(f"⚠️ Could not launch browser {slot}: {e}")
+            return False
+        finally:
+            with self._cond:
+                self._launching.discard(slot)
+        if self._stop.is_set():
+            browser.quit()
+            return False
+        with self._cond:
+            self._browsers[slot] = _ManagedBrowser(slot, browser)
+            self._cond.notify_all()
+        print(f"🚀 Browser {slot} launched (pid {browser.pid})")
+        return True
+
+    def _quit(self, managed: _ManagedBrowser):
+        try:
+            managed.browser.quit()
+        except Exception as e:
+            print(f"⚠️ Error quitting browser {managed.slot}: {e}")
+        for name in ("porter_browser_rss_bytes", "porter_browser_pages", "porter_browser_quotes"):
+            metrics.remove(name, browser=managed.slot)
+
+    def _recycle(self, managed: _ManagedBrowser):
+        """Replace an idle, drained browser with a fresh one"""
+        with self._cond:
+            if self._browsers[managed.slot] is not managed:
+                return
+            self._browsers[managed.slot] = None
+        print(f"♻️ Recycling browser {managed.slot} ({managed.drain_reason}, {managed.quotes} quotes)")
+        metrics.inc("porter_browser_recycles_total", reason=managed.drain_reason)
+        self._quit(managed)
+        if not self._stop.is_set():
+            self._launch(managed.slot)
+
+    def _drain(self, managed: _ManagedBrowser, reason: Optional[str]) -> bool:
+        """
+        Stop handing out leases on a browser if `reason` is set.
+        Returns True when the browser is draining and idle, i.e. can be recycled now.
+        """
+        if reason and managed.drain_reason is None:
+            managed.drain_reason = reason
+        return managed.drain_reason is not None and managed.active == 0
+
+    def _due_reason(self, managed: _ManagedBrowser) -> Optional[str]:
+        if self.max_quotes and managed.quotes >= self.max_quotes:
+            return "quotes"
+        if self.max_age and time.monotonic() - managed.started >= self.max_age:
+            return "age"
+        return None
+
+    # --- leasing ---------------------------------------------------------
+
+    @contextmanager
+    def lease(self, timeout: float = None) -> Iterator[BrowserContext]:
+        """Borrow an isolated browser context for one quote"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                candidates = [
+                    m for m in self._browsers
+                    if m and m.drain_reason is None and m.active < self.contexts_per_browser
+                ]
+                if candidates:
+                    managed = min(candidates, key=lambda m: m.active)
+                    managed.active += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PorterAPIError(f"No browser available within {timeout}s")
+                self._cond.wait(remaining)
+
+        context = None
+        try:
+            context = managed.browser.new_context()
+            yield context
+        except Exception:
+            if context is None:
+                with self._cond:
+                    self._drain(managed, "crashed")
+            raise
+        finally:
+            if context is not None:
+                try:
+                    managed.browser.close_context(context)
+                except Exception as e:
+                    print(f"⚠️ Could not close browser context: {e}")
+                    with self._cond:
+                        self._drain(managed, "crashed")
+            with self._cond:
+                managed.active -= 1
+                if context is not None:
+                    managed.quotes += 1
+                idle = self._drain(managed, self._due_reason(managed))
+                self._cond.notify_all()
+            if idle:
+                # Quitting and relaunching Chrome takes seconds; leave it to the monitor thread
+                self._wake.set()
+
+    def available(self) -> int:
+        """Free context slots on healthy browsers"""
+        with self._cond:
+            return sum(
+                self.contexts_per_browser - m.active
+                for m in self._browsers if m and m.drain_reason is None
+            )
+
+    def healthy(self) -> int:
+        """Launched browsers that accept new leases"""
+        with self._cond:
+            return sum(1 for m in self._browsers if m and m.drain_reason is None)
+
+    # --- monitoring ------------------------------------------------------
+
+    def _monitor_loop(self):
+        next_check = time.monotonic() + self.monitor_interval
+        while not self._stop.is_set():
+            self._wake.wait(max(0.0, next_check - time.monotonic()))
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._recycle_drained()
+                if time.monotonic() >= next_check:
+                    next_check = time.monotonic() + self.monitor_interval
+                    self.check()
+            except Exception as e:
+                print(f"⚠️ Browser supervisor check failed: {e}")
+
+    def _recycle_drained(self):
+        """Recycle every draining browser whose last lease has ended"""
+        with self._cond:
+            idle = [m for m in self._browsers if m and m.drain_reason is not None and m.active == 0]
+        for managed in idle:
+            self._recycle(managed)
+
+    def check(self):
+        """Sample memory, drain browsers over their limits, recycle idle ones, reap orphans"""
+        with self._cond:
+            browsers = list(self._browsers)
+        for slot, managed in enumerate(browsers):
+            if managed is None:
+                self._launch(slot)
+                continue
+
+            alive = managed.browser.driver.service.process.poll() is None
+            rss = process_tree_rss(managed.browser.pid) if alive else 0
+            metrics.set("porter_browser_rss_bytes", rss, browser=slot)
+            metrics.set("porter_browser_pages", managed.active + 1, browser=slot)
+            metrics.set("porter_browser_quotes", managed.quotes, browser=slot)
+
+            if not alive:
+                reason = "crashed"
+            elif self.max_rss and rss >= self.max_rss:
+                reason = "memory"
+            else:
+                reason = self._due_reason(managed)
+            with self._cond:
+                idle = self._drain(managed, reason)
+            if idle:
+                self._recycle(managed)
+
+        killed = kill_orphaned_browsers(keep=[managed.browser.pid for managed in browsers if managed])
+        if killed:
+            print(f"🧹 Killed {killed} orphaned browser processes")
+            metrics.inc("porter_browser_orphans_killed_total", killed)
+
+
+def kill_orphaned_browsers(keep: Iterable[int] = ()) -> int:
+    """
+    Kill chrome/chromedriver processes left behind by crashed sessions.
+
+    A chrome or chromedriver process is orphaned when it has been re-parented
+    to init: its chromedriver (or our process) is gone. Our own children are
+    never touched, nor are the pids in `keep` or registered with
+    register_browser_pid. When we run as PID 1 in Docker our children also
+    have parent 1, so browsers we launch directly must be registered.
+    """
+    me = os.getpid()
+    uid = os.getuid()
+    protected = set(keep) | _registered_pids
+    killed = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == me or int(entry) in protected:
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+            if os.stat(f"/proc/{pid}").st_uid != uid:
+                continue
+        except OSError:
+            continue
+        name = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat.rsplit(")", 1)[1].split()
+        state, ppid = fields[0], int(fields[1])
+        if state == "Z" or not name.startswith(CHROME_PROCESS_NAMES) or name.startswith(CRASHPAD_PROCESS_NAMES):
+            continue
+
+        if name.startswith("chromedriver"):
+            # As PID 1, every chromedriver Selenium starts is our child
+            orphaned = ppid == 1 and me != 1
+        else:
+            orphaned = ppid == 1
+        if orphaned:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except OSError:
+                pass
+    return killed
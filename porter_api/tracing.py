@@ -0,0 +1,282 @@
+"""
+Sampled per-quote performance traces in Chrome trace-event format.
+
+    tracer = QuoteTracer("traces", sample_rate=0.05)
+    PorterAPI(name, phone, hooks=[tracer]).get_quote(...)
+
+Each sampled quote writes one JSON file that opens in chrome://tracing or
+https://ui.perfetto.dev with three tracks: the get_quote stages (with CDP
+Performance.getMetrics deltas and WebDriver command counts), network
+requests from the page's Resource Timing, and every WebDriver command.
+Unsampled quotes cost one random() call.
+"""
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .metrics import metrics
+
+metrics.describe("porter_quote_traces_total", "Quote traces written")
+metrics.describe("porter_quote_stage_seconds", "Time from the previous get_quote stage to this one")
+
+TID_STAGES = 1
+TID_NETWORK = 2
+TID_WEBDRIVER = 3
+THREAD_NAMES = {TID_STAGES: "get_quote stages", TID_NETWORK: "network", TID_WEBDRIVER: "webdriver commands"}
+
+# Performance.getMetrics values reported per stage as deltas (seconds) and as counters
+DURATION_METRICS = ("TaskDuration", "ScriptDuration", "LayoutDuration", "RecalcStyleDuration")
+COUNTER_METRICS = ("JSHeapUsedSize", "Nodes", "Documents")
+
+_RESOURCE_TIMING_JS = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return {
+    origin: performance.timeOrigin,
+    entries: entries.map(e => [
+        e.name, e.initiatorType || e.entryType, e.startTime, e.duration,
+        e.domainLookupEnd - e.domainLookupStart, e.connectEnd - e.connectStart,
+        e.responseStart - e.requestStart, e.responseEnd - e.responseStart, e.transferSize || 0,
+    ]),
+};
+"""
+
+_local = threading.local()
+
+
+@contextmanager
+def _tracer_commands():
+    """Commands issued by the tracer itself are not counted against the quote"""
+    _local.internal = True
+    try:
+        yield
+    finally:
+        _local.internal = False
+
+
+def _install_command_counter(webdriver):
+    """Wrap `webdriver.execute` (every command, element ones included, goes through it) once"""
+    if getattr(webdriver, "_porter_command_counter", False):
+        return
+    execute = webdriver.execute
+
+    def counted(driver_command, params=None):
+        trace = getattr(_local, "trace", None)
+        if trace is None or getattr(_local, "internal", False):
+            return execute(driver_command, params)
+        start = time.time()
+        try:
+            return execute(driver_command, params)
+        finally:
+            trace.command(driver_command, start, time.time())
+
+    webdriver.execute = counted
+    webdriver._porter_command_counter = True
+
+
+class _Trace:
+    """Trace events of one quote; times are microseconds since the quote started"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stage_started = self.started
+        self.stage_commands = 0
+        self.commands = 0
+        self.last_metrics: Dict[str, float] = {}
+        self.seen_resources = set()
+        self.events: List[Dict] = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in THREAD_NAMES.items()
+        ]
+
+    def _us(self, t: float) -> int:
+        return int((t - self.started) * 1e6)
+
+    def span(self, name: str, cat: str, tid: int, start: float, end: float, args: Dict = None):
+        event = {"name": name, "cat": cat, "ph": "X", "pid": 1, "tid": tid,
+                 "ts": self._us(start), "dur": max(0, int((end - start) * 1e6))}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def command(self, name: str, start: float, end: float):
+        self.stage_commands += 1
+        self.commands += 1
+        self.span(name, "webdriver", TID_WEBDRIVER, start, end)
+
+    def stage(self, name: str, performance: Dict[str, float]):
+        now = time.time()
+        args = {"webdriver_commands": self.stage_commands}
+        for key in DURATION_METRICS:
+            if key in performance:
+                args[f"{key}_ms"] = round((performance[key] - self.last_metrics.get(key, 0.0)) * 1000, 2)
+        self.span(name, "stage", TID_STAGES, self.stage_started, now, args)
+        counters = {key: performance[key] for key in COUNTER_METRICS if key in performance}
+        if counters:
+            self.events.append({"name": "page", "ph": "C", "pid": 1, "tid": TID_STAGES,
+                                "ts": self._us(now), "args": counters})
+        self.last_metrics = performance or self.last_metrics
+        self.stage_started = now
+        self.stage_commands = 0
+
+    def network(self, timing: Dict):
+        origin = timing.get("origin") or 0
+        for name, initiator, start, duration, dns, connect, ttfb, download, size in timing.get("entries", []):
+            key = (origin, name, start)
+            if key in self.seen_resources:
+                continue
+            self.seen_resources.add(key)
+            begin = (origin + start) / 1000
+            self.span(name, initiator, TID_NETWORK, begin, begin + duration / 1000, {
+                "dns_ms": round(dns, 1), "connect_ms": round(connect, 1),
+                "ttfb_ms": round(ttfb, 1), "download_ms": round(download, 1),
+                "transfer_bytes": size,
+            })
+
+
+class QuoteTracer:
+    """
+    PorterAPI hook that traces a random `sample_rate` share of quotes into `trace_dir`.
+
+    Safe to share between threads, PorterAPI instances and concurrent quotes
+    on one event loop: each quote's trace is keyed by its driver (or CDP page).
+    Pages of the CDP engine get stage spans only, since a sync hook can't
+    wait for CDP replies on the loop. The newest `max_files` traces are kept;
+    the directory is pruned every `prune_every` writes, not on each one.
+    """
+
+    def __init__(self, trace_dir: str = "traces", sample_rate: float = 0.01, max_files: int = 1000, prune_every: int = 100):
+        self.trace_dir = trace_dir
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.prune_every = max(1, prune_every)
+        self._written = 0
+        self._traces: Dict[int, _Trace] = {}
+        self._lock = threading.Lock()
+        os.makedirs(trace_dir, exist_ok=True)
+
+    def on_start(self, driver):
+        _local.trace = None
+        with self._lock:
+            self._traces.pop(id(driver), None)
+        if random.random() >= self.sample_rate:
+            return
+        trace = _Trace()
+        if hasattr(driver, "execute_cdp_cmd"):
+            _install_command_counter(getattr(driver, "_target", driver))
+            with _tracer_commands():
+                try:
+                    driver.execute_cdp_cmd("Performance.enable", {})
+                except Exception:
+                    pass
+            # WebDriver commands are counted on the thread that runs the quote
+            _local.trace = trace
+        with self._lock:
+            self._traces[id(driver)] = trace
+
+    def on_stage(self, driver, stage: str):
+        with self._lock:
+            trace = self._traces.get(id(driver))
+        if trace is not None:
+            self._sample(driver, trace, stage)
+
+    def on_finish(self, driver, result: Dict):
+        with self._lock:
+            trace = self._traces.pop(id(driver), None)
+        if trace is None:
+            return
+        _local.trace = None
+        self._sample(driver, trace, "finish")
+        trace.span("get_quote", "quote", TID_STAGES, trace.started, time.time(), {
+            "success": bool(result.get("success")),
+            "city": result.get("city"),
+            "service_type": result.get("service_type"),
+            "webdriver_commands": trace.commands,
+            "error": result.get("error"),
+        })
+        self._write(trace, result)
+
+    def _sample(self, driver, trace: _Trace, stage: str):
+        if not hasattr(driver, "execute_cdp_cmd"):
+            trace.stage(stage, {})
+            return
+        with _tracer_commands():
+            try:
+                response = driver.execute_cdp_cmd("Performance.getMetrics", {})
+                performance = {m["name"]: m["value"] for m in response.get("metrics", [])}
+            except Exception:
+                performance = {}
+            try:
+                timing = driver.execute_script(_RESOURCE_TIMING_JS) or {}
+            except Exception:
+                timing = {}
+        trace.stage(stage, performance)
+        trace.network(timing)
+
+    def _write(self, trace: _Trace, result: Dict) -> Optional[str]:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{result.get('city') or 'quote'}-{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.trace_dir, name)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace.events, "displayTimeUnit": "ms"}, f, separators=(",", ":"))
+        metrics.inc("porter_quote_traces_total")
+        with self._lock:
+            self._written += 1
+            prune = self._written % self.prune_every == 0
+        if prune:
+            self._prune()
+        print(f"🔬 Trace written to {path}")
+        return path
+
+    def _prune(self):
+        # By modification time: names only have second resolution
+        with os.scandir(self.trace_dir) as entries:
+            traces = sorted((e.stat().st_mtime_ns, e.name) for e in entries if e.name.endswith(".json"))
+        for _, old in traces[:max(0, len(traces) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.trace_dir, old))
+            except OSError:
+                pass
+
+
+class StageTimer:
+    """
+    Always-on hook exporting the duration of every get_quote stage as
+    porter_quote_stage_seconds{stage=...}; "finish" covers the rest of a
+    failed or completed run. Costs a clock read per stage. Runs are keyed by
+    driver, so concurrent quotes on one event loop (CDP engine) don't mix.
+    """
+
+    def __init__(self):
+        self._started: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, driver):
+        with self._lock:
+            self._started[id(driver)] = time.monotonic()
+
+    def on_stage(self, driver, stage: str):
+        self._observe(driver, stage)
+
+    def on_restart(self, driver):
+        # The cold run reports every stage again; the warm attempt's time is left out
+        with self._lock:
+            if id(driver) in self._started:
+                self._started[id(driver)] = time.monotonic()
+
+    def on_finish(self, driver, result: Dict):
+        self._observe(driver, "finish")
+        with self._lock:
+            self._started.pop(id(driver), None)
+
+    def _observe(self, driver, stage: str):
+        now = time.monotonic()
+        with self._lock:
+            started = self._started.get(id(driver))
+            if started is None:
+                return
+            self._started[id(driver)] = now
+        metrics.observe("porter_quote_stage_seconds", now - started, stage=stage)
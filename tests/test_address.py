@@ -0,0 +1,52 @@
+from porter_api.address import AddressIndex, canonical_address, route_key
+
+
+def test_spelling_variants_share_a_key():
+    assert route_key("Koramangala, BENGALURU", "Indiranagar 100 Ft Rd", "Bangalore") == \
+        route_key("koramangala bangalore", "100 feet road, indiranagar", "Bengaluru")
+
+
+def test_east_and_west_stay_apart():
+    index = AddressIndex()
+    west = index.add("Andheri West Station Road", "Mumbai")
+    east = index.add("Andheri East Station Road", "Mumbai")
+    assert west != east
+    assert index.lookup("Andheri East Station Rd", "Mumbai") == east
+    assert route_key("Andheri West Station Road", "Bandra", "Mumbai", index=index) != \
+        route_key("Andheri East Station Road", "Bandra", "Mumbai", index=index)
+
+
+def test_ordinals_stay_apart():
+    index = AddressIndex()
+    fifth = index.add("Koramangala 5th Block 80 Feet Road", "Bangalore")
+    sixth = index.add("Koramangala 6th Block 80 Feet Road", "Bangalore")
+    assert fifth != sixth
+    assert index.lookup("Koramangala 6th Block 80 Feet Rd", "Bangalore") == sixth
+
+
+def test_pincode_alone_never_matches():
+    index = AddressIndex()
+    index.add("Koramangala 560034", "Bangalore")
+    assert index.add("St John's Hospital 560034", "Bangalore") != index.add("Koramangala 560034", "Bangalore")
+    assert index.lookup("560034", "Bangalore") is None
+    assert index.lookup("Forum Mall 560034", "Bangalore") is None
+
+
+def test_pincode_narrows_candidates():
+    index = AddressIndex()
+    index.add("Sector 5 Main Road 400001", "Mumbai")
+    assert index.lookup("Sector 5 Main Road 400002", "Mumbai") is None
+
+
+def test_matches_are_scoped_by_city():
+    index = AddressIndex()
+    index.add("MG Road 560001", "Bangalore")
+    assert index.lookup("MG Road 560001", "Pune") is None
+
+
+def test_keys_do_not_depend_on_insertion_order():
+    first, second = AddressIndex(), AddressIndex()
+    addresses = ["Koramangala 560034", "560034", "Koramangala, Bangalore"]
+    keys = [first.add(a, "Bangalore") for a in addresses]
+    reversed_keys = [second.add(a, "Bangalore") for a in reversed(addresses)][::-1]
+    assert keys == reversed_keys == [canonical_address(a, "Bangalore") for a in addresses]
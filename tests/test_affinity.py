@@ -0,0 +1,54 @@
+import threading
+from contextlib import contextmanager
+
+from porter_api.affinity import AffinityDispatcher
+from porter_api import tracing
+from porter_api.tracing import StageTimer
+
+
+def _request(city="Delhi", service_type="trucks"):
+    return {"city": city, "service_type": service_type, "pickup_address": "a", "drop_address": "b"}
+
+
+def test_session_is_opened_inside_the_scheduled_task():
+    in_task = threading.local()
+    events = []
+
+    @contextmanager
+    def session():
+        events.append(("open", getattr(in_task, "active", False)))
+        yield "driver"
+
+    def run_task(fn):
+        in_task.active = True
+        try:
+            return fn()
+        finally:
+            in_task.active = False
+
+    dispatcher = AffinityDispatcher(
+        lambda request, driver, state: {"success": True, "driver": driver},
+        workers=1, session_factory=session, run_task=run_task,
+    )
+    try:
+        assert dispatcher.submit(_request()).result(timeout=5)["driver"] == "driver"
+        assert dispatcher.submit(_request()).result(timeout=5)["success"]
+    finally:
+        dispatcher.shutdown()
+    # One session, kept warm for the second job, and opened while holding the task's slot
+    assert events == [("open", True)]
+
+
+def test_stage_timer_restart_drops_the_warm_attempt(monkeypatch):
+    clock = iter([0.0, 3.0, 10.0, 12.0, 13.0])
+    observed = []
+    monkeypatch.setattr(tracing.time, "monotonic", lambda: next(clock))
+    monkeypatch.setattr(tracing.metrics, "observe", lambda name, value, stage: observed.append((stage, value)))
+
+    timer = StageTimer()
+    timer.on_start("driver")                     # 0
+    timer.on_stage("driver", "estimate_form")    # 3: warm attempt
+    timer.on_restart("driver")                   # 10: warm page failed
+    timer.on_stage("driver", "estimate_form")    # 12: cold run
+    timer.on_finish("driver", {})                # 13
+    assert observed == [("estimate_form", 3.0), ("estimate_form", 2.0), ("finish", 1.0)]
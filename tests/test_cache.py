@@ -0,0 +1,147 @@
+from concurrent.futures import Future
+
+import pytest
+
+from porter_api import cache as cache_module
+from porter_api.cache import QuoteCache, RefreshAhead
+from porter_api.metrics import metrics
+from porter_api.scheduler import REFRESH
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeScheduler:
+    """Runs submitted refreshes inline and reports whatever capacity the test sets"""
+
+    def __init__(self, idle=2, queued=0):
+        self.idle, self.queued, self.reserved_interactive = idle, queued, 1
+        self.submitted = []
+
+    def queue_depth(self):
+        return self.queued
+
+    def idle_workers(self):
+        return self.idle
+
+    def submit(self, fn, *args, priority):
+        self.submitted.append((args[0], priority))
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def _hits(outcome):
+    return metrics.get("porter_cache_requests_total", outcome=outcome)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = QuoteCache(ttl=60)
+    cache.put("a", {"success": True})
+    clock.now += 59
+    assert cache.get("a") == {"success": True}
+    assert cache.expires_in("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.expires_in("a") == 0
+    assert cache.expires_in("b") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QuoteCache(ttl=60, max_entries=2)
+    cache.put("a", {"route": "a"})
+    cache.put("b", {"route": "b"})
+    cache.get("a")  # now "b" is the least recently used
+    cache.put("c", {"route": "c"})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_hits_only_the_refresh_made_possible_are_counted_apart(clock):
+    cache = QuoteCache(ttl=60)
+    cache.put("a", {"v": 1})
+    clock.now += 30
+    cache.put("a", {"v": 2}, refreshed=True)  # the old entry would have expired at +60
+    before = _hits("hit"), _hits("refreshed_hit")
+    cache.get("a")
+    clock.now += 40
+    cache.get("a")
+    assert (_hits("hit") - before[0], _hits("refreshed_hit") - before[1]) == (1, 1)
+
+
+def test_coldest_route_stops_being_tracked(clock):
+    refresher = RefreshAhead(QuoteCache(), FakeScheduler(), lambda r: r, max_tracked=3, half_life=60)
+    for key, requests in (("a", 3), ("b", 1), ("c", 2)):
+        for _ in range(requests):
+            refresher.record(key, {"route": key})
+    refresher.record("d", {"route": "d"})
+    assert set(refresher._routes) == {"a", "c", "d"}
+
+    # "a" was the hottest an hour ago; decayed, it is colder than routes requested since
+    clock.now += 3600
+    refresher.record("c", {"route": "c"})
+    refresher.record("d", {"route": "d"})
+    refresher.record("e", {"route": "e"})
+    assert set(refresher._routes) == {"c", "d", "e"}
+
+
+def test_heap_stays_bounded_under_repeat_requests(clock):
+    refresher = RefreshAhead(QuoteCache(), FakeScheduler(), lambda r: r, max_tracked=2)
+    for _ in range(1000):
+        clock.now += 1
+        refresher.record("hot", {"route": "hot"})
+    assert len(refresher._coldest) <= 2 * len(refresher._routes)
+    refresher.record("a", {})
+    refresher.record("b", {})
+    assert set(refresher._routes) == {"hot", "b"}
+
+
+def test_tick_refreshes_hot_routes_about_to_expire(clock):
+    cache = QuoteCache(ttl=300)
+    scheduler = FakeScheduler()
+    refreshed = []
+    refresher = RefreshAhead(
+        cache, scheduler, lambda r: refreshed.append(r["route"]) or {"success": True, "v": r["route"]},
+        top_n=2, refresh_window=120, budget_per_minute=6,
+    )
+    for key, requests in (("hot", 3), ("warm", 2), ("cold", 1), ("uncached", 5)):
+        if key != "uncached":
+            cache.put(key, {"success": True})
+        for _ in range(requests):
+            refresher.record(key, {"route": key})
+
+    assert refresher.tick() == 0  # nothing expires within the window yet
+    clock.now += 200
+    assert refresher.tick() == 1  # "uncached" and "hot" are the top 2; only "hot" is cached
+    assert refreshed == ["hot"] and scheduler.submitted == [("hot", REFRESH)]
+    assert cache.get("hot") == {"success": True, "v": "hot"}
+    assert cache.expires_in("hot") == 300
+
+
+def test_tick_waits_for_spare_capacity_and_budget(clock):
+    cache = QuoteCache(ttl=100)
+    scheduler = FakeScheduler(idle=1)  # only the interactive reserve is idle
+    refresher = RefreshAhead(cache, scheduler, lambda r: {"success": True}, budget_per_minute=1)
+    for key in ("a", "b"):
+        cache.put(key, {"success": True})
+        refresher.record(key, {"route": key})
+    assert refresher.tick() == 0
+
+    scheduler.idle = 2
+    assert refresher.tick() == 1  # one token per minute
+    assert refresher.tick() == 0
+    clock.now += 60
+    assert refresher.tick() == 1
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from porter_api.cdp import CDPBrowser, CDPError
+
+# Stands in for Chrome: prints a DevTools URL and answers Target.* commands.
+# FAKE_CHROME_FAIL names a method to answer with an error; every command is logged to FAKE_CHROME_LOG.
+FAKE_CHROME = f"""#!{sys.executable}
+import asyncio, itertools, json, os, sys
+import websockets
+
+ids = itertools.count(1)
+
+async def handle(ws):
+    async for raw in ws:
+        message = json.loads(raw)
+        with open(os.environ["FAKE_CHROME_LOG"], "a") as f:
+            f.write(json.dumps(message) + "\\n")
+        if message["method"] == os.environ.get("FAKE_CHROME_FAIL"):
+            await ws.send(json.dumps({{"id": message["id"], "error": {{"message": "nope"}}}}))
+            continue
+        n = next(ids)
+        result = {{"browserContextId": f"ctx{{n}}", "targetId": f"target{{n}}", "sessionId": f"session{{n}}"}}
+        await ws.send(json.dumps({{"id": message["id"], "result": result}}))
+
+async def main():
+    async with websockets.serve(handle, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        print(f"DevTools listening on ws://127.0.0.1:{{port}}/devtools/browser/fake", file=sys.stderr, flush=True)
+        await asyncio.Future()
+
+asyncio.run(main())
+"""
+
+
+@pytest.fixture
+def chrome(tmp_path, monkeypatch):
+    path = tmp_path / "fake-chrome"
+    path.write_text(FAKE_CHROME)
+    path.chmod(0o755)
+    log = tmp_path / "commands.jsonl"
+    monkeypatch.setenv("FAKE_CHROME_LOG", str(log))
+
+    def commands():
+        return [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+
+    return str(path), commands
+
+
+def test_relaunches_after_chrome_dies(chrome):
+    path, _ = chrome
+
+    async def run():
+        async with CDPBrowser(chrome_path=path) as browser:
+            first = browser.pid
+            browser.process.kill()
+            await browser.process.wait()
+            assert not browser.running
+            page = await browser.new_page()
+            assert browser.running and browser.pid != first and browser.relaunches == 1
+            await browser.close_page(page)
+
+    asyncio.run(run())
+
+
+def test_recycles_after_max_pages_once_drained(chrome):
+    path, _ = chrome
+
+    async def run():
+        async with CDPBrowser(chrome_path=path, max_pages=1) as browser:
+            first = browser.pid
+            page = await browser.new_page()
+            waiting = asyncio.ensure_future(browser.new_page())
+            await asyncio.sleep(0.2)
+            assert not waiting.done() and browser.pid == first  # draining, not killed under the open page
+            await browser.close_page(page)
+            second = await asyncio.wait_for(waiting, 10)
+            assert browser.pid != first and browser.relaunches == 1
+            await browser.close_page(second)
+
+    asyncio.run(run())
+
+
+def test_failed_page_setup_disposes_its_context(chrome, monkeypatch):
+    path, commands = chrome
+    monkeypatch.setenv("FAKE_CHROME_FAIL", "Target.attachToTarget")
+
+    async def run():
+        async with CDPBrowser(chrome_path=path) as browser:
+            with pytest.raises(CDPError):
+                await browser.new_page()
+            assert browser._open_pages == 0
+
+    asyncio.run(run())
+    sent = commands()
+    assert [command["method"] for command in sent] == [
+        "Target.createBrowserContext", "Target.createTarget", "Target.attachToTarget", "Target.disposeBrowserContext",
+    ]
+    assert sent[-1]["params"] == {"browserContextId": "ctx1"}
+
+
+def test_send_failure_leaves_no_pending_command(chrome):
+    path, _ = chrome
+
+    class BrokenSocket:
+        async def send(self, data):
+            raise ConnectionError("socket gone")
+
+    async def run():
+        async with CDPBrowser(chrome_path=path) as browser:
+            ws, browser._ws = browser._ws, BrokenSocket()
+            try:
+                with pytest.raises(CDPError):
+                    await browser.send("Target.getTargets")
+                assert browser._pending == {}
+            finally:
+                browser._ws = ws
+
+    asyncio.run(run())
@@ -0,0 +1,139 @@
+import pytest
+
+from benchmarks.fixture_server import estimate
+from porter_api.core import BROWSER_ERROR, INPUT_ERROR, PAGE_ERROR, TIMEOUT_ERROR, PorterAPI, _parse_quote_card
+from porter_api.health import CLOSED, OPEN, CircuitBreaker
+
+ROUTE = ("Koramangala", "Indiranagar", "Bangalore")
+
+
+def _cards(service_type):
+    return [(v["name"], v["fare"], v["capacity"]) for v in estimate("Bangalore", service_type, *ROUTE[:2])["vehicles"]]
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, driver):
+        self.events.append("start")
+
+    def on_stage(self, driver, stage):
+        self.events.append(stage)
+
+    def on_finish(self, driver, result):
+        self.events.append("finish")
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for the multi flow: the pickup field keeps its value"""
+
+    class Element:
+        def get_attribute(self, name):
+            return "Koramangala"
+
+    def find_elements(self, by, value):
+        return [self.Element()]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A PorterAPI whose page steps are stubbed; `calls` logs every step and `fail` picks failures"""
+    api = PorterAPI(name="Amit Shah", phone="9876543210", hooks=[Recorder()])
+    api.calls, api.fail = [], {}
+    current = {}
+
+    def step(name, error=None):
+        def run(driver, *args, **kwargs):
+            api.calls.append(name)
+            return api.fail.get((name, current.get("type"))) or error
+        return run
+
+    def choose(driver, wait, service_type):
+        current["type"] = service_type
+        api.calls.append("choose")
+        return api.fail.get(("choose", service_type))
+
+    def collect(driver, wait, stale_card=None):
+        api.calls.append("collect")
+        error = api.fail.get(("collect", current["type"]))
+        return (None, error) if error else api._quotes_from_cards(_cards(current["type"]))
+
+    monkeypatch.setattr(api, "_open_estimate_form", step("open"))
+    monkeypatch.setattr(api, "_wait_for_rate_limit", lambda city: api.calls.append("limit"))
+    monkeypatch.setattr(api, "_choose_service_type", choose)
+    monkeypatch.setattr(api, "_fill_route_form", step("fill"))
+    monkeypatch.setattr(api, "_submit_form", step("submit"))
+    monkeypatch.setattr(api, "_collect_quotes", collect)
+    return api
+
+
+def test_fixture_cards_parse_into_quotes():
+    quotes, error = PorterAPI(name="Amit Shah", phone="9876543210")._quotes_from_cards(_cards("trucks"))
+    assert error is None
+    assert [q["vehicle_name"] for q in quotes] == ["3 Wheeler", "Tata Ace", "Pickup 8ft", "Tata 407"]
+    assert quotes[3]["capacity_kg"] == 2500
+    for quote in quotes:
+        assert quote["min_price"] < quote["max_price"]
+        assert quote["price_range"] == f"₹{quote['min_price']:,} - ₹{quote['max_price']:,}"
+
+
+def test_fare_without_numbers_keeps_its_text():
+    quote = _parse_quote_card("Tata Ace", "Call for price", "750 kg")
+    assert (quote["min_price"], quote["max_price"], quote["capacity_kg"]) == (None, None, 750)
+    assert quote["price_range"] == "Call for price"
+
+
+def test_no_cards_is_a_page_error():
+    quotes, error = PorterAPI(name="Amit Shah", phone="9876543210")._quotes_from_cards([])
+    assert quotes == [] and error["error_type"] == PAGE_ERROR
+
+
+def test_multi_quotes_every_type_through_the_limiter_and_hooks(api):
+    result = api.get_quotes_multi(*ROUTE, service_types=["trucks", "two_wheelers"], driver=FakeDriver())
+    assert result["success"]
+    assert [q["vehicle_name"] for q in result["results"]["two_wheelers"]["quotes"]] == ["2 Wheeler"]
+    assert api.calls.count("limit") == 1  # the form open took the first type's token
+    assert api.calls.count("fill") == 1   # the form is filled once
+    assert api.hooks[0].events == [
+        "start", "estimate_form",
+        "service_selected", "form_filled", "submitted", "results",
+        "service_selected", "submitted", "results",
+        "finish",
+    ]
+
+
+def test_multi_failed_switch_has_its_own_error(api):
+    api.fail[("collect", "two_wheelers")] = api._create_error_response("gone", error_type=TIMEOUT_ERROR)
+    api.fail[("choose", "packers_and_movers")] = api._create_error_response("no tab")
+    result = api.get_quotes_multi(
+        *ROUTE, service_types=["trucks", "two_wheelers", "packers_and_movers", "boats"], driver=FakeDriver(),
+    )
+    entries = result["results"]
+    assert result["success"] and entries["trucks"]["success"]
+    assert entries["two_wheelers"]["service_type"] == "two_wheelers"
+    assert entries["two_wheelers"]["error_type"] == PAGE_ERROR  # stale results, not a slow page
+    assert "two_wheelers" in entries["two_wheelers"]["error"]
+    assert entries["packers_and_movers"]["error"] == "no tab"
+    assert entries["boats"]["error_type"] == INPUT_ERROR and entries["boats"]["service_type"] == "boats"
+
+
+def test_multi_failure_is_recorded_by_the_breaker(api):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    api.fail[("open", None)] = api._create_error_response("browser died", error_type=BROWSER_ERROR)
+    result = api.get_quotes_multi(*ROUTE, service_types=["trucks", "two_wheelers"], driver=FakeDriver(), breaker=breaker)
+    assert not result["success"] and result["error_type"] == BROWSER_ERROR
+    assert [entry["service_type"] for entry in result["results"].values()] == ["trucks", "two_wheelers"]
+    assert breaker.state == OPEN
+
+    api.calls.clear()
+    refused = api.get_quotes_multi(*ROUTE, driver=FakeDriver(), breaker=breaker)
+    assert refused["error_type"] == "circuit_open" and refused["retry_after"] > 0
+    assert api.calls == []
+
+
+def test_multi_bad_input_does_not_trip_the_breaker(api):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    result = api.get_quotes_multi(*ROUTE, service_types=["boats"], driver=FakeDriver(), breaker=breaker)
+    assert result["error_type"] == INPUT_ERROR and api.calls == []
+    assert breaker.state == CLOSED
@@ -0,0 +1,24 @@
+import multiprocessing
+
+from porter_api.dlq import JSONLDeadLetterQueue
+from porter_api.pipeline import WorkItem
+
+
+def _append(path, start, count):
+    dlq = JSONLDeadLetterQueue(path)
+    for i in range(start, start + count):
+        dlq.put(WorkItem('{"city": "Pune"}', item_id=f"m{i}"), "scrape failed: timeout")
+
+
+def test_entries_appended_during_a_replay_are_kept(tmp_path):
+    path = str(tmp_path / "dlq.jsonl")
+    _append(path, 0, 50)
+    dlq = JSONLDeadLetterQueue(path)
+
+    writer = multiprocessing.Process(target=_append, args=(path, 50, 200))
+    writer.start()
+    for i in range(0, 50, 5):
+        dlq.remove({f"m{j}" for j in range(i, i + 5)})
+    writer.join()
+
+    assert sorted(entry["id"] for entry in dlq.entries()) == sorted(f"m{i}" for i in range(50, 250))
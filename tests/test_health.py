@@ -0,0 +1,32 @@
+from porter_api.core import BROWSER_ERROR, INPUT_ERROR, PAGE_ERROR, RATE_LIMITED, TIMEOUT_ERROR
+from porter_api.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _error(error_type):
+    return {"success": False, "error": "nope", "error_type": error_type}
+
+
+def test_only_browser_errors_and_timeouts_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    for error_type in (INPUT_ERROR, PAGE_ERROR, RATE_LIMITED, "busy"):
+        assert breaker.allow()
+        breaker.record_result(_error(error_type))
+    assert breaker.state == CLOSED
+
+    breaker.record_result(_error(TIMEOUT_ERROR))
+    breaker.record_result(None)  # crashed
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_neutral_trial_lets_the_next_one_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_result(_error(BROWSER_ERROR))
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_result(_error(INPUT_ERROR))
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    breaker.record_result({"success": True})
+    assert breaker.state == CLOSED
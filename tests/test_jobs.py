@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+from porter_api.jobs import JobStore
+
+
+def test_event_loop_subscribers_hold_no_thread():
+    store = JobStore()
+    job = store.create({"city": "Delhi"})
+
+    async def subscribe():
+        threads = threading.active_count()
+        waits = [asyncio.ensure_future(job.changed_since(0, 5)) for _ in range(50)]
+        await asyncio.sleep(0.05)
+        assert threading.active_count() == threads
+        # The job is finished from a worker thread, as the scheduler does
+        threading.Thread(target=store.run, args=(job, lambda request: {"success": True})).start()
+        return await asyncio.gather(*waits)
+
+    versions = asyncio.run(subscribe())
+    assert all(version > 0 for version in versions)
+    assert job._waiters == []
+
+
+def test_changed_since_times_out_with_the_same_version():
+    job = JobStore().create({})
+    assert asyncio.run(job.changed_since(0, 0.05)) == 0
+    assert asyncio.run(job.changed_since(-1, 5)) == 0
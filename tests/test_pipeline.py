@@ -0,0 +1,201 @@
+import json
+import threading
+import time
+
+from porter_api.pipeline import Pipeline, RetryPolicy, SQSSource
+
+
+class FakeSQS:
+    """In-memory stand-in for the boto3 SQS calls SQSSource makes"""
+
+    def __init__(self, bodies):
+        self.pending = [
+            {"MessageId": f"m{i}", "ReceiptHandle": f"h{i}", "Body": json.dumps(body),
+             "Attributes": {"ApproximateReceiveCount": "1"}}
+            for i, body in enumerate(bodies)
+        ]
+        self.requested = []
+        self.deleted = []
+        self.visibility = {}
+        self.lock = threading.Lock()
+
+    def receive_message(self, MaxNumberOfMessages, **kwargs):
+        self.requested.append(MaxNumberOfMessages)
+        with self.lock:
+            batch, self.pending = self.pending[:MaxNumberOfMessages], self.pending[MaxNumberOfMessages:]
+        if not batch:
+            time.sleep(0.01)
+        return {"Messages": batch}
+
+    def delete_message(self, ReceiptHandle, **kwargs):
+        self.deleted.append(ReceiptHandle)
+
+    def change_message_visibility(self, ReceiptHandle, VisibilityTimeout, **kwargs):
+        self.visibility[ReceiptHandle] = VisibilityTimeout
+
+    def change_message_visibility_batch(self, Entries, **kwargs):
+        for entry in Entries:
+            self.visibility[entry["ReceiptHandle"]] = entry["VisibilityTimeout"]
+
+
+class ListSink:
+    def __init__(self):
+        self.items = []
+
+    def write(self, item):
+        self.items.append(item.id)
+        return True
+
+
+def message(i):
+    return {
+        "name": "Test", "phone": "9876543210", "city": "Bangalore",
+        "pickup_address": f"Koramangala {i}", "drop_address": "Indiranagar",
+        "reference_id": str(i), "reference_type": "order",
+    }
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_receives_only_what_the_workers_can_take():
+    sqs = FakeSQS([message(i) for i in range(8)])
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def scrape(request):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {"success": True, "quotes": [{"vehicle_name": "3 Wheeler"}]}
+
+    source = SQSSource(sqs, "queue", max_in_flight=2)
+    sink = ListSink()
+    pipeline = Pipeline(source, [sink], scrape=scrape, workers=2)
+    threading.Thread(target=pipeline.run, daemon=True).start()
+
+    assert wait_for(lambda: len(sqs.deleted) == 8)
+    assert max(sqs.requested) <= 2
+    assert peak[0] <= 2
+    assert sorted(sink.items) == sorted(f"m{i}" for i in range(8))
+
+
+def test_heartbeat_extends_held_messages_only():
+    sqs = FakeSQS([message(i) for i in range(3)])
+    source = SQSSource(sqs, "queue", max_in_flight=3, visibility_timeout=90)
+    items = iter(source)
+    first, second, third = next(items), next(items), next(items)
+
+    first.ack()
+    second.nack(30)
+    source.heartbeat()
+
+    assert sqs.deleted == ["h0"]
+    assert sqs.visibility == {"h1": 30, "h2": 90}
+    third.ack()
+
+
+def test_heartbeat_calls_sqs_outside_the_lock():
+    sqs = FakeSQS([message(i) for i in range(2)])
+    source = SQSSource(sqs, "queue", max_in_flight=2, visibility_timeout=90)
+    items = iter(source)
+    first, second = next(items), next(items)
+    in_call, finish = threading.Event(), threading.Event()
+    extend = sqs.change_message_visibility_batch
+
+    def slow_batch(**kwargs):
+        in_call.set()
+        finish.wait(5)
+        extend(**kwargs)
+
+    sqs.change_message_visibility_batch = slow_batch
+    heartbeat = threading.Thread(target=source.heartbeat)
+    heartbeat.start()
+    assert in_call.wait(5)
+    # Neither waits for the slow SQS call
+    first.ack()
+    second.nack(30)
+    assert sqs.deleted == ["h0"]
+    finish.set()
+    heartbeat.join(5)
+    # The retry delay lands after the heartbeat's extension, not under it
+    assert sqs.visibility["h1"] == 30
+
+
+def test_failed_scrape_is_retried_once_per_receive():
+    sqs = FakeSQS([message(1)])
+    calls = []
+
+    def scrape(request):
+        calls.append(request["reference_id"])
+        return {"success": False, "error": "timeout"}
+
+    pipeline = Pipeline(
+        SQSSource(sqs, "queue", max_in_flight=1), [ListSink()], scrape=scrape, workers=1,
+        retry_policy=RetryPolicy(base_delay=30, jitter=0),
+    )
+    threading.Thread(target=pipeline.run, daemon=True).start()
+
+    assert wait_for(lambda: "h0" in sqs.visibility)
+    assert calls == ["1"]
+    assert sqs.visibility["h0"] == 30
+
+
+class ListDeadLetter:
+    def __init__(self):
+        self.reasons = {}
+
+    def put(self, item, reason):
+        self.reasons[item.id] = reason
+
+
+def test_missing_city_is_dead_lettered_at_once():
+    body = message(1)
+    del body["city"]
+    sqs = FakeSQS([body])
+    dead_letter = ListDeadLetter()
+    pipeline = Pipeline(SQSSource(sqs, "queue"), [ListSink()], scrape=lambda r: {"success": True}, dead_letter=dead_letter)
+    threading.Thread(target=pipeline.run, daemon=True).start()
+
+    assert wait_for(lambda: sqs.deleted == ["h0"])
+    assert dead_letter.reasons["m0"].startswith("invalid: City is missing")
+
+
+def test_refused_scrapes_are_not_attempts():
+    sqs = FakeSQS([message(1)])
+    results = [{"success": False, "error": "circuit open", "retry_after": 12}] * 4 + [{"success": False, "error": "timeout"}]
+    dead_letter = ListDeadLetter()
+    pipeline = Pipeline(
+        SQSSource(sqs, "queue"), [ListSink()], scrape=lambda r: results.pop(0),
+        retry_policy=RetryPolicy(base_delay=30, max_attempts=2, jitter=0), dead_letter=dead_letter,
+    )
+    threading.Thread(target=pipeline.run, daemon=True).start()
+
+    # Every redelivery raises ApproximateReceiveCount, refused or not
+    for receive_count in range(2, 6):
+        assert wait_for(lambda: "h0" in sqs.visibility)
+        assert sqs.visibility.pop("h0") == 12
+        sqs.pending.append({"MessageId": "m0", "ReceiptHandle": "h0", "Body": json.dumps(message(1)),
+                            "Attributes": {"ApproximateReceiveCount": str(receive_count)}})
+
+    # Fifth receive, first real failure: retried, not dead-lettered
+    assert wait_for(lambda: "h0" in sqs.visibility)
+    assert sqs.visibility["h0"] == 30
+    assert dead_letter.reasons == {}
+
+
+def test_pause_holds_off_receiving():
+    sqs = FakeSQS([message(1)])
+    paused = [0.05]
+    source = SQSSource(sqs, "queue", pause=lambda: paused.pop() if paused else 0)
+    start = time.monotonic()
+    item = next(iter(source))
+    assert time.monotonic() - start >= 0.05
+    assert item.id == "m0"
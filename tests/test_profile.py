@@ -0,0 +1,164 @@
+import itertools
+import os
+import time
+import types
+
+import pytest
+
+from porter_api import core, profile
+from porter_api.profile import LOCK_FILES, WarmProfile
+
+get_selenium_driver = core.get_selenium_driver
+
+
+class FakeDriver:
+    """Stands in for the seeding Chrome: writes a cache entry and Chrome's lock files into its profile"""
+
+    def __init__(self, user_data_dir, fail=False):
+        self.user_data_dir = user_data_dir
+        self.fail = fail
+        self.visited = []
+        self.quit_calls = 0
+
+    def get(self, url):
+        if self.fail:
+            raise RuntimeError("net::ERR_NAME_NOT_RESOLVED")
+        self.visited.append(url)
+        os.makedirs(os.path.join(self.user_data_dir, "Default", "Cache"))
+        with open(os.path.join(self.user_data_dir, "Default", "Cache", "data_1"), "w") as f:
+            f.write(url)
+        os.symlink("host-1234", os.path.join(self.user_data_dir, "SingletonLock"))
+        open(os.path.join(self.user_data_dir, "lockfile"), "w").close()
+
+    def execute_script(self, script):
+        return "complete"
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class Drivers(list):
+    """Started fake drivers; set `fail` to make the next ones fail to load the page"""
+    fail = False
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    started = Drivers()
+
+    def fake_get_selenium_driver(remote_debugging_port=None, user_data_dir=None):
+        assert remote_debugging_port == 0
+        started.append(FakeDriver(user_data_dir, fail=started.fail))
+        return started[-1]
+
+    # Generation names have second resolution; give every seed its own second and skip the settle wait
+    seconds = itertools.count(1)
+    monkeypatch.setattr(profile, "time", types.SimpleNamespace(
+        time=time.time, monotonic=time.monotonic, sleep=lambda s: None,
+        strftime=lambda fmt: f"20260101-0000{next(seconds):02d}",
+    ))
+    monkeypatch.setattr(core, "get_selenium_driver", fake_get_selenium_driver)
+    return started
+
+
+def _generations(template_dir):
+    return sorted(os.listdir(template_dir))
+
+
+def test_seed_makes_an_unlocked_template(tmp_path, drivers):
+    warm = WarmProfile(str(tmp_path / "template"), seed_url="http://fixture/")
+    assert warm.stale and warm.clone() is None
+
+    assert warm.seed()
+    assert drivers[0].visited == ["http://fixture/"] and drivers[0].quit_calls == 1
+    [generation] = _generations(warm.template_dir)
+    assert generation.startswith("gen-")
+    template = os.path.join(warm.template_dir, generation)
+    assert os.path.exists(os.path.join(template, "Default", "Cache", "data_1"))
+    assert not any(os.path.lexists(os.path.join(template, name)) for name in LOCK_FILES)
+    assert not warm.stale
+
+
+def test_failed_seed_leaves_no_staging_dir(tmp_path, drivers):
+    warm = WarmProfile(str(tmp_path / "template"))
+    drivers.fail = True
+    assert not warm.seed()
+    assert drivers[0].quit_calls == 1
+    assert _generations(warm.template_dir) == []
+    assert warm.stale
+
+
+def test_only_the_current_and_previous_generations_are_kept(tmp_path, drivers):
+    warm = WarmProfile(str(tmp_path / "template"))
+    for _ in range(4):
+        assert warm.seed()
+    assert _generations(warm.template_dir) == [f"gen-20260101-000003-{os.getpid()}", f"gen-20260101-000004-{os.getpid()}"]
+
+    # A restart adopts the newest generation instead of seeding again
+    restarted = WarmProfile(warm.template_dir, refresh_interval=3600)
+    assert restarted._current == warm._current and not restarted.stale
+    assert WarmProfile(warm.template_dir, refresh_interval=0).stale is False
+
+
+def test_clones_are_private_copies_removed_on_release(tmp_path, drivers):
+    warm = WarmProfile(str(tmp_path / "template"), clone_root=str(tmp_path / "clones"))
+    os.makedirs(warm.clone_root)
+    warm.seed()
+
+    first, second = warm.clone(), warm.clone()
+    assert first != second
+    with open(os.path.join(first, "Default", "Cache", "data_1"), "w") as f:
+        f.write("changed by its browser")
+    with open(os.path.join(second, "Default", "Cache", "data_1")) as f:
+        assert f.read() != "changed by its browser"
+    with open(os.path.join(warm._current, "Default", "Cache", "data_1")) as f:
+        assert f.read() != "changed by its browser"
+
+    warm.release(first)
+    warm.release(second)
+    assert os.listdir(warm.clone_root) == []
+
+
+def test_clone_falls_back_to_a_plain_copy_without_cp(tmp_path, drivers, monkeypatch):
+    warm = WarmProfile(str(tmp_path / "template"))
+    warm.seed()
+
+    def no_cp(*args, **kwargs):
+        raise FileNotFoundError("cp")
+
+    monkeypatch.setattr(profile.subprocess, "run", no_cp)
+    clone = warm.clone()
+    try:
+        assert os.path.exists(os.path.join(clone, "Default", "Cache", "data_1"))
+    finally:
+        warm.release(clone)
+
+
+def test_drivers_start_from_a_clone_released_on_quit(tmp_path, drivers, monkeypatch):
+    warm = WarmProfile(str(tmp_path / "template"), clone_root=str(tmp_path / "clones"))
+    os.makedirs(warm.clone_root)
+    warm.seed()
+    monkeypatch.setattr(core, "get_selenium_driver", get_selenium_driver)  # the real one, with Chrome faked below
+
+    launched = []
+
+    class Chrome:
+        def __init__(self, service, options):
+            launched.append(options.arguments)
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(core.webdriver, "Chrome", Chrome)
+    monkeypatch.setattr(profile, "_profile", warm)
+
+    driver = core.get_selenium_driver()
+    [user_data_dir] = [a.split("=", 1)[1] for a in launched[0] if a.startswith("--user-data-dir=")]
+    assert os.path.dirname(os.path.dirname(user_data_dir)) == warm.clone_root
+    assert os.path.exists(os.path.join(user_data_dir, "Default", "Cache", "data_1"))
+    driver.quit()
+    assert os.listdir(warm.clone_root) == []
+
+    cold = core.get_selenium_driver(warm=False)
+    assert not any(a.startswith("--user-data-dir=") for a in launched[1])
+    cold.quit()
@@ -0,0 +1,39 @@
+import pytest
+
+from porter_api.exceptions import PorterAPIError
+from porter_api.ratelimit import FileBackend, LocalBackend, RateLimiter, RedisBackend
+
+
+def _redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs the Lua script with it
+    return RedisBackend(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=["local", "file", "redis"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalBackend()
+    if request.param == "file":
+        return FileBackend(str(tmp_path / "ratelimit.json"))
+    return _redis_backend()
+
+
+def test_city_timeout_leaves_the_global_token(backend):
+    # Global: 2 back to back, then one a minute; Delhi: 1 back to back, then one an hour
+    limiter = RateLimiter(backend, per_minute=1, burst=2, city_per_minute=1 / 60, city_burst=1, timeout=1)
+    assert limiter.reserve("Delhi") == 0
+    with pytest.raises(PorterAPIError):
+        limiter.reserve("Delhi")
+    # Had the refused Delhi call kept its global token, this one would have to wait a minute
+    assert limiter.reserve("Mumbai") == 0
+
+
+def test_waits_for_the_slowest_bucket(backend):
+    limiter = RateLimiter(backend, per_minute=60, burst=1, timeout=5)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(1, abs=0.1)
+    assert limiter.reserve() == pytest.approx(2, abs=0.1)
+    with pytest.raises(PorterAPIError):
+        limiter.reserve(timeout=2.5)
+    assert limiter.reserve(timeout=3.5) == pytest.approx(3, abs=0.1)
@@ -0,0 +1,28 @@
+import json
+
+from porter_api import records
+from porter_api.core import PorterAPI
+from porter_api.pipeline import BackendSink
+
+
+def _result():
+    api = PorterAPI(name="Amit Shah", phone="9876543210")
+    quotes = [records.quote("Tata Ace", "₹500 - ₹700", 500, 700, "750 kg", 750)]
+    return api._quote_response("Koramangala", "Indiranagar", "Bangalore", "trucks", quotes)
+
+
+def test_results_are_plain_json_ready_dicts():
+    result = _result()
+    assert type(result) is dict and type(result["quotes"][0]) is dict
+    assert result["success"] and result["user_name"] == "Amit Shah"
+    assert json.loads(json.dumps(result)) == records.loads(records.dumps(result))
+
+
+def test_backend_bodies_splice_the_result_quotes_unchanged():
+    result = _result()
+    request = {"reference_id": "ref-1", "name": "Amit Shah"}
+    [body] = BackendSink("", per_quote=True).bodies(request, result)
+    assert json.loads(body)["quote"] == result["quotes"][0]
+    assert json.loads(body)["reference_id"] == "ref-1"
+    [body] = BackendSink("").bodies(request, result)
+    assert json.loads(body)["quotes"] == result["quotes"]
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from porter_api.replay import replay_runs
+
+
+@pytest.mark.parametrize("runs, concurrency", [(0, 1), (-1, 1), (1, 0)])
+def test_replay_runs_needs_at_least_one_run(runs, concurrency, tmp_path):
+    # Rejected before the archive is even read
+    with pytest.raises(ValueError):
+        replay_runs(str(tmp_path), runs=runs, concurrency=concurrency)
+
+
+def test_each_run_gets_its_own_driver_and_the_url_is_restored(tmp_path, monkeypatch):
+    from porter_api import core, replay
+
+    recorded = {"user_name": "Amit Shah", "user_phone": "9876543210", "pickup_address": "a",
+                "drop_address": "b", "city": "Bangalore", "quotes": [{"vehicle_name": "Tata Ace"}]}
+    (tmp_path / replay.SESSION_FILE).write_text(json.dumps(
+        {"base_url": "https://porter.in/", "exchanges": [], "result": recorded}
+    ))
+    ports, drivers, quit = [], [], []
+
+    class Driver:
+        def quit(self):
+            quit.append(self)
+
+    def fake_driver(remote_debugging_port=9222):
+        ports.append(remote_debugging_port)
+        return Driver()
+
+    def fake_get_quote(self, *route, driver=None):
+        drivers.append(driver)
+        assert core.PORTER_URL.startswith("http://127.0.0.1:")
+        return {"success": True, "quotes": recorded["quotes"]}
+
+    monkeypatch.setattr(replay, "get_selenium_driver", fake_driver)
+    monkeypatch.setattr(core.PorterAPI, "get_quote", fake_get_quote)
+    original = core.PORTER_URL
+
+    summary = replay.replay_runs(str(tmp_path), runs=3, concurrency=2)
+    assert summary["matching"] == 3
+    assert ports == [0, 0, 0]
+    assert len(set(map(id, drivers))) == 3 and sorted(map(id, quit)) == sorted(map(id, drivers))
+    assert core.PORTER_URL == original
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from porter_api.scheduler import BACKGROUND, DEFAULT_WEIGHTS, INTERACTIVE, PriorityScheduler, parse_weights
+
+
+def test_parse_weights():
+    assert parse_weights("") == DEFAULT_WEIGHTS
+    assert parse_weights(" background=5 , refresh=0.5") == {**DEFAULT_WEIGHTS, "background": 5.0, "refresh": 0.5}
+    for spec in ("urgent=2", "background=0", "refresh=-1", "interactive=fast", "background"):
+        with pytest.raises(ValueError):
+            parse_weights(spec)
+
+
+def test_zero_weight_is_rejected_up_front():
+    with pytest.raises(ValueError):
+        PriorityScheduler(workers=1, weights={BACKGROUND: 0})
+
+
+def test_stride_order_follows_the_weights():
+    scheduler = PriorityScheduler(workers=1, weights={INTERACTIVE: 3, BACKGROUND: 1}, reserved_interactive=0)
+    gate = threading.Event()
+    order = []
+    try:
+        # Hold the only worker so both lanes queue up before anything is picked
+        started = threading.Event()
+        blocker = scheduler.submit(lambda: started.set() or gate.wait(), priority=INTERACTIVE)
+        assert started.wait(5)
+        futures = [scheduler.submit(order.append, "i", priority=INTERACTIVE) for _ in range(6)]
+        futures += [scheduler.submit(order.append, "b", priority=BACKGROUND) for _ in range(2)]
+        gate.set()
+        blocker.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+    assert order == ["i", "b", "i", "i", "i", "b", "i", "i"]
+
+
+def test_reserved_worker_only_takes_interactive_work():
+    scheduler = PriorityScheduler(workers=2, reserved_interactive=1)
+    gate = threading.Event()
+    try:
+        started = threading.Event()
+        background = [scheduler.submit(lambda: started.set() or gate.wait(5), priority=BACKGROUND) for _ in range(2)]
+        assert started.wait(5)
+        # The second background task waits for the shared worker; the interactive one gets the reserved worker
+        assert scheduler.submit(lambda: "served", priority=INTERACTIVE).result(timeout=2) == "served"
+        assert [f.running() for f in background] == [True, False]
+        gate.set()
+        for future in background:
+            assert future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+
+
+def test_failing_task_does_not_kill_the_worker():
+    scheduler = PriorityScheduler(workers=1)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            scheduler.submit(lambda: 1 / 0).result(timeout=2)
+        assert scheduler.submit(lambda: "still here").result(timeout=2) == "still here"
+        assert scheduler.alive_workers() == 1
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,56 @@
+import threading
+
+import main
+from porter_api.core import PorterAPI
+
+
+def _request():
+    return {"name": "Amit Shah", "phone": "9876543210", "pickup_address": "Koramangala",
+            "drop_address": "Indiranagar", "city": "Bangalore", "service_type": "trucks"}
+
+
+def test_abandoned_stream_stops_its_scrape(monkeypatch):
+    closed, outcomes = [], []
+    cancelled = threading.Event()
+
+    def iter_quote(self, **route):
+        try:
+            yield "context", route
+            yield "quote", {"vehicle_name": "Tata Ace"}
+            yield "quote", {"vehicle_name": "Pickup 8ft"}
+            yield "done", {"success": True}
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(PorterAPI, "iter_quote", iter_quote)
+    monkeypatch.setattr(main, "browser_supervisor", None)
+    monkeypatch.setattr(main.breaker, "release", lambda: outcomes.append("released"))
+    monkeypatch.setattr(main.breaker, "record_result", lambda result: outcomes.append(result))
+
+    emitted = []
+
+    def emit(event):
+        emitted.append(event[0])
+        if event[0] == "quote":
+            cancelled.set()  # the client goes away after the first quote
+
+    main.stream_quote(_request(), emit, cancelled)
+    assert emitted == ["context", "quote"]
+    assert closed == [True]
+    assert outcomes == ["released"]
+
+
+def test_finished_stream_is_recorded(monkeypatch):
+    outcomes = []
+
+    def iter_quote(self, **route):
+        yield "context", route
+        yield "done", {"success": True, "quotes": []}
+
+    monkeypatch.setattr(PorterAPI, "iter_quote", iter_quote)
+    monkeypatch.setattr(main, "browser_supervisor", None)
+    monkeypatch.setattr(main, "quote_cache", None)
+    monkeypatch.setattr(main.breaker, "record_result", lambda result: outcomes.append(result))
+
+    main.stream_quote(_request(), lambda event: None, threading.Event())
+    assert outcomes == [{"success": True, "quotes": []}]
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from porter_api.supervisor import BrowserSupervisor
+
+
+class FakeBrowser:
+    """Stands in for SharedBrowser; quitting takes `quit_seconds`, like a real Chrome"""
+
+    def __init__(self, quit_seconds: float = 0):
+        self.pid = -1
+        self.quit_seconds = quit_seconds
+        self.quit_thread = None
+
+    def new_context(self):
+        return object()
+
+    def close_context(self, context):
+        pass
+
+    def quit(self):
+        self.quit_thread = threading.current_thread()
+        time.sleep(self.quit_seconds)
+
+
+def test_recycle_runs_on_the_monitor_not_in_the_lease():
+    launched = []
+
+    def factory(contexts):
+        launched.append(FakeBrowser(quit_seconds=0.5))
+        return launched[-1]
+
+    supervisor = BrowserSupervisor(browsers=1, max_quotes=1, monitor_interval=60, browser_factory=factory)
+    supervisor.start()
+    try:
+        start = time.monotonic()
+        with supervisor.lease(timeout=1):
+            pass
+        assert time.monotonic() - start < 0.2  # the quote didn't wait for Chrome to quit
+        assert supervisor.healthy() == 0       # draining: no new leases on it
+
+        with supervisor.lease(timeout=5):      # served by the relaunched browser
+            pass
+        assert len(launched) >= 2
+        assert launched[0].quit_thread.name == "browser-supervisor"
+    finally:
+        supervisor.stop()
+
+
+def test_busy_browser_is_drained_before_recycling():
+    launched = []
+    supervisor = BrowserSupervisor(
+        browsers=1, contexts_per_browser=2, max_quotes=1, monitor_interval=60,
+        browser_factory=lambda n: launched.append(FakeBrowser()) or launched[-1],
+    )
+    supervisor.start()
+    try:
+        with supervisor.lease(timeout=1):
+            with supervisor.lease(timeout=1):
+                pass
+            time.sleep(0.1)
+            assert launched[0].quit_thread is None  # one quote still running on it
+        deadline = time.monotonic() + 5
+        while len(launched) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert launched[0].quit_thread is not None and len(launched) == 2
+    finally:
+        supervisor.stop()
@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from porter_api import tracing
+from porter_api.tracing import QuoteTracer
+
+RESULT = {"success": True, "city": "Bangalore", "service_type": "trucks"}
+
+
+class FakeDriver:
+    """WebDriver stand-in: like Selenium, CDP commands and scripts go through execute()"""
+
+    def __init__(self):
+        self.sent = []
+        self.task_duration = 0.0
+
+    def execute(self, driver_command, params=None):
+        self.sent.append(driver_command)
+        return {}
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.execute("executeCdpCommand", {"cmd": cmd, "params": params})
+        self.task_duration += 0.25
+        return {"metrics": [{"name": "TaskDuration", "value": self.task_duration}, {"name": "Nodes", "value": 40}]}
+
+    def execute_script(self, script):
+        self.execute("executeScript")
+        return {"origin": 1000.0, "entries": [["https://porter.in/", "navigation", 0, 120, 1, 2, 30, 5, 2048]]}
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return QuoteTracer(str(tmp_path), sample_rate=1.0, max_files=3, prune_every=2)
+
+
+def _trace_files(tracer):
+    return sorted(f for f in os.listdir(tracer.trace_dir) if f.endswith(".json"))
+
+
+def _events(tracer, name):
+    with open(os.path.join(tracer.trace_dir, _trace_files(tracer)[0])) as f:
+        return [e for e in json.load(f)["traceEvents"] if e["name"] == name]
+
+
+def test_unsampled_quote_writes_nothing(tmp_path, monkeypatch):
+    tracer = QuoteTracer(str(tmp_path), sample_rate=0.1)
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.1)
+    driver = FakeDriver()
+    tracer.on_start(driver)
+    tracer.on_stage(driver, "estimate_form")
+    tracer.on_finish(driver, RESULT)
+    assert _trace_files(tracer) == [] and driver.sent == []
+
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.09)
+    tracer.on_start(driver)
+    tracer.on_finish(driver, RESULT)
+    assert len(_trace_files(tracer)) == 1
+
+
+def test_quote_commands_are_counted_per_stage_but_tracer_commands_are_not(tracer):
+    driver = FakeDriver()
+    tracer.on_start(driver)
+    driver.execute("get")
+    driver.execute("findElement")
+    tracer.on_stage(driver, "estimate_form")
+    driver.execute("clickElement")
+    tracer.on_finish(driver, RESULT)
+
+    assert _events(tracer, "estimate_form")[0]["args"]["webdriver_commands"] == 2
+    assert _events(tracer, "finish")[0]["args"]["webdriver_commands"] == 1
+    quote = _events(tracer, "get_quote")[0]["args"]
+    assert quote["webdriver_commands"] == 3 and quote["success"] and quote["city"] == "Bangalore"
+    commands = [e["name"] for e in _events(tracer, "get") + _events(tracer, "findElement") + _events(tracer, "clickElement")]
+    assert commands == ["get", "findElement", "clickElement"]
+    assert _events(tracer, "executeCdpCommand") == []
+
+
+def test_stage_metrics_are_deltas_and_resources_are_traced_once(tracer):
+    driver = FakeDriver()
+    tracer.on_start(driver)
+    tracer.on_stage(driver, "estimate_form")
+    tracer.on_stage(driver, "results")
+    tracer.on_finish(driver, RESULT)
+
+    assert _events(tracer, "results")[0]["args"]["TaskDuration_ms"] == 250.0
+    assert [e["args"]["Nodes"] for e in _events(tracer, "page")] == [40, 40, 40]
+    network = _events(tracer, "https://porter.in/")
+    assert len(network) == 1 and network[0]["args"]["ttfb_ms"] == 30
+
+
+def test_concurrent_quotes_keep_separate_traces(tracer):
+    first, second = object(), object()  # CDP pages: stage spans only
+    tracer.on_start(first)
+    tracer.on_start(second)
+    tracer.on_stage(first, "estimate_form")
+    tracer.on_finish(second, RESULT)
+    assert len(_trace_files(tracer)) == 1
+    assert _events(tracer, "estimate_form") == []
+    tracer.on_finish(first, RESULT)
+    assert len(_trace_files(tracer)) == 2
+
+
+def test_prune_keeps_the_newest_and_runs_every_few_writes(tracer, monkeypatch):
+    for i in range(4):
+        path = os.path.join(tracer.trace_dir, f"old-{i}.json")
+        open(path, "w").close()
+        os.utime(path, ns=(i * 10 ** 9, i * 10 ** 9))
+
+    pruned = []
+    prune = tracer._prune
+    monkeypatch.setattr(tracer, "_prune", lambda: pruned.append(True) or prune())
+    for _ in range(3):
+        driver = object()
+        tracer.on_start(driver)
+        tracer.on_finish(driver, RESULT)
+        assert len(pruned) == tracer._written // 2
+
+    files = _trace_files(tracer)
+    assert len(files) == 4  # pruned to the newest 3 after the second trace, then one more written
+    assert [f for f in files if f.startswith("old-")] == ["old-3.json"]